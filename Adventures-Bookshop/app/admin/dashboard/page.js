@@ -138,7 +138,7 @@ export default function AdminDashboard() {
                           #{order.id}
                         </td>
                         <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
-                          {order.customer_name || order.customer_phone || 'N/A'}
+                          {order.full_name || order.phone || 'N/A'}
                         </td>
                         <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-500">
                           KSh {order.total_amount?.toLocaleString() || '0'}
@@ -2,23 +2,25 @@
 
 import { useState, useEffect } from 'react';
 import Link from 'next/link';
-import { orderAPI, api } from '../../../lib/api';
+import { orderAPI, adminAPI, api } from '../../../lib/api';
 import { EyeIcon, CheckIcon, XMarkIcon } from '@heroicons/react/24/outline';
 import toast from 'react-hot-toast';
 
 export default function AdminOrders() {
   const [orders, setOrders] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
   const [statusFilter, setStatusFilter] = useState('');
 
   useEffect(() => {
     fetchOrders();
   }, []);
 
-  const fetchOrders = async () => {
+  const fetchOrders = async (cursor = null) => {
     try {
-      const response = await api.get('/admin/orders');
-      setOrders(response.data);
+      const response = await adminAPI.getAllOrders(cursor);
+      setOrders((prev) => (cursor ? [...prev, ...response.data.items] : response.data.items));
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       toast.error('Failed to fetch orders');
     } finally {
@@ -122,7 +124,7 @@ export default function AdminOrders() {
                     </div>
                   </td>
                   <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
-                    {order.order_items?.length || 0} items
+                    {order.item_count ?? 0} items
                   </td>
                   <td className="px-6 py-4 whitespace-nowrap text-sm text-gray-900">
                     KSh {order.total_amount?.toLocaleString()}
@@ -168,6 +170,16 @@ export default function AdminOrders() {
             </tbody>
           </table>
         )}
+        {nextCursor && (
+          <div className="text-center py-4">
+            <button
+              onClick={() => fetchOrders(nextCursor)}
+              className="bg-gray-100 text-gray-800 px-4 py-2 rounded hover:bg-gray-200"
+            >
+              Load more
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -11,12 +11,20 @@ export default function AdminProducts() {
   const [editingProduct, setEditingProduct] = useState(null);
   const [showForm, setShowForm] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
 
   // 🔎 Fetch products from API with optional search query
-  const fetchProducts = async (query = '') => {
+  const fetchProducts = async (query = '', cursor = null) => {
     try {
-      const res = await adminAPI.getAllProducts(query); 
-      setProducts(res.data);
+      if (query.trim()) {
+        const res = await adminAPI.searchProducts(query);
+        setProducts(res.data);
+        setNextCursor(null);
+        return;
+      }
+      const res = await adminAPI.getAllProducts(cursor);
+      setProducts((prev) => (cursor ? [...prev, ...res.data.items] : res.data.items));
+      setNextCursor(res.data.next_cursor);
     } catch (err) {
       console.error('Error fetching products:', err);
     }
@@ -30,15 +38,7 @@ export default function AdminProducts() {
 
   useEffect(() => {
   const delayDebounce = setTimeout(() => {
-    if (searchTerm.trim()) {
-      adminAPI.searchProducts(searchTerm)
-        .then((res) => setProducts(res.data))
-        .catch((err) => console.error("Error searching products:", err));
-    } else {
-      adminAPI.getAllProducts()
-        .then((res) => setProducts(res.data))
-        .catch((err) => console.error("Error fetching products:", err));
-    }
+    fetchProducts(searchTerm);
   }, 500); // debounce
 
   return () => clearTimeout(delayDebounce);
@@ -129,6 +129,15 @@ export default function AdminProducts() {
           </p>
         )}
       </div>
+
+      {nextCursor && (
+        <button
+          onClick={() => fetchProducts('', nextCursor)}
+          className="bg-gray-200 px-4 py-2 rounded mt-4"
+        >
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -20,7 +20,7 @@ export default function AdminProducts() {
   const fetchProducts = async () => {
     try {
       const response = await api.get('/admin/products');
-      setProducts(response.data);
+      setProducts(response.data.items);
     } catch (error) {
       toast.error('Failed to fetch products');
       console.error('Products fetch error:', error);
@@ -148,9 +148,11 @@ const ProductGrid = ({ title = "Featured Products", category = null }) => {
         // ✅ Fetch products from API (by category or all)
         const response = category
           ? await productAPI.getByCategory(category)
-          : await productAPI.getAll();
+          : await productAPI.getAll({ limit: 8 });
 
-        setProducts(response.data.slice(0, 8)); // limit to 8 products
+        // the full list is paginated ({ items, next_cursor }); the first page is enough here
+        const items = category ? response.data : response.data.items;
+        setProducts(items.slice(0, 8)); // limit to 8 products
       } catch (error) {
         console.error("Error fetching products:", error);
 
@@ -33,7 +33,7 @@ export default function ProductForm({ product, onSaved }) {
         const formData = new FormData();
         formData.append('file', imageFile);
         const uploadRes = await adminAPI.uploadImage(formData);
-        filename = uploadRes.data.filename;
+        filename = uploadRes.data.url; // /static/images/<content hash>.<ext>
       }
 
       // 2️⃣ Create or update product
@@ -33,7 +33,8 @@ export const authAPI = {
 
 // API endpoints
 export const productAPI = {
-  getAll: () => api.get('/products'),
+  // Paginated: responses are { items, next_cursor }; params takes limit and cursor
+  getAll: (params) => api.get('/products', { params }),
   getById: (id) => api.get(`/products/${id}`),
   getByCategory: (category) => api.get(`/products/category/${category}`),
   create: (data) => api.post('/products', data),
@@ -60,10 +61,11 @@ export const adminAPI = {
   getDashboardStats: () => api.get('/admin/dashboard'),
 
   // Orders
-  getAllOrders: () => api.get('/admin/orders'),
+  // Paginated: responses are { items, next_cursor }; pass next_cursor back for the next page
+  getAllOrders: (cursor) => api.get('/admin/orders', { params: { cursor } }),
 
   // Products CRUD
-   getAllProducts: () => api.get('/admin/products'),
+   getAllProducts: (cursor) => api.get('/admin/products', { params: { cursor } }),
   createProduct: (data) => api.post('/admin/products', data),
   updateProduct: (id, data) => api.put(`/admin/products/${id}`, data),
   deleteProduct: (id) => api.delete(`/admin/products/${id}`),
@@ -0,0 +1,300 @@
+"""Sharded dashboard stats counters
+
+Revision ID: 4f9a2c7e8b13
+Revises: 0c5d9e7b3a18
+Create Date: 2026-10-18 23:12:08.514302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f9a2c7e8b13'
+down_revision: Union[str, None] = '0c5d9e7b3a18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Each counter becomes 16 (name, shard) rows, the shard picked by the
+# changed row's id, so concurrent writes stop queueing on one row lock.
+# Triggers as services/dashboard_stats.py defines them at this revision,
+# and as d8b208290338 created them for the downgrade; kept here verbatim
+# so this migration never follows later edits
+SHARDS = 16
+
+SQLITE_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_ai AFTER INSERT ON products
+    WHEN new.is_active = 1 BEGIN
+        UPDATE dashboard_stats SET value = value + 1
+        WHERE name = 'total_products' AND shard = new.id % 16;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_ad AFTER DELETE ON products
+    WHEN old.is_active = 1 BEGIN
+        UPDATE dashboard_stats SET value = value - 1
+        WHERE name = 'total_products' AND shard = old.id % 16;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_au AFTER UPDATE OF is_active ON products
+    WHEN coalesce(old.is_active, 0) != coalesce(new.is_active, 0) BEGIN
+        UPDATE dashboard_stats SET value = value + (CASE WHEN new.is_active = 1 THEN 1 ELSE -1 END)
+        WHERE name = 'total_products' AND shard = new.id % 16;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_orders_ai AFTER INSERT ON orders BEGIN
+        UPDATE dashboard_stats SET value = value + 1
+        WHERE name = 'total_orders' AND shard = new.id % 16;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_orders_ad AFTER DELETE ON orders BEGIN
+        UPDATE dashboard_stats SET value = value - 1
+        WHERE name = 'total_orders' AND shard = old.id % 16;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_users_ai AFTER INSERT ON users BEGIN
+        UPDATE dashboard_stats SET value = value + 1
+        WHERE name = 'total_users' AND shard = new.id % 16;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_users_ad AFTER DELETE ON users BEGIN
+        UPDATE dashboard_stats SET value = value - 1
+        WHERE name = 'total_users' AND shard = old.id % 16;
+    END
+    """,
+]
+
+
+POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION dashboard_stats_products() RETURNS trigger AS $$
+    DECLARE
+        delta integer := 0;
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_active THEN
+            delta := delta + 1;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.is_active THEN
+            delta := delta - 1;
+        END IF;
+        IF delta <> 0 THEN
+            UPDATE dashboard_stats SET value = value + delta
+            WHERE name = 'total_products'
+              AND shard = (CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END) % 16;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION dashboard_stats_count() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE dashboard_stats SET value = value + 1
+            WHERE name = TG_ARGV[0] AND shard = NEW.id % 16;
+        ELSE
+            UPDATE dashboard_stats SET value = value - 1
+            WHERE name = TG_ARGV[0] AND shard = OLD.id % 16;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_products ON products",
+    """
+    CREATE TRIGGER dashboard_stats_products
+    AFTER INSERT OR DELETE OR UPDATE OF is_active ON products
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_products()
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders ON orders",
+    """
+    CREATE TRIGGER dashboard_stats_orders AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_count('total_orders')
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_users ON users",
+    """
+    CREATE TRIGGER dashboard_stats_users AFTER INSERT OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_count('total_users')
+    """,
+]
+
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS dashboard_stats_products_ai",
+    "DROP TRIGGER IF EXISTS dashboard_stats_products_ad",
+    "DROP TRIGGER IF EXISTS dashboard_stats_products_au",
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders_ai",
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders_ad",
+    "DROP TRIGGER IF EXISTS dashboard_stats_users_ai",
+    "DROP TRIGGER IF EXISTS dashboard_stats_users_ad",
+]
+
+POSTGRES_DROP = [
+    "DROP TRIGGER IF EXISTS dashboard_stats_users ON users",
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders ON orders",
+    "DROP TRIGGER IF EXISTS dashboard_stats_products ON products",
+    "DROP FUNCTION IF EXISTS dashboard_stats_count()",
+    "DROP FUNCTION IF EXISTS dashboard_stats_products()",
+]
+
+
+# Counters seeded from the rows already there, all in shard 0; the other
+# shards start at zero
+SEED = """
+    INSERT INTO dashboard_stats (name, shard, value)
+    SELECT 'total_products', 0, count(*) FROM products WHERE is_active
+    UNION ALL SELECT 'total_orders', 0, count(*) FROM orders
+    UNION ALL SELECT 'total_users', 0, count(*) FROM users
+"""
+
+UNSHARDED_SQLITE_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_ai AFTER INSERT ON products
+    WHEN new.is_active = 1 BEGIN
+        UPDATE dashboard_stats SET value = value + 1 WHERE name = 'total_products';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_ad AFTER DELETE ON products
+    WHEN old.is_active = 1 BEGIN
+        UPDATE dashboard_stats SET value = value - 1 WHERE name = 'total_products';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_au AFTER UPDATE OF is_active ON products
+    WHEN coalesce(old.is_active, 0) != coalesce(new.is_active, 0) BEGIN
+        UPDATE dashboard_stats SET value = value + (CASE WHEN new.is_active = 1 THEN 1 ELSE -1 END)
+        WHERE name = 'total_products';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_orders_ai AFTER INSERT ON orders BEGIN
+        UPDATE dashboard_stats SET value = value + 1 WHERE name = 'total_orders';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_orders_ad AFTER DELETE ON orders BEGIN
+        UPDATE dashboard_stats SET value = value - 1 WHERE name = 'total_orders';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_users_ai AFTER INSERT ON users BEGIN
+        UPDATE dashboard_stats SET value = value + 1 WHERE name = 'total_users';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_users_ad AFTER DELETE ON users BEGIN
+        UPDATE dashboard_stats SET value = value - 1 WHERE name = 'total_users';
+    END
+    """,
+]
+
+UNSHARDED_POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION dashboard_stats_products() RETURNS trigger AS $$
+    DECLARE
+        delta integer := 0;
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_active THEN
+            delta := delta + 1;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.is_active THEN
+            delta := delta - 1;
+        END IF;
+        IF delta <> 0 THEN
+            UPDATE dashboard_stats SET value = value + delta WHERE name = 'total_products';
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION dashboard_stats_count() RETURNS trigger AS $$
+    BEGIN
+        UPDATE dashboard_stats
+        SET value = value + (CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END)
+        WHERE name = TG_ARGV[0];
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_products ON products",
+    """
+    CREATE TRIGGER dashboard_stats_products
+    AFTER INSERT OR DELETE OR UPDATE OF is_active ON products
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_products()
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders ON orders",
+    """
+    CREATE TRIGGER dashboard_stats_orders AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_count('total_orders')
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_users ON users",
+    """
+    CREATE TRIGGER dashboard_stats_users AFTER INSERT OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_count('total_users')
+    """,
+]
+
+UNSHARDED_SEED = """
+    INSERT INTO dashboard_stats (name, value)
+    SELECT 'total_products', count(*) FROM products WHERE is_active
+    UNION ALL SELECT 'total_orders', count(*) FROM orders
+    UNION ALL SELECT 'total_users', count(*) FROM users
+"""
+
+
+def _execute_all(statements):
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _execute_all(SQLITE_DROP)
+    elif dialect == "postgresql":
+        _execute_all(POSTGRES_DROP)
+    op.drop_table('dashboard_stats')
+    stats = op.create_table('dashboard_stats',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name', 'shard')
+    )
+    op.bulk_insert(stats, [
+        {"name": name, "shard": shard, "value": 0}
+        for name in ("total_products", "total_orders", "total_users")
+        for shard in range(1, SHARDS)
+    ])
+    if dialect == "sqlite":
+        _execute_all(SQLITE_DDL + [SEED])
+    elif dialect == "postgresql":
+        _execute_all(POSTGRES_DDL + [SEED])
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _execute_all(SQLITE_DROP)
+    elif dialect == "postgresql":
+        _execute_all(POSTGRES_DROP)
+    op.drop_table('dashboard_stats')
+    op.create_table('dashboard_stats',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    if dialect == "sqlite":
+        _execute_all(UNSHARDED_SQLITE_DDL + [UNSHARDED_SEED])
+    elif dialect == "postgresql":
+        _execute_all(UNSHARDED_POSTGRES_DDL + [UNSHARDED_SEED])
@@ -0,0 +1,144 @@
+"""Content-addressed images with reference counts
+
+Revision ID: 5c3e1b7f9d42
+Revises: 935269d3a2c2
+Create Date: 2026-10-18 16:04:37.218590
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c3e1b7f9d42'
+down_revision: Union[str, None] = '935269d3a2c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Reference-count triggers exactly as services/image_refs.py wrote them for
+# this revision, so editing that module later leaves this migration alone
+REFERENCING_TABLES = ("products", "hero_banners")
+
+IMAGE_PREFIX = "/static/images/"
+
+
+def _sqlite_ddl(table):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS image_refs_{table}_ai AFTER INSERT ON {table}
+        WHEN new.image IS NOT NULL BEGIN
+            UPDATE images SET ref_count = ref_count + 1
+            WHERE path IN (new.image, '{IMAGE_PREFIX}' || new.image);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS image_refs_{table}_ad AFTER DELETE ON {table}
+        WHEN old.image IS NOT NULL BEGIN
+            UPDATE images SET ref_count = ref_count - 1
+            WHERE path IN (old.image, '{IMAGE_PREFIX}' || old.image);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS image_refs_{table}_au AFTER UPDATE OF image ON {table}
+        WHEN old.image IS NOT new.image BEGIN
+            UPDATE images SET ref_count = ref_count - 1
+            WHERE old.image IS NOT NULL AND path IN (old.image, '{IMAGE_PREFIX}' || old.image);
+            UPDATE images SET ref_count = ref_count + 1
+            WHERE new.image IS NOT NULL AND path IN (new.image, '{IMAGE_PREFIX}' || new.image);
+        END
+        """,
+    ]
+
+
+def _sqlite_drop(table):
+    return [f"DROP TRIGGER IF EXISTS image_refs_{table}_{event}" for event in ("ai", "ad", "au")]
+
+POSTGRES_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION image_refs_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.image IS NOT DISTINCT FROM NEW.image THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.image IS NOT NULL THEN
+        UPDATE images SET ref_count = ref_count - 1
+        WHERE path IN (OLD.image, '{IMAGE_PREFIX}' || OLD.image);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.image IS NOT NULL THEN
+        UPDATE images SET ref_count = ref_count + 1
+        WHERE path IN (NEW.image, '{IMAGE_PREFIX}' || NEW.image);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def _postgres_ddl(table):
+    return [
+        POSTGRES_FUNCTION,
+        f"DROP TRIGGER IF EXISTS image_refs_{table} ON {table}",
+        f"""
+        CREATE TRIGGER image_refs_{table}
+        AFTER INSERT OR DELETE OR UPDATE OF image ON {table}
+        FOR EACH ROW EXECUTE FUNCTION image_refs_count()
+        """,
+    ]
+
+
+def _postgres_drop(table):
+    return [f"DROP TRIGGER IF EXISTS image_refs_{table} ON {table}"]
+
+
+def _reconcile_sql(tables):
+    # one correlated count per referencing table, matching either image form
+    counts = [
+        f"(SELECT count(*) FROM {table} WHERE {table}.image IN "
+        f"(images.path, substr(images.path, {len(IMAGE_PREFIX) + 1})))"
+        for table in tables
+    ]
+    return "UPDATE images SET ref_count = " + (" + ".join(counts) or "0")
+
+
+def _execute_all(statements):
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def _existing_tables():
+    # hero_banners may not exist yet; it is left out until it does
+    return [table for table in REFERENCING_TABLES if sa.inspect(op.get_bind()).has_table(table)]
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('images') as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index(batch_op.f('ix_images_content_hash'), ['content_hash'], unique=True)
+    # triggers on products/hero_banners, then count existing references
+    dialect = op.get_bind().dialect.name
+    tables = _existing_tables()
+    for table in tables:
+        if dialect == "sqlite":
+            _execute_all(_sqlite_ddl(table))
+        elif dialect == "postgresql":
+            _execute_all(_postgres_ddl(table))
+    if dialect in ("sqlite", "postgresql"):
+        _execute_all([_reconcile_sql(tables)])
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    for table in _existing_tables():
+        if dialect == "sqlite":
+            _execute_all(_sqlite_drop(table))
+        elif dialect == "postgresql":
+            _execute_all(_postgres_drop(table))
+    if dialect == "postgresql":
+        _execute_all(["DROP FUNCTION IF EXISTS image_refs_count()"])
+    with op.batch_alter_table('images') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_images_content_hash'))
+        batch_op.drop_column('ref_count')
+        batch_op.drop_column('content_hash')
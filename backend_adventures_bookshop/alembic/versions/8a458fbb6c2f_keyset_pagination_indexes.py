@@ -0,0 +1,30 @@
+"""Keyset pagination indexes
+
+Revision ID: 8a458fbb6c2f
+Revises: 939f215238b3
+Create Date: 2026-10-18 09:12:04.318220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a458fbb6c2f'
+down_revision: Union[str, None] = '939f215238b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_created_at_id', 'products', ['created_at', 'id'], unique=False)
+    op.create_index('ix_products_is_active_created_at_id', 'products', ['is_active', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_created_at_id', table_name='orders')
+    op.drop_index('ix_products_is_active_created_at_id', table_name='products')
+    op.drop_index('ix_products_created_at_id', table_name='products')
@@ -0,0 +1,145 @@
+"""Product full-text search index
+
+Revision ID: a1a75cc8a00b
+Revises: 8a458fbb6c2f
+Create Date: 2026-10-18 11:40:27.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1a75cc8a00b'
+down_revision: Union[str, None] = '8a458fbb6c2f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# The index DDL as of this revision, copied from services/search.py so that
+# later edits there don't change what this migration does
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, coalesce(new.description, ''),
+                coalesce((SELECT name FROM categories WHERE id = new.category_id), ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category_id ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, coalesce(new.description, ''),
+                coalesce((SELECT name FROM categories WHERE id = new.category_id), ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS categories_fts_au AFTER UPDATE OF name ON categories BEGIN
+        UPDATE products_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id);
+    END
+    """,
+]
+
+SQLITE_REBUILD = [
+    "DELETE FROM products_fts",
+    """
+    INSERT INTO products_fts(rowid, name, description, category)
+    SELECT p.id, p.name, coalesce(p.description, ''), coalesce(c.name, '')
+    FROM products p LEFT JOIN categories c ON c.id = p.category_id
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS categories_fts_au",
+    "DROP TRIGGER IF EXISTS products_fts_au",
+    "DROP TRIGGER IF EXISTS products_fts_ad",
+    "DROP TRIGGER IF EXISTS products_fts_ai",
+    "DROP TABLE IF EXISTS products_fts",
+]
+
+POSTGRES_DDL = [
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+    """
+    CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(
+                (SELECT name FROM categories WHERE id = NEW.category_id), '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS products_search_vector_trg ON products",
+    """
+    CREATE TRIGGER products_search_vector_trg
+    BEFORE INSERT OR UPDATE OF name, description, category_id ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION categories_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE products SET name = name WHERE category_id = NEW.id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS categories_search_vector_trg ON categories",
+    """
+    CREATE TRIGGER categories_search_vector_trg
+    AFTER UPDATE OF name ON categories
+    FOR EACH ROW EXECUTE FUNCTION categories_search_vector_update()
+    """,
+]
+
+POSTGRES_REBUILD = ["UPDATE products SET name = name"]
+
+POSTGRES_DROP = [
+    "DROP TRIGGER IF EXISTS categories_search_vector_trg ON categories",
+    "DROP FUNCTION IF EXISTS categories_search_vector_update()",
+    "DROP TRIGGER IF EXISTS products_search_vector_trg ON products",
+    "DROP FUNCTION IF EXISTS products_search_vector_update()",
+    "DROP INDEX IF EXISTS ix_products_search_vector",
+    "ALTER TABLE products DROP COLUMN IF EXISTS search_vector",
+]
+
+
+
+def _execute_all(statements):
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade() -> None:
+    # FTS5 table + triggers on SQLite, tsvector column + GIN index + triggers on Postgres
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _execute_all(SQLITE_DDL + SQLITE_REBUILD)
+    elif dialect == "postgresql":
+        _execute_all(POSTGRES_DDL + POSTGRES_REBUILD)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _execute_all(SQLITE_DROP)
+    elif dialect == "postgresql":
+        _execute_all(POSTGRES_DROP)
@@ -0,0 +1,164 @@
+"""Dashboard stats counters
+
+Revision ID: d8b208290338
+Revises: a1a75cc8a00b
+Create Date: 2026-10-18 14:05:51.622941
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b208290338'
+down_revision: Union[str, None] = 'a1a75cc8a00b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Counter triggers as services/dashboard_stats.py defined them at this
+# revision; kept here verbatim so this migration never follows later edits
+SQLITE_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_ai AFTER INSERT ON products
+    WHEN new.is_active = 1 BEGIN
+        UPDATE dashboard_stats SET value = value + 1 WHERE name = 'total_products';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_ad AFTER DELETE ON products
+    WHEN old.is_active = 1 BEGIN
+        UPDATE dashboard_stats SET value = value - 1 WHERE name = 'total_products';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_au AFTER UPDATE OF is_active ON products
+    WHEN coalesce(old.is_active, 0) != coalesce(new.is_active, 0) BEGIN
+        UPDATE dashboard_stats SET value = value + (CASE WHEN new.is_active = 1 THEN 1 ELSE -1 END)
+        WHERE name = 'total_products';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_orders_ai AFTER INSERT ON orders BEGIN
+        UPDATE dashboard_stats SET value = value + 1 WHERE name = 'total_orders';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_orders_ad AFTER DELETE ON orders BEGIN
+        UPDATE dashboard_stats SET value = value - 1 WHERE name = 'total_orders';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_users_ai AFTER INSERT ON users BEGIN
+        UPDATE dashboard_stats SET value = value + 1 WHERE name = 'total_users';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_users_ad AFTER DELETE ON users BEGIN
+        UPDATE dashboard_stats SET value = value - 1 WHERE name = 'total_users';
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS dashboard_stats_products_ai",
+    "DROP TRIGGER IF EXISTS dashboard_stats_products_ad",
+    "DROP TRIGGER IF EXISTS dashboard_stats_products_au",
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders_ai",
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders_ad",
+    "DROP TRIGGER IF EXISTS dashboard_stats_users_ai",
+    "DROP TRIGGER IF EXISTS dashboard_stats_users_ad",
+]
+
+POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION dashboard_stats_products() RETURNS trigger AS $$
+    DECLARE
+        delta integer := 0;
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_active THEN
+            delta := delta + 1;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.is_active THEN
+            delta := delta - 1;
+        END IF;
+        IF delta <> 0 THEN
+            UPDATE dashboard_stats SET value = value + delta WHERE name = 'total_products';
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION dashboard_stats_count() RETURNS trigger AS $$
+    BEGIN
+        UPDATE dashboard_stats
+        SET value = value + (CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE -1 END)
+        WHERE name = TG_ARGV[0];
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_products ON products",
+    """
+    CREATE TRIGGER dashboard_stats_products
+    AFTER INSERT OR DELETE OR UPDATE OF is_active ON products
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_products()
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders ON orders",
+    """
+    CREATE TRIGGER dashboard_stats_orders AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_count('total_orders')
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_users ON users",
+    """
+    CREATE TRIGGER dashboard_stats_users AFTER INSERT OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_count('total_users')
+    """,
+]
+
+POSTGRES_DROP = [
+    "DROP TRIGGER IF EXISTS dashboard_stats_users ON users",
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders ON orders",
+    "DROP TRIGGER IF EXISTS dashboard_stats_products ON products",
+    "DROP FUNCTION IF EXISTS dashboard_stats_count()",
+    "DROP FUNCTION IF EXISTS dashboard_stats_products()",
+]
+
+# Counters seeded from the rows already there
+SEED = """
+    INSERT INTO dashboard_stats (name, value)
+    SELECT 'total_products', count(*) FROM products WHERE is_active
+    UNION ALL SELECT 'total_orders', count(*) FROM orders
+    UNION ALL SELECT 'total_users', count(*) FROM users
+"""
+
+
+def _execute_all(statements):
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def upgrade() -> None:
+    op.create_table('dashboard_stats',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # triggers on products/orders/users, then seed counters from current rows
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _execute_all(SQLITE_DDL + [SEED])
+    elif dialect == "postgresql":
+        _execute_all(POSTGRES_DDL + [SEED])
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _execute_all(SQLITE_DROP)
+    elif dialect == "postgresql":
+        _execute_all(POSTGRES_DROP)
+    op.drop_table('dashboard_stats')
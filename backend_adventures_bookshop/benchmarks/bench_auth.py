@@ -0,0 +1,84 @@
+"""
+Authenticated request latency through get_current_admin_user:
+the old dependency (jwt.decode plus a synchronous ORM lookup inside an
+async function, blocking the event loop), the async lookup without caching,
+and the async lookup with the token/user caches in routers/auth.py.
+Keep --concurrency below the sync pool size (15) when comparing: above it
+the old dependency stalls, because it waits for a pooled connection on the
+event loop that would otherwise release one.
+
+Usage: python -m benchmarks.bench_auth --requests 2000 --concurrency 10
+"""
+import argparse
+import asyncio
+
+from benchmarks import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--path", default="/admin/cache-stats", help="any admin-only GET")
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-auth")
+    from fastapi import Depends, HTTPException, Request
+    from jose import JWTError, jwt
+    from sqlalchemy.orm import Session
+
+    import main as app_module
+    import setup_database
+    from config import settings
+    from database import get_db
+    from routers import auth
+
+    setup_database.seed_data()
+    token = auth.create_access_token({"sub": "admin@schoolmall.co.ke"})
+    headers = {"Authorization": f"Bearer {token}"}
+    app = app_module.app
+
+    async def legacy_get_current_user(request: Request, db: Session = Depends(get_db)):
+        # the previous implementation, kept here for comparison
+        token = request.headers["authorization"].split(" ")[1]
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401)
+        user = auth.get_user_by_email(db, email=payload.get("sub"))
+        if user is None:
+            raise HTTPException(status_code=401)
+        return user
+
+    def set_cache_size(size):
+        for cache in (auth.token_cache, auth.user_cache):
+            cache.clear()
+            cache.maxsize = size
+
+    modes = [
+        ("sync lookup (before)", {auth.get_current_user: legacy_get_current_user}, 0),
+        ("async, no cache", {}, 0),
+        ("async + cache", {}, settings.AUTH_CACHE_MAX_ENTRIES),
+    ]
+    rows = []
+    for name, overrides, cache_size in modes:
+        app.dependency_overrides = overrides
+        set_cache_size(cache_size)
+        asyncio.run(common.drive(app, "GET", args.path, 50, 5, headers=headers))  # warm up
+        elapsed, latencies, statuses = asyncio.run(
+            common.drive(app, "GET", args.path, args.requests, args.concurrency, headers=headers)
+        )
+        rows.append({
+            "mode": name,
+            "req_per_s": args.requests / elapsed,
+            **{k: v for k, v in common.summarize(latencies).items() if k != "count"},
+            "statuses": statuses,
+        })
+    app.dependency_overrides = {}
+    common.print_table(
+        f"{args.requests} authenticated GET {args.path}, concurrency {args.concurrency}", rows
+    )
+
+
+if __name__ == "__main__":
+    main()
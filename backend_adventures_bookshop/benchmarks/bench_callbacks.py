@@ -0,0 +1,201 @@
+"""
+Replays a burst of M-Pesa STK callbacks, duplicates included, against the
+app served by uvicorn on a local port: the synchronous read-modify-write
+handler (look up payment and order, update both, commit per callback)
+versus the append-only ingest in services/payment_callbacks.py with the
+in-app batch consumer applying them behind it.
+Reports acknowledgement throughput and latency, errors the provider would
+retry, how long after the last acknowledgement every payment was settled,
+and whether the final payment/order states are right.
+
+Usage: python -m benchmarks.bench_callbacks --payments 5000 --duplicates 0.5 --concurrency 50
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks import common, standins
+
+
+def build_callbacks(transaction_ids, duplicates: float, failure_rate: float, seed: int = 42):
+    """One callback per payment plus `duplicates` x as many repeats, shuffled"""
+    import orjson
+
+    rng = random.Random(seed)
+    outcomes = {}
+    bodies = []
+    for n, transaction_id in enumerate(transaction_ids):
+        if rng.random() < failure_rate:
+            code = rng.choice([1032, 1037, 2001])
+            callback = {"ResultCode": code, "ResultDesc": "Request cancelled by user"}
+        else:
+            code = 0
+            callback = {
+                "ResultCode": 0,
+                "ResultDesc": "The service request is processed successfully.",
+                "CallbackMetadata": {"Item": [
+                    {"Name": "Amount", "Value": 100.0},
+                    {"Name": "MpesaReceiptNumber", "Value": f"QK{n:08d}"},
+                    {"Name": "TransactionDate", "Value": 20261018120000},
+                    {"Name": "PhoneNumber", "Value": 254712345678},
+                ]},
+            }
+        outcomes[transaction_id] = code
+        bodies.append(orjson.dumps({"Body": {"stkCallback": {
+            "MerchantRequestID": f"{n:05d}-{n:08d}-1", "CheckoutRequestID": transaction_id, **callback,
+        }}}))
+    bodies += rng.choices(bodies, k=int(len(bodies) * duplicates))
+    rng.shuffle(bodies)
+    return bodies, outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payments", type=int, default=5000)
+    parser.add_argument("--duplicates", type=float, default=0.5, help="extra deliveries, as a fraction of payments")
+    parser.add_argument("--failure-rate", type=float, default=0.15)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-callbacks")
+    import httpx
+    import orjson
+    from fastapi import Depends, HTTPException, Request
+    from sqlalchemy import create_engine, delete, event, func, insert, select, update
+    from sqlalchemy.orm import Session, sessionmaker
+
+    import main as app_module
+    from database import SessionLocal, async_engine, engine, get_db
+    from models import Order, OrderStatus, Payment, PaymentCallback, PaymentStatus
+
+    common.seed_products(200)
+    common.seed_orders(args.payments)
+    with SessionLocal() as db:
+        orders = db.execute(select(Order.id, Order.total_amount)).all()
+        db.execute(insert(Payment), [
+            {"order_id": order.id, "transaction_id": f"ws_CO_{order.id:012d}", "payment_method": "mpesa",
+             "amount": order.total_amount, "status": PaymentStatus.pending}
+            for order in orders
+        ])
+        db.commit()
+        transaction_ids = [t for (t,) in db.execute(select(Payment.transaction_id))]
+    bodies, outcomes = build_callbacks(transaction_ids, args.duplicates, args.failure_rate)
+    expected_paid = sum(1 for code in outcomes.values() if code == 0)
+
+    app = app_module.app
+
+    def legacy_callback(request_body: dict, db: Session = Depends(get_db)):
+        # the synchronous shape: read, modify and write payment and order per callback
+        callback = request_body["Body"]["stkCallback"]
+        payment = db.query(Payment).filter(Payment.transaction_id == callback["CheckoutRequestID"]).first()
+        if not payment:
+            raise HTTPException(status_code=404, detail="Payment not found")
+        if payment.status == PaymentStatus.pending:
+            success = callback["ResultCode"] == 0
+            payment.status = PaymentStatus.completed if success else PaymentStatus.failed
+            order = db.query(Order).filter(Order.id == payment.order_id).first()
+            order.payment_status = payment.status
+            if success and order.status == OrderStatus.pending:
+                order.status = OrderStatus.confirmed
+            db.commit()
+        return {"ResultCode": 0, "ResultDesc": "Success"}
+
+    app.post("/bench/legacy-callback")(legacy_callback)
+
+    # the benchmark's own checks go through a separate engine, so they
+    # don't show up in the app's statement counts
+    Probe = sessionmaker(bind=create_engine(engine.url))
+
+    def reset():
+        with Probe() as db:
+            db.execute(delete(PaymentCallback))
+            db.execute(update(Payment).values(status=PaymentStatus.pending, provider_reference=None))
+            db.execute(update(Order).values(status=OrderStatus.pending, payment_status=PaymentStatus.pending))
+            db.commit()
+
+    def settled():
+        with Probe() as db:
+            pending = db.execute(select(func.count()).where(Payment.status == PaymentStatus.pending)).scalar()
+            unprocessed = db.execute(
+                select(func.count()).where(PaymentCallback.processed_at.is_(None))
+            ).scalar()
+            return pending == 0 and unprocessed == 0
+
+    def final_state():
+        with Probe() as db:
+            paid = db.execute(select(func.count()).where(Payment.status == PaymentStatus.completed)).scalar()
+            orders_paid = db.execute(
+                select(func.count()).where(Order.payment_status == PaymentStatus.completed)
+            ).scalar()
+            stored = db.execute(select(func.count()).select_from(PaymentCallback)).scalar()
+            return paid, orders_paid, stored
+
+    async def replay(base_url, path):
+        latencies, statuses = [], {}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            async def one(body):
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.post(path, content=body, headers={"content-type": "application/json"})
+                        status = response.status_code
+                    except httpx.HTTPError:
+                        status = "error"
+                    latencies.append(time.perf_counter() - started)
+                    statuses[status] = statuses.get(status, 0) + 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one(body) for body in bodies))
+            return time.perf_counter() - started, latencies, statuses
+
+    # statements and commits issued by the app (and its consumer) per mode
+    counters = {"statements": 0, "commits": 0}
+
+    def count_statement(*_):
+        counters["statements"] += 1
+
+    def count_commit(*_):
+        counters["commits"] += 1
+
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", count_statement)
+        event.listen(target, "commit", count_commit)
+
+    rows = []
+    with standins.serve_app(app, lifespan="on") as base_url:
+        for name, path in (("sync read-modify-write (before)", "/bench/legacy-callback"),
+                           ("append-only + batch consumer", "/payments/mpesa/callback")):
+            reset()
+            counters.update(statements=0, commits=0)
+            elapsed, latencies, statuses = asyncio.run(replay(base_url, path))
+            acked = time.perf_counter()
+            while not settled() and time.perf_counter() - acked < 60:
+                time.sleep(0.05)
+            settle_after = time.perf_counter() - acked
+            statements, commits = counters["statements"], counters["commits"]
+            paid, orders_paid, stored = final_state()
+            rows.append({
+                "mode": name,
+                "acks_per_s": len(bodies) / elapsed,
+                **{k: v for k, v in common.summarize(latencies).items() if k != "count"},
+                "retryable": sum(count for status, count in statuses.items() if status != 200),
+                "db_statements": statements,
+                "db_commits": commits,
+                "settled_after_s": settle_after,
+                "paid": f"{paid}/{expected_paid}",
+                "orders_paid": orders_paid,
+                "stored": stored,
+                "statuses": statuses,
+            })
+    common.print_table(
+        f"{len(bodies)} callbacks ({args.payments} payments, {len(bodies) - args.payments} duplicates), "
+        f"concurrency {args.concurrency}",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Checkout correctness and latency: the set-based, single-transaction
+POST /orders/ versus the previous per-item read-modify-write path
+
+Two phases run for each path:
+- flash sale: many simultaneous single-item checkouts on a low-stock product;
+  fails (exit code 1) if the set-based path sells more than the stock, or
+  answers anything but 200 (sold) or 400 (out of stock)
+- latency: checkouts of multi-item carts against ample stock
+
+Usage: python -m benchmarks.bench_checkout --stock 25 --buyers 200 --cart-size 5
+"""
+import argparse
+import asyncio
+import sys
+
+from benchmarks import common
+
+CUSTOMER = {
+    "full_name": "Bench Buyer",
+    "email": "buyer@example.com",
+    "phone": "+254700000000",
+    "address": "1 Bench Road",
+    "city": "Nairobi",
+}
+
+
+def build_legacy_app():
+    """The checkout as it was: N reads, commit, N re-reads, decrement in Python, commit"""
+    import uuid
+    from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException
+    from sqlalchemy.orm import Session
+
+    from database import get_db
+    from models import Order, OrderItem, Product
+    from schemas import Order as OrderSchema, OrderCreate
+
+    app = FastAPI()
+
+    @app.post("/orders/", response_model=OrderSchema)
+    def create_order(order: OrderCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+        total_amount = 0
+        order_items = []
+        for item in order.items:
+            product = db.query(Product).filter(Product.id == item.product_id).first()
+            if not product:
+                raise HTTPException(status_code=404, detail="Product not found")
+            if product.stock_quantity < item.quantity:
+                raise HTTPException(status_code=400, detail="Insufficient stock")
+            total_amount += product.price * item.quantity
+            order_items.append({"product_id": product.id, "quantity": item.quantity, "price": product.price})
+
+        db_order = Order(order_number=f"SM{uuid.uuid4().hex[:8].upper()}", total_amount=total_amount, **CUSTOMER)
+        db.add(db_order)
+        db.commit()
+        db.refresh(db_order)
+
+        for item_data in order_items:
+            db.add(OrderItem(order_id=db_order.id, **item_data))
+            product = db.query(Product).filter(Product.id == item_data["product_id"]).first()
+            product.stock_quantity -= item_data["quantity"]
+        db.commit()
+        db.refresh(db_order)
+        return db_order
+
+    return app
+
+
+def set_stock(product_ids, stock):
+    from database import SessionLocal
+    from models import Product
+
+    db = SessionLocal()
+    try:
+        db.query(Product).filter(Product.id.in_(product_ids)).update(
+            {Product.stock_quantity: stock}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def sold_and_stock(product_id, since_order_id):
+    from sqlalchemy import func
+    from database import SessionLocal
+    from models import OrderItem, Product
+
+    db = SessionLocal()
+    try:
+        sold = (
+            db.query(func.coalesce(func.sum(OrderItem.quantity), 0))
+            .filter(OrderItem.product_id == product_id, OrderItem.order_id > since_order_id)
+            .scalar()
+        )
+        stock = db.query(Product.stock_quantity).filter(Product.id == product_id).scalar()
+        return sold, stock
+    finally:
+        db.close()
+
+
+def last_order_id():
+    from sqlalchemy import func
+    from database import SessionLocal
+    from models import Order
+
+    db = SessionLocal()
+    try:
+        return db.query(func.coalesce(func.max(Order.id), 0)).scalar()
+    finally:
+        db.close()
+
+
+async def run(args):
+    from main import app as current_app
+
+    apps = {"legacy": build_legacy_app(), "set-based": current_app}
+    hot_product = 1
+    cart = list(range(2, 2 + args.cart_size))
+    flash_rows, latency_rows = [], []
+    oversold_current, unexpected_current = 0, {}
+
+    for name, app in apps.items():
+        # flash sale on a single low-stock product
+        set_stock([hot_product], args.stock)
+        before = last_order_id()
+        body = {**CUSTOMER, "items": [{"product_id": hot_product, "quantity": 1}]}
+        elapsed, latencies, statuses = await common.drive(
+            app, "POST", "/orders/", args.buyers, args.buyers, json=body
+        )
+        sold, stock = sold_and_stock(hot_product, before)
+        oversold = max(0, sold - args.stock)
+        if name == "set-based":
+            oversold_current = oversold
+            unexpected_current = {status: n for status, n in statuses.items() if status not in (200, 400)}
+        flash_rows.append({
+            "path": name,
+            "stock": args.stock,
+            "orders_ok": statuses.get(200, 0),
+            "units_sold": sold,
+            "final_stock": stock,
+            "oversold": oversold,
+            "statuses": statuses,
+        })
+
+        # latency with multi-item carts and plenty of stock
+        set_stock(cart, 1_000_000)
+        body = {**CUSTOMER, "items": [{"product_id": pid, "quantity": 1} for pid in cart]}
+        elapsed, latencies, statuses = await common.drive(
+            app, "POST", "/orders/", args.requests, args.concurrency, json=body
+        )
+        stats = common.summarize(latencies)
+        latency_rows.append({
+            "path": name,
+            "orders/s": args.requests / elapsed,
+            "p50_ms": stats["p50_ms"],
+            "p95_ms": stats["p95_ms"],
+            "p99_ms": stats["p99_ms"],
+            "statuses": statuses,
+        })
+
+    common.print_table(f"Flash sale: {args.buyers} simultaneous buyers, 1 unit each", flash_rows)
+    common.print_table(
+        f"Checkout latency: {args.cart_size}-item carts, {args.requests} orders, concurrency {args.concurrency}",
+        latency_rows,
+    )
+    return oversold_current, unexpected_current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stock", type=int, default=25)
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--cart-size", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-checkout")
+    common.seed_products(max(10, args.cart_size + 2))
+    oversold, unexpected = asyncio.run(run(args))
+    if oversold:
+        print(f"\nFAIL: set-based checkout oversold by {oversold} units")
+    if unexpected:
+        print(f"\nFAIL: set-based checkout answered {unexpected} besides 200/400")
+    if oversold or unexpected:
+        sys.exit(1)
+    print("\nOK: no overselling and no errors on the set-based checkout path")
+
+
+if __name__ == "__main__":
+    main()
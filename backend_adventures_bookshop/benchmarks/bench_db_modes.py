@@ -0,0 +1,75 @@
+"""
+Requests/sec on GET /products/ with the sync session path (get_db, handler
+runs in the threadpool) versus the async session path (get_async_db)
+
+Usage: python -m benchmarks.bench_db_modes --products 500 --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+
+from benchmarks import common
+
+
+def build_apps():
+    from typing import List
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import Session, selectinload
+
+    from database import get_db
+    from models import Product as ProductModel
+    from routers import products
+    from schemas import Product as ProductSchema
+
+    sync_app = FastAPI()
+
+    @sync_app.get("/products/", response_model=List[ProductSchema])
+    def list_products_sync(db: Session = Depends(get_db)):
+        return (
+            db.query(ProductModel)
+            .options(selectinload(ProductModel.category))
+            .filter(ProductModel.is_active == True)
+            .all()
+        )
+
+    async_app = FastAPI()
+    async_app.include_router(products.router, prefix="/products")
+    return {"sync": sync_app, "async": async_app}
+
+
+async def run(args):
+    rows = []
+    for mode, app in build_apps().items():
+        # warm up connections and caches before measuring
+        await common.drive(app, "GET", "/products/", 20, 5)
+        elapsed, latencies, statuses = await common.drive(
+            app, "GET", "/products/", args.requests, args.concurrency
+        )
+        stats = common.summarize(latencies)
+        rows.append({
+            "mode": mode,
+            "req/s": args.requests / elapsed,
+            "p50_ms": stats["p50_ms"],
+            "p95_ms": stats["p95_ms"],
+            "p99_ms": stats["p99_ms"],
+            "statuses": statuses,
+        })
+    common.print_table(
+        f"GET /products/ - {args.products} products, {args.requests} requests, concurrency {args.concurrency}",
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-db-modes")
+    common.seed_products(args.products)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Memory and throughput of the streaming admin exports (GET /admin/orders/export
+and GET /admin/products/export) as the tables grow, against loading every
+order with its items and products into memory at once, as
+GET /admin/orders did before it was paginated and as a one-shot export would.
+
+For each scale in --scales the database is grown to that many orders and
+products (seed_orders / seed_products-style rows), then each export is read
+to the end through the ASGI app in-process, its body chunks counted and
+dropped the way a socket would take them: once timed, then again under
+tracemalloc for the peak memory it needed above what was already allocated.
+The in-memory load is measured the same way.
+
+Exits with status 1 if any export's peak at the largest scale is more than
+--max-growth times its peak at the smallest, i.e. memory that follows the
+table size instead of staying flat.
+
+Usage: python -m benchmarks.bench_exports --scales 10000,100000
+"""
+import argparse
+import asyncio
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlencode
+
+from benchmarks import common
+
+EXPORTS = [
+    ("orders csv", "/admin/orders/export", {"format": "csv"}),
+    ("orders ndjson", "/admin/orders/export", {"format": "ndjson"}),
+    ("products csv", "/admin/products/export", {"format": "csv"}),
+    ("products ndjson", "/admin/products/export", {"format": "ndjson"}),
+]
+
+
+async def read_export(app, path: str, params: dict, token: str):
+    """Run one GET through the ASGI app; returns (status, body bytes, lines) without keeping the body"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(params).encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    sent = {"status": None, "bytes": 0, "lines": 0}
+    request_sent = False
+    never = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await never.wait()  # the client never disconnects
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            sent["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            sent["bytes"] += len(body)
+            sent["lines"] += body.count(b"\n")
+
+    await app(scope, receive, send)
+    return sent
+
+
+def load_all_orders():
+    """Every order with its items and their products as ORM objects, the in-memory way"""
+    from sqlalchemy.orm import selectinload
+
+    from database import SessionLocal
+    from models import Order, OrderItem
+
+    with SessionLocal() as db:
+        orders = db.query(Order).options(selectinload(Order.order_items).selectinload(OrderItem.product)).all()
+        return {"status": 200, "bytes": 0, "lines": len(orders)}
+
+
+def grow_to(orders: int, products: int):
+    """Add products and orders until the database holds at least these many"""
+    from sqlalchemy import func, insert, select
+
+    from database import SessionLocal
+    from models import Order, Product
+
+    with SessionLocal() as db:
+        have_products = db.execute(select(func.count()).select_from(Product)).scalar()
+        rows = [
+            {"name": f"Export Item {i}", "slug": f"export-item-{i}", "description": f"Supplier item {i}",
+             "price": 100.0 + i % 500, "stock_quantity": 100, "is_active": True}
+            for i in range(have_products, products)
+        ]
+        for start in range(0, len(rows), 5000):
+            db.execute(insert(Product), rows[start:start + 5000])
+        db.commit()
+        have_orders = db.execute(select(func.count()).select_from(Order)).scalar()
+    if orders > have_orders:
+        common.seed_orders(orders - have_orders)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="10000,100000", help="comma-separated order counts")
+    parser.add_argument("--products-per-order", type=float, default=1.0, help="products at each scale, per order")
+    parser.add_argument("--max-growth", type=float, default=1.5, help="allowed peak memory ratio, largest/smallest scale")
+    parser.add_argument("--skip-in-memory", action="store_true", help="don't measure loading everything at once")
+    args = parser.parse_args()
+    scales = sorted(int(scale) for scale in args.scales.split(","))
+
+    common.use_temp_workdir("bench-exports")
+    import main as app_module
+    import setup_database
+    from routers.auth import create_access_token
+
+    setup_database.seed_data()
+    common.seed_products(100)
+    token = create_access_token({"sub": "admin@schoolmall.co.ke"})
+    app = app_module.app
+
+    cases = [(name, lambda path=path, params=params: read_export(app, path, params, token)) for name, path, params in EXPORTS]
+    if not args.skip_in_memory:
+        async def in_memory():
+            return load_all_orders()
+        cases.append(("orders, all in memory", in_memory))
+
+    async def measure(run):
+        started = time.perf_counter()
+        result = await run()
+        elapsed = time.perf_counter() - started
+        assert result["status"] == 200, result
+        tracemalloc.start()
+        try:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await run()
+            peak = tracemalloc.get_traced_memory()[1] - before
+        finally:
+            tracemalloc.stop()
+        return result, elapsed, peak
+
+    rows, peaks = [], {}
+    for scale in scales:
+        started = time.perf_counter()
+        grow_to(scale, int(scale * args.products_per_order))
+        print(f"  grew to {scale} orders in {time.perf_counter() - started:.0f} s")
+        for name, run in cases:
+            result, elapsed, peak = asyncio.run(measure(run))
+            peaks.setdefault(name, []).append(peak)
+            rows.append({
+                "orders": scale,
+                "case": name,
+                "lines": result["lines"],
+                "MiB_out": result["bytes"] / 2 ** 20,
+                "seconds": elapsed,
+                "lines_per_s": result["lines"] / elapsed,
+                "peak_MiB": peak / 2 ** 20,
+            })
+
+    common.print_table(f"exports read to the end, scales {scales}, peak = tracemalloc above the baseline", rows)
+    failures = []
+    for name, series in peaks.items():
+        growth = series[-1] / series[0]
+        flat = not name.startswith("orders, all in memory")
+        print(f"  {name}: peak x{growth:.2f} from {scales[0]} to {scales[-1]} orders"
+              + ("" if flat else " (not streamed, for comparison)"))
+        if flat and len(scales) > 1 and growth > args.max_growth:
+            failures.append(name)
+    if failures:
+        print(f"\n  FAIL: memory grows with the table for {', '.join(failures)} (over x{args.max_growth})")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
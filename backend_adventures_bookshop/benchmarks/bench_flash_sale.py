@@ -0,0 +1,360 @@
+"""
+End-to-end flash-sale load test: virtual shoppers browse the catalog, check
+out one of a few hot products (POST /orders/), start an M-Pesa payment
+(POST /payments/mpesa) and receive its callback, all against the app served
+by uvicorn in its own process, with the Daraja mock in benchmarks/standins.py
+standing in for M-Pesa (STK pushes answered after --mpesa-latency seconds,
+callbacks POSTed back after --callback-delay).
+
+Each concurrency level runs for --duration seconds with that many shoppers
+going round the flow without pause. Stock on the hot products is reset at
+the start of each level. After a level the run waits for every payment to be
+settled by the callbacks, then reports:
+- throughput: checkouts, completed payment starts and requests per second
+- latency per step (p50/p95/p99)
+- server errors, and lock errors ("database is locked", deadlocks, lock
+  timeouts) from the server log, in requests and in the background workers
+- oversells: units sold past the stock, stock that went negative, or
+  decrements that were lost
+- payments still pending, or disagreeing with their order, after the wait
+
+The capacity is the best checkout rate among the levels with no oversell, no
+lock errors, under 1% failed requests and checkout p99 within --slo-ms.
+Deployment settings (e.g. PAYMENT_CALLBACKS_IN_APP, METRICS_ENABLED) are read
+by the server from the environment as usual, and --workers sets the number of
+uvicorn processes, so runs can be compared one configuration at a time.
+Exits with status 1 on any oversell.
+
+Usage: python -m benchmarks.bench_flash_sale --concurrency 10,50,100 --duration 20 --workers 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import common, standins
+
+STEPS = ("browse", "product", "checkout", "pay")
+
+CUSTOMER = {
+    "full_name": "Flash Buyer",
+    "email": "buyer@example.com",
+    "phone": "0712345678",
+    "address": "1 Bench Road",
+    "city": "Nairobi",
+}
+
+# SQLite and Postgres wording for a statement that lost a lock wait
+LOCK_ERROR = re.compile(
+    r"database is locked|database table is locked|deadlock detected|could not obtain lock"
+    r"|could not serialize access|canceling statement due to lock timeout",
+    re.IGNORECASE,
+)
+
+
+def start_server(workdir: Path, port: int, workers: int, env: dict):
+    """uvicorn main:app in a child process, logging to server.log; returns (process, base URL, log path)"""
+    import httpx
+
+    log_path = workdir / "server.log"
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(common.BACKEND_DIR),
+            "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+            "--log-level", "warning", "--no-access-log",
+        ],
+        cwd=workdir, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited on startup:\n{log_path.read_text()}")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1).status_code == 200:
+                return process, base_url, log_path
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"server did not start within 60 s:\n{log_path.read_text()}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def count_lock_errors(log_text: str):
+    """(in requests, in background workers) from a stretch of the server log"""
+    in_requests = in_background = 0
+    in_worker = False  # whose traceback the following lines belong to
+    for line in log_text.splitlines():
+        if "batch failed" in line:  # utils/worker.py logs this, then the traceback
+            in_worker = True
+        elif "Exception in ASGI application" in line:  # uvicorn, for a request
+            in_worker = False
+        if line.startswith("sqlalchemy.exc.") and LOCK_ERROR.search(line):  # a traceback's last line
+            if in_worker:
+                in_background += 1
+            else:
+                in_requests += 1
+    return in_requests, in_background
+
+
+async def shop(base_url: str, concurrency: int, duration: float, hot_products, seed: int):
+    """`concurrency` shoppers going round browse, product, checkout, pay until time is up"""
+    import httpx
+
+    latencies = {step: [] for step in STEPS}
+    statuses = {step: {} for step in STEPS}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def step(name, method, path, **kwargs):
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError:
+                response, status = None, "error"
+            latencies[name].append(time.perf_counter() - started)
+            statuses[name][status] = statuses[name].get(status, 0) + 1
+            return response
+
+        async def shopper(rng, deadline):
+            while time.perf_counter() < deadline:
+                await step("browse", "GET", "/products/")
+                product_id = rng.choice(hot_products)
+                await step("product", "GET", f"/products/{product_id}")
+                quantity = rng.choice((1, 1, 1, 2))
+                order = await step("checkout", "POST", "/orders/", json={
+                    **CUSTOMER, "items": [{"product_id": product_id, "quantity": quantity}],
+                })
+                if order is None or order.status_code != 200:
+                    continue  # sold out, or failed
+                order = order.json()
+                await step("pay", "POST", "/payments/mpesa", json={
+                    "order_id": order["id"], "phone_number": CUSTOMER["phone"], "amount": order["total_amount"],
+                })
+
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(*(shopper(random.Random(seed + n), deadline) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", default="10,50,100", help="comma-separated numbers of shoppers")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per level")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--hot-products", type=int, default=3)
+    parser.add_argument("--stock", type=int, default=300, help="units of each hot product per level")
+    parser.add_argument("--mpesa-latency", type=float, default=0.2, help="seconds per Daraja API call")
+    parser.add_argument("--callback-delay", type=float, default=1.0, help="seconds from STK push to callback")
+    parser.add_argument("--failure-rate", type=float, default=0.1, help="payments the customer cancels")
+    parser.add_argument("--settle-timeout", type=float, default=60.0)
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="checkout p99 a level must stay within")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+    args.output = os.path.abspath(args.output) if args.output else None
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    workdir = common.use_temp_workdir("bench-flash-sale")
+    from sqlalchemy import func, select, update
+
+    import main as app_module  # noqa: F401  (tables, search index and triggers)
+    from database import SessionLocal, engine
+    from models import Order, OrderItem, Payment, PaymentStatus, Product
+
+    common.seed_products(args.products)
+    with SessionLocal() as db:
+        hot_products = db.execute(
+            select(Product.id).order_by(Product.id).limit(args.hot_products)
+        ).scalars().all()
+
+    def reset_stock():
+        with SessionLocal() as db:
+            db.execute(update(Product).where(Product.id.in_(hot_products)).values(stock_quantity=args.stock))
+            db.commit()
+            return (
+                db.execute(select(func.coalesce(func.max(Order.id), 0))).scalar(),
+                db.execute(select(func.coalesce(func.max(Payment.id), 0))).scalar(),
+            )
+
+    def pending_payments(since_payment):
+        with SessionLocal() as db:
+            return db.execute(
+                select(func.count()).where(Payment.id > since_payment, Payment.status == PaymentStatus.pending)
+            ).scalar()
+
+    def audit(since_order, since_payment):
+        """Oversells and payment outcomes for the orders and payments made since the given ids"""
+        with SessionLocal() as db:
+            sold = dict(db.execute(
+                select(OrderItem.product_id, func.sum(OrderItem.quantity))
+                .where(OrderItem.order_id > since_order, OrderItem.product_id.in_(hot_products))
+                .group_by(OrderItem.product_id)
+            ).all())
+            stock = dict(db.execute(
+                select(Product.id, Product.stock_quantity).where(Product.id.in_(hot_products))
+            ).all())
+            payments = dict(db.execute(
+                select(Payment.status, func.count()).where(Payment.id > since_payment).group_by(Payment.status)
+            ).all())
+            mismatched = db.execute(
+                select(func.count()).select_from(Payment).join(Order, Order.id == Payment.order_id)
+                .where(Payment.id > since_payment, Payment.status != Order.payment_status)
+            ).scalar()
+        return {
+            "units_sold": sum(sold.values()),
+            "oversold": sum(max(0, sold.get(pid, 0) - args.stock) for pid in hot_products),
+            "negative_stock": sum(1 for pid in hot_products if stock[pid] < 0),
+            "lost_decrements": sum(1 for pid in hot_products if args.stock - sold.get(pid, 0) != stock[pid]),
+            "paid": payments.get(PaymentStatus.completed, 0),
+            "failed": payments.get(PaymentStatus.failed, 0),
+            "pending": payments.get(PaymentStatus.pending, 0),
+            "mismatched": mismatched,
+        }
+
+    # the server gets its own connections
+    engine.dispose()
+    daraja = standins.daraja_app(
+        latency=args.mpesa_latency, failure_rate=args.failure_rate, callback_delay=args.callback_delay,
+    )
+    results = []
+    with standins.serve_app(daraja) as daraja_url:
+        port = standins.free_port()
+        process, base_url, log_path = start_server(workdir, port, args.workers, {
+            "MPESA_BASE_URL": daraja_url,
+            "MPESA_CALLBACK_URL": f"http://127.0.0.1:{port}/payments/mpesa/callback",
+            "MPESA_CONSUMER_KEY": "bench",
+            "MPESA_CONSUMER_SECRET": "bench",
+            "MPESA_PASSKEY": "bench",
+            "OUTBOX_DISPATCH_IN_APP": "false",  # notifications stay queued; no mail leaves a load test
+        })
+        try:
+            for concurrency in levels:
+                since_order, since_payment = reset_stock()
+                log_offset = log_path.stat().st_size
+                elapsed, latencies, statuses = asyncio.run(
+                    shop(base_url, concurrency, args.duration, hot_products, args.seed)
+                )
+                waited = time.perf_counter()
+                while pending_payments(since_payment) and time.perf_counter() - waited < args.settle_timeout:
+                    time.sleep(0.2)
+                settle_s = time.perf_counter() - waited
+                with open(log_path) as log:
+                    log.seek(log_offset)
+                    lock_errors, lock_errors_background = count_lock_errors(log.read())
+
+                requests = sum(sum(by_status.values()) for by_status in statuses.values())
+                failed = sum(
+                    count for by_status in statuses.values() for status, count in by_status.items()
+                    if status == "error" or status >= 500
+                )
+                checkouts = statuses["checkout"].get(200, 0)
+                result = {
+                    "concurrency": concurrency,
+                    "seconds": elapsed,
+                    "requests": requests,
+                    "requests_per_s": requests / elapsed,
+                    "checkouts_per_s": checkouts / elapsed,
+                    "payments_per_s": statuses["pay"].get(200, 0) / elapsed,
+                    "checkouts": checkouts,
+                    "sold_out": statuses["checkout"].get(400, 0),
+                    "failed_requests": failed,
+                    "lock_errors": lock_errors,
+                    "lock_errors_background": lock_errors_background,
+                    "settle_s": settle_s,
+                    **audit(since_order, since_payment),
+                    "latency_ms": {step: common.summarize(latencies[step]) for step in STEPS},
+                    "statuses": {step: {str(k): v for k, v in statuses[step].items()} for step in STEPS},
+                }
+                result["clean"] = (
+                    not result["oversold"] and not result["negative_stock"] and not result["lost_decrements"]
+                    and not lock_errors and not lock_errors_background
+                    and failed <= 0.01 * requests
+                    and result["latency_ms"]["checkout"].get("p99_ms", 0) <= args.slo_ms
+                )
+                results.append(result)
+                print(f"  {concurrency} shoppers: {checkouts} checkouts, {failed} failed requests, "
+                      f"{lock_errors + lock_errors_background} lock errors, {result['oversold']} oversold")
+        finally:
+            stop_server(process)
+
+    database = engine.dialect.name
+    common.print_table(
+        f"{args.duration:.0f} s per level, {args.workers} uvicorn worker(s) on {database}, "
+        f"{len(hot_products)} hot products x {args.stock} units",
+        [{
+            "shoppers": r["concurrency"],
+            "checkouts/s": r["checkouts_per_s"],
+            "payments/s": r["payments_per_s"],
+            "requests/s": r["requests_per_s"],
+            "sold_out": r["sold_out"],
+            "failed": r["failed_requests"],
+            "lock_err": r["lock_errors"],
+            "lock_err_bg": r["lock_errors_background"],
+            "oversold": r["oversold"],
+            "lost_decr": r["lost_decrements"],
+            "settle_s": r["settle_s"],
+            "paid/failed/pending": f"{r['paid']}/{r['failed']}/{r['pending']}",
+            "mismatched": r["mismatched"],
+        } for r in results],
+    )
+    common.print_table("Latency by step, ms (p50 / p95 / p99)", [
+        {"shoppers": r["concurrency"], **{
+            step: (f"{r['latency_ms'][step]['p50_ms']:.0f} / {r['latency_ms'][step]['p95_ms']:.0f} / "
+                   f"{r['latency_ms'][step]['p99_ms']:.0f}") if r["latency_ms"][step]["count"] else "-"
+            for step in STEPS
+        }}
+        for r in results
+    ])
+
+    clean = [r for r in results if r["clean"]]
+    if clean:
+        best = max(clean, key=lambda r: r["checkouts_per_s"])
+        capacity = {"checkouts_per_s": best["checkouts_per_s"], "concurrency": best["concurrency"]}
+        print(f"\n  capacity: {best['checkouts_per_s']:.1f} checkouts/s at {best['concurrency']} shoppers "
+              f"(no oversell or lock errors, <1% failed, checkout p99 <= {args.slo_ms:.0f} ms)")
+    else:
+        capacity = None
+        print("\n  capacity: no level was clean")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({
+            "revision": common.git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": database,
+            "workers": args.workers,
+            "settings": vars(args),
+            "capacity": capacity,
+            "levels": results,
+        }, indent=2, default=str))
+        print(f"  results written to {args.output}")
+
+    oversold = sum(r["oversold"] + r["negative_stock"] + r["lost_decrements"] for r in results)
+    if oversold:
+        print(f"\nFAIL: stock oversold or decrements lost ({oversold})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Throughput of the image garbage collector (services/image_gc.py) on a large
+synthetic static/images tree: a share of the files is referenced by products,
+the rest are old orphans. Each run recreates the tree, so serial and
+parallel deletion see the same work.
+
+Usage: python -m benchmarks.bench_image_gc --files 200000 --referenced 0.5 --workers 1 16
+"""
+import argparse
+import os
+import time
+
+from benchmarks import common
+
+
+def build_tree(image_dir: str, files: int, old: float):
+    variants_dir = os.path.join(image_dir, "variants")
+    os.makedirs(variants_dir, exist_ok=True)
+    payload = b"x" * 512
+    for i in range(1, files + 1):
+        # every fourth file lives in the variants folder to exercise the walk
+        folder = variants_dir if i % 4 == 0 else image_dir
+        path = os.path.join(folder, f"bench-{i}.jpg")
+        with open(path, "wb") as handle:
+            handle.write(payload)
+        os.utime(path, (old, old))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--referenced", type=float, default=0.5, help="share of files products point at")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 16])
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-image-gc")
+    from sqlalchemy import text
+
+    from database import engine
+    from services import image_gc
+    from utils.uploads import IMAGE_DIR
+
+    referenced = int(args.files * args.referenced)
+    # referenced files are the ones outside variants/, so bare product filenames resolve
+    product_files = [i for i in range(1, args.files + 1) if i % 4 != 0][:referenced]
+    common.seed_products(len(product_files))
+    with engine.begin() as connection:
+        ids = [row[0] for row in connection.execute(text("SELECT id FROM products ORDER BY id"))]
+        connection.execute(
+            text("UPDATE products SET image = :image WHERE id = :id"),
+            [{"id": product_id, "image": f"bench-{i}.jpg"} for product_id, i in zip(ids, product_files)],
+        )
+
+    old = time.time() - 2 * image_gc.GRACE_SECONDS
+    rows = []
+    for mode, workers in [("dry-run", args.workers[0])] + [("delete", w) for w in args.workers]:
+        build_tree(IMAGE_DIR, args.files, old)
+        started = time.perf_counter()
+        report = image_gc.collect_garbage(engine, dry_run=mode == "dry-run", workers=workers)
+        elapsed = time.perf_counter() - started
+        rows.append({
+            "mode": mode,
+            "workers": workers,
+            "scanned": report.scanned,
+            "removed": report.deleted,
+            "refs_s": report.timings["references"],
+            "scan_s": report.timings["scan"],
+            "delete_s": report.timings["delete"],
+            "files_per_s": report.scanned / elapsed,
+        })
+    common.print_table(f"Image GC over {args.files} files ({referenced} referenced)", rows)
+
+
+if __name__ == "__main__":
+    main()
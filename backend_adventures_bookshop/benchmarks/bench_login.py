@@ -0,0 +1,92 @@
+"""
+Admin login throughput under a burst: the old sync endpoint (bcrypt verify
+inline on a request thread) versus the bounded password pool in
+services/passwords.py at a few pool sizes, plus one run with the default
+queue limit to show load shedding (503s) instead of unbounded queueing.
+While the burst runs, a probe keeps calling a cheap sync endpoint to show
+whether logins are starving the request threadpool.
+
+Usage: python -m benchmarks.bench_login --requests 200 --concurrency 32 --rounds 10
+"""
+import argparse
+import asyncio
+import os
+
+from benchmarks import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--probe-path", default="/admin/hero-banners", help="cheap sync GET")
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-login")
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    from fastapi import Depends, HTTPException
+    from sqlalchemy.orm import Session
+
+    import main as app_module
+    import setup_database
+    from config import settings
+    from database import get_db
+    from routers import auth
+    from schemas import UserLogin
+    from services import passwords
+
+    setup_database.seed_data()
+    app = app_module.app
+
+    def legacy_login(user_login: UserLogin, db: Session = Depends(get_db)):
+        # the previous endpoint: sync, bcrypt inline on a threadpool thread
+        user = auth.get_user_by_email(db, user_login.email)
+        if not user or not passwords.pwd_context.verify(user_login.password, user.hashed_password):
+            raise HTTPException(status_code=401)
+        return {"access_token": auth.create_access_token({"sub": user.email})}
+
+    app.post("/bench/legacy-login")(legacy_login)
+    body = {"json": {"email": "admin@schoolmall.co.ke", "password": "admin123"}}
+
+    runs = [("inline (before)", "/bench/legacy-login", None, 10_000)]
+    runs += [(f"pool x{w}", "/auth/login", w, 10_000) for w in args.workers]
+    runs += [(f"pool x{args.workers[-1]}, limit {settings.PASSWORD_HASH_MAX_PENDING}",
+              "/auth/login", args.workers[-1], settings.PASSWORD_HASH_MAX_PENDING)]
+
+    rows = []
+    for name, path, workers, max_pending in runs:
+        passwords.shutdown()
+        if workers:
+            settings.PASSWORD_HASH_WORKERS = workers
+        settings.PASSWORD_HASH_MAX_PENDING = max_pending
+
+        async def burst():
+            login = asyncio.create_task(
+                common.drive(app, "POST", path, args.requests, args.concurrency, **body)
+            )
+            probe_latencies = []
+            while not login.done():
+                _, latencies, _ = await common.drive(app, "GET", args.probe_path, 1, 1)
+                probe_latencies += latencies
+                await asyncio.sleep(0.05)
+            return await login, probe_latencies
+
+        (elapsed, latencies, statuses), probe_latencies = asyncio.run(burst())
+        ok = statuses.get(200, 0)
+        rows.append({
+            "mode": name,
+            "logins_per_s": ok / elapsed,
+            **{k: v for k, v in common.summarize(latencies).items() if k != "count"},
+            "probe_p50_ms": common.summarize(probe_latencies).get("p50_ms", 0.0),
+            "statuses": statuses,
+        })
+    passwords.shutdown()
+    common.print_table(
+        f"{args.requests} logins, concurrency {args.concurrency}, bcrypt cost {args.rounds}", rows
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+What the request metrics in utils/metrics.py cost per request: the app with
+no metrics, with MetricsMiddleware alone, and with the middleware plus the
+engine query hooks, against the same middleware written as a
+BaseHTTPMiddleware for comparison.
+Requests are sent straight to the ASGI app one at a time (no HTTP client or
+server in the way, so the difference is the middleware's own cost), with the
+variants interleaved round by round so drift affects them all alike. Also
+times rendering /metrics with a series for every route.
+
+Usage: python -m benchmarks.bench_metrics --requests 2000 --rounds 5
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks import common
+
+ROUTES = [
+    ("GET", "/", b"", "no database"),
+    ("GET", "/products/search", b"q=mathematics&limit=20", "1 statement"),
+    ("GET", "/admin/dashboard", b"", "sync route, ~3 statements"),
+]
+
+
+def request_scope(method, path, query_string, headers):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http",
+        "method": method, "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query_string, "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+
+
+async def call(app, scope):
+    """One request against an ASGI app; returns the response status"""
+    status = None
+    requested = False
+    done = asyncio.Event()
+
+    async def receive():
+        # the body once, then (like a server) nothing until the response is sent
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    await app(dict(scope), receive, send)
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="per variant, route and round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-metrics")
+    from starlette.middleware import Middleware
+    from starlette.middleware.base import BaseHTTPMiddleware
+
+    import main as app_module
+    import setup_database
+    from database import async_engine, engine
+    from routers.auth import create_access_token
+    from utils import metrics
+
+    common.seed_products(2000)
+    setup_database.seed_data()
+    app = app_module.app
+    admin_token = create_access_token({"sub": "admin@schoolmall.co.ke"})
+    headers = [(b"authorization", f"Bearer {admin_token}".encode())]
+
+    class BaseHTTPMetrics(BaseHTTPMiddleware):
+        # the same measurements as MetricsMiddleware, through BaseHTTPMiddleware
+        async def dispatch(self, request, call_next):
+            started = time.perf_counter()
+            db = metrics.DBUsage()
+            token = metrics._request_db.set(db)
+            try:
+                response = await call_next(request)
+            finally:
+                metrics._request_db.reset(token)
+            metrics.registry.observe_request(
+                request.method, metrics.route_label(request.scope), response.status_code,
+                time.perf_counter() - started, db,
+            )
+            return response
+
+    without = [m for m in app.user_middleware if m.cls is not metrics.MetricsMiddleware]
+    variants = {
+        "no metrics": (without, False),
+        "middleware only": (without + [Middleware(metrics.MetricsMiddleware)], False),
+        "middleware + query hooks": (without + [Middleware(metrics.MetricsMiddleware)], True),
+        "BaseHTTPMiddleware + query hooks": (without + [Middleware(BaseHTTPMetrics)], True),
+    }
+    stacks = {}
+    for name, (middleware, _) in variants.items():
+        app.user_middleware = middleware
+        stacks[name] = app.build_middleware_stack()
+
+    def hooks(enabled):
+        for target in (engine, async_engine.sync_engine):
+            (metrics.install if enabled else metrics.uninstall)(target)
+
+    async def run():
+        per_request = {(name, route[1]): [] for name in variants for route in ROUTES}
+        for _ in range(args.rounds):
+            for name, (_, with_hooks) in variants.items():
+                hooks(with_hooks)
+                stack = stacks[name]
+                for method, path, query_string, _ in ROUTES:
+                    scope = request_scope(method, path, query_string, headers)
+                    assert await call(stack, scope) == 200, (name, path)
+                    started = time.perf_counter()
+                    for _ in range(args.requests):
+                        await call(stack, scope)
+                    per_request[(name, path)].append((time.perf_counter() - started) / args.requests)
+        return per_request
+
+    per_request = asyncio.run(run())
+    rows = []
+    for method, path, _, note in ROUTES:
+        baseline = statistics.median(per_request[("no metrics", path)])
+        for name in variants:
+            value = statistics.median(per_request[(name, path)])
+            rows.append({
+                "route": f"{method} {path}",
+                "": note,
+                "variant": name,
+                "us_per_request": value * 1e6,
+                "overhead_us": (value - baseline) * 1e6,
+                "overhead_pct": (value - baseline) / baseline * 100,
+            })
+    common.print_table(
+        f"Median of {args.rounds} rounds x {args.requests} sequential requests, called in-process",
+        rows,
+    )
+
+    # one series per route the app has, as a long-running process would
+    for route in app.routes:
+        for method in getattr(route, "methods", None) or ["GET"]:
+            metrics.registry.observe_request(method, route.path, 200, 0.01, metrics.DBUsage())
+    started = time.perf_counter()
+    for _ in range(100):
+        body = metrics.registry.render()
+    print(f"\n  /metrics render: {(time.perf_counter() - started) * 10:.2f} ms "
+          f"({len(metrics.registry.routes)} routes, {len(body.splitlines())} lines, {len(body) / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
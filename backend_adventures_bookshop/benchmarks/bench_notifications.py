@@ -0,0 +1,261 @@
+"""
+Order notifications through the outbox (services/outbox.py), against the
+local SMTP and WhatsApp stand-ins in benchmarks/standins.py.
+
+Dispatch throughput: messages/s draining a pre-filled outbox with a new
+connection per message versus batched claims over one SMTP connection and
+one HTTP pool, plus a run with injected transient failures to exercise
+the retry path (backoff set to zero so retries are due at once).
+
+Checkout latency: POST /orders/ with notifications off, queued in the outbox
+with the in-app dispatcher delivering them concurrently, and sent inline
+before responding (what calling the SMTP/WhatsApp APIs from the endpoint
+would cost).
+
+Usage: python -m benchmarks.bench_notifications --messages 3000 --orders 300 --concurrency 10
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common, standins
+
+CUSTOMER = {
+    "full_name": "Bench Buyer",
+    "email": "buyer@example.com",
+    "phone": "0712345678",
+    "address": "1 Bench Road",
+    "city": "Nairobi",
+}
+
+
+class PerMessageSMTP:
+    """New SMTP connection for every message (what fastapi-mail's send_message does)"""
+
+    async def send(self, recipient, subject, body):
+        import aiosmtplib
+        from email.message import EmailMessage
+        from config import settings
+
+        message = EmailMessage()
+        message["From"], message["To"], message["Subject"] = settings.MAIL_FROM, recipient, subject
+        message.set_content(body)
+        await aiosmtplib.send(message, hostname=settings.MAIL_SERVER, port=settings.MAIL_PORT, start_tls=False)
+
+    async def close(self):
+        pass
+
+
+class PerMessageWhatsApp:
+    """New HTTP client (and connection) for every message"""
+
+    async def send(self, recipient, body):
+        from services.whatsapp_service import WhatsAppSender
+
+        sender = WhatsAppSender()
+        try:
+            await sender.send(recipient, body)
+        finally:
+            await sender.close()
+
+    async def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=3000)
+    parser.add_argument("--orders", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--smtp-latency", type=float, default=0.002, help="seconds per SMTP reply")
+    parser.add_argument("--http-latency", type=float, default=0.05, help="seconds per WhatsApp call")
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-notifications")
+    from fastapi import BackgroundTasks, Depends
+    from sqlalchemy import delete, func, insert, select
+    from sqlalchemy.orm import Session
+
+    import main as app_module
+    from config import settings
+    from database import AsyncSessionLocal, SessionLocal, get_db
+    from models import OutboxMessage, Product
+    from routers import orders
+    from schemas import Order as OrderSchema, OrderCreate
+    from services import email_service, outbox, whatsapp_service
+
+    common.seed_products(200)
+    app = app_module.app
+    wa_app = standins.whatsapp_app(latency=args.http_latency)
+
+    def reset_outbox(count=0):
+        rows = [
+            {"channel": "whatsapp", "recipient": f"07{i:07d}1", "body": "Your order is on its way"}
+            if i % 3 == 2 else
+            {"channel": "email", "recipient": f"customer{i}@example.com", "subject": "Order received",
+             "body": "Thank you for your order.\n" * 10}
+            for i in range(count)
+        ]
+        with SessionLocal() as db:
+            db.execute(delete(OutboxMessage))
+            if rows:
+                db.execute(insert(OutboxMessage), rows)
+            db.commit()
+
+    async def outbox_counts():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(OutboxMessage.status, func.count()).group_by(OutboxMessage.status))
+            return {status.value: count for status, count in result.all()}
+
+    with standins.SMTPStandIn(latency=args.smtp_latency) as smtp, standins.serve_app(wa_app) as wa_url:
+        settings.MAIL_SERVER, settings.MAIL_PORT, settings.MAIL_STARTTLS = "127.0.0.1", smtp.port, False
+        settings.MAIL_USERNAME = settings.MAIL_PASSWORD = ""
+        settings.ADMIN_NOTIFICATION_EMAIL = "admin@example.com"
+        settings.WHATSAPP_TOKEN, settings.WHATSAPP_PHONE_NUMBER_ID = "bench-token", "1234567890"
+        settings.WHATSAPP_API_URL = wa_url
+        settings.OUTBOX_BACKOFF_SECONDS = 0
+
+        def counters():
+            return smtp.connections, smtp.messages, len(wa_app.state.stats["connections"]), wa_app.state.stats["messages"]
+
+        # --- dispatch throughput ---
+        modes = [
+            ("per message, batch 1", 1, PerMessageSMTP, PerMessageWhatsApp, 0.0),
+            ("per message, batch 100", 100, PerMessageSMTP, PerMessageWhatsApp, 0.0),
+            ("pooled, batch 100", 100, None, None, 0.0),
+            (f"pooled, {args.failure_rate:.0%} transient failures", 100, None, None, args.failure_rate),
+        ]
+        rows = []
+        for name, batch_size, smtp_class, wa_class, failure_rate in modes:
+            reset_outbox(args.messages)
+            smtp.transient_failure_rate = failure_rate
+            wa_app.state.stats["connections"] = set()
+            before = counters()
+            dispatcher = outbox.Dispatcher(
+                batch_size=batch_size,
+                email_sender=smtp_class() if smtp_class else None,
+                whatsapp_sender=wa_class() if wa_class else None,
+            )
+
+            async def drain():
+                started = time.perf_counter()
+                await dispatcher.drain()
+                elapsed = time.perf_counter() - started
+                await dispatcher.close()
+                return elapsed
+
+            elapsed = asyncio.run(drain())
+            after = counters()
+            rows.append({
+                "mode": name,
+                "msgs_per_s": args.messages / elapsed,
+                "seconds": elapsed,
+                "smtp_conns": after[0] - before[0],
+                "http_conns": after[2],
+                "sent": dispatcher.stats["sent"],
+                "retried": dispatcher.stats["retried"],
+                "failed": dispatcher.stats["failed"],
+            })
+        smtp.transient_failure_rate = 0.0
+        common.print_table(
+            f"Draining {args.messages} messages (2/3 email, 1/3 WhatsApp; "
+            f"SMTP reply {args.smtp_latency * 1000:.0f} ms, WhatsApp call {args.http_latency * 1000:.0f} ms)",
+            rows,
+        )
+
+        # --- checkout latency ---
+        def inline_order(order: OrderCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+            # notifications sent before responding, each with its own connection
+            import smtplib
+            import httpx
+            from email.message import EmailMessage
+
+            created = orders.create_order(order, background_tasks, db)
+            lines = [(item.product.name, item.quantity, item.price) for item in created.order_items]
+            with smtplib.SMTP(settings.MAIL_SERVER, settings.MAIL_PORT) as client:
+                for recipient, (subject, body) in (
+                    (created.email, email_service.order_confirmation(created, lines)),
+                    (settings.ADMIN_NOTIFICATION_EMAIL, email_service.admin_order_notification(created, lines)),
+                ):
+                    message = EmailMessage()
+                    message["From"], message["To"], message["Subject"] = settings.MAIL_FROM, recipient, subject
+                    message.set_content(body)
+                    client.send_message(message)
+            httpx.post(
+                f"{settings.WHATSAPP_API_URL}/{settings.WHATSAPP_PHONE_NUMBER_ID}/messages",
+                json={"messaging_product": "whatsapp", "to": whatsapp_service.normalize_phone(created.phone),
+                      "type": "text", "text": {"body": whatsapp_service.order_message(created)}},
+            ).raise_for_status()
+            return created
+
+        app.post("/bench/inline-order", response_model=OrderSchema)(inline_order)
+
+        with SessionLocal() as db:
+            product_ids = [p for (p,) in db.execute(select(Product.id))]
+
+        def bodies():
+            for i in range(args.orders):
+                yield {**CUSTOMER, "items": [
+                    {"product_id": product_ids[i % len(product_ids)], "quantity": 1},
+                    {"product_id": product_ids[(i * 7 + 3) % len(product_ids)], "quantity": 1},
+                ]}
+
+        async def checkout(path, with_dispatcher):
+            if with_dispatcher:
+                await outbox.start()
+            payloads = bodies()
+            latencies, statuses = [], {}
+            semaphore = asyncio.Semaphore(args.concurrency)
+            import httpx
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                async def one(payload):
+                    async with semaphore:
+                        started = time.perf_counter()
+                        response = await client.post(path, json=payload)
+                        latencies.append(time.perf_counter() - started)
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(one(payload) for payload in payloads))
+                elapsed = time.perf_counter() - started
+
+            drained = 0.0
+            if with_dispatcher:
+                drain_started = time.perf_counter()
+                while (await outbox_counts()).get("pending"):
+                    await asyncio.sleep(0.05)
+                drained = time.perf_counter() - drain_started
+                await outbox.stop()
+            return elapsed, latencies, statuses, drained
+
+        runs = [
+            ("notifications off", "/orders/", False, False),
+            ("outbox + dispatcher", "/orders/", True, True),
+            ("inline send", "/bench/inline-order", False, False),
+        ]
+        rows = []
+        for name, path, enabled, with_dispatcher in runs:
+            reset_outbox()
+            settings.NOTIFICATIONS_ENABLED = enabled
+            before = counters()
+            elapsed, latencies, statuses, drained = asyncio.run(checkout(path, with_dispatcher))
+            after = counters()
+            counts = asyncio.run(outbox_counts())
+            rows.append({
+                "mode": name,
+                "orders_per_s": args.orders / elapsed,
+                **{k: v for k, v in common.summarize(latencies).items() if k != "count"},
+                "delivered": (after[1] - before[1]) + (after[3] - before[3]),
+                "drain_after_s": drained,
+                "outbox": counts or "-",
+                "statuses": statuses,
+            })
+        common.print_table(
+            f"{args.orders} checkouts, concurrency {args.concurrency}, 3 notifications per order", rows
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Order list loading: the old `lazy="joined"` relationships serialized with the
+full nested Order schema, versus the per-query strategies in routers/orders.py
+(summary list with a correlated item count, and the selectin detail shape).
+Reports SQL statements, rows and bytes coming back from the database, and
+the time to load and serialize one page.
+
+Usage: python -m benchmarks.bench_order_loading --orders 20000 --page-size 200
+"""
+import argparse
+import time
+
+from benchmarks import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--products", type=int, default=2_000)
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-order-loading")
+    from sqlalchemy import event, text
+    from sqlalchemy.orm import joinedload
+
+    from database import SessionLocal, engine
+    from models import Order, OrderItem, Product
+    from routers.orders import ORDER_DETAIL_OPTIONS, ORDER_SUMMARY_OPTIONS
+    from schemas import Order as OrderSchema, OrderSummary, Page
+    from utils.pagination import make_page, paginate
+
+    common.seed_products(args.products)
+    with engine.begin() as connection:
+        # realistic description sizes, which the joined load repeats per line item
+        connection.execute(text("UPDATE products SET description = description || :pad"), {"pad": " lorem ipsum" * 60})
+    common.seed_orders(args.orders)
+
+    modes = {
+        "joined (before)": ((joinedload(Order.order_items).joinedload(OrderItem.product),), Page[OrderSchema]),
+        "selectin detail": (ORDER_DETAIL_OPTIONS, Page[OrderSchema]),
+        "summary (after)": (ORDER_SUMMARY_OPTIONS, Page[OrderSummary]),
+    }
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    def load_page(db, options, schema):
+        query = paginate(db.query(Order).options(*options), Order, None, args.page_size)
+        return schema.model_validate(make_page(query.all(), args.page_size)).model_dump_json()
+
+    rows = []
+    for name, (options, schema) in modes.items():
+        # one captured run to count what the database sends back
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", capture)
+        db = SessionLocal()
+        body = load_page(db, options, schema)
+        db.close()
+        event.remove(engine, "before_cursor_execute", capture)
+
+        fetched_rows = fetched_bytes = 0
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            for statement, parameters in statements:
+                cursor.execute(statement, parameters)
+                for row in cursor.fetchall():
+                    fetched_rows += 1
+                    fetched_bytes += sum(len(str(value)) for value in row if value is not None)
+        finally:
+            raw.close()
+
+        latencies = []
+        for _ in range(args.repeat):
+            db = SessionLocal()
+            started = time.perf_counter()
+            load_page(db, options, schema)
+            latencies.append(time.perf_counter() - started)
+            db.close()
+        stats = common.summarize(latencies)
+        rows.append({
+            "mode": name,
+            "queries": len(statements),
+            "db_rows": fetched_rows,
+            "db_kib": fetched_bytes / 1024,
+            "json_kib": len(body) / 1024,
+            "p50_ms": stats["p50_ms"],
+            "p95_ms": stats["p95_ms"],
+        })
+    common.print_table(
+        f"One page of {args.page_size} orders ({args.orders} orders, {args.products} products)", rows
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+STK push initiation (POST /payments/mpesa) against the local Daraja mock in
+benchmarks/standins.py: the previous shape (sync endpoint, a fresh OAuth
+token and new connections via `requests` on every call) versus the shared
+httpx client with the cached, single-flight token in services/mpesa.py.
+Also counts token requests when many callers hit a cold token cache at once.
+
+Usage: python -m benchmarks.bench_payments --requests 500 --concurrency 20 --latency 0.03
+"""
+import argparse
+import asyncio
+
+from benchmarks import common, standins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.03, help="seconds per Daraja call")
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-payments")
+    import base64
+    import json
+
+    import requests
+    from fastapi import Depends, HTTPException
+    from sqlalchemy import select
+    from sqlalchemy.orm import Session
+
+    import main as app_module
+    from config import settings
+    from database import SessionLocal, get_db
+    from models import Order, Payment
+    from schemas import PaymentCreate
+    from services import mpesa
+
+    common.seed_products(100)
+    common.seed_orders(args.requests)
+    with SessionLocal() as db:
+        order_ids = [order_id for (order_id,) in db.execute(select(Order.id))]
+    app = app_module.app
+    daraja = standins.daraja_app(latency=args.latency)
+
+    def legacy_initiate(payment: PaymentCreate, db: Session = Depends(get_db)):
+        # the previous flow: new token and new connections for every push
+        order = db.query(Order).filter(Order.id == payment.order_id).first()
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        credentials = base64.b64encode(f"{settings.MPESA_CONSUMER_KEY}:{settings.MPESA_CONSUMER_SECRET}".encode()).decode()
+        token = requests.get(
+            f"{settings.MPESA_BASE_URL}/oauth/v1/generate?grant_type=client_credentials",
+            headers={"Authorization": f"Basic {credentials}"},
+        ).json()["access_token"]
+        result = requests.post(
+            f"{settings.MPESA_BASE_URL}/mpesa/stkpush/v1/processrequest",
+            json={"PhoneNumber": payment.phone_number, "Amount": order.total_amount},
+            headers={"Authorization": f"Bearer {token}"},
+        ).json()
+        db.add(Payment(order_id=order.id, transaction_id=result["CheckoutRequestID"], payment_method="mpesa",
+                       amount=order.total_amount, provider_response=json.dumps(result)))
+        db.commit()
+        return {"success": True, "checkout_request_id": result["CheckoutRequestID"]}
+
+    app.post("/bench/legacy-mpesa")(legacy_initiate)
+
+    async def burst(path):
+        payloads = iter(order_ids)
+
+        # common.drive sends one body for all requests; each push needs its own order
+        async def run():
+            import httpx
+            import time
+
+            latencies, statuses = [], {}
+            semaphore = asyncio.Semaphore(args.concurrency)
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                async def one(order_id):
+                    async with semaphore:
+                        started = time.perf_counter()
+                        response = await client.post(path, json={
+                            "order_id": order_id, "phone_number": "0712345678", "amount": 1,
+                        })
+                        latencies.append(time.perf_counter() - started)
+                        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+                started = time.perf_counter()
+                await asyncio.gather(*(one(order_id) for order_id in payloads))
+                return time.perf_counter() - started, latencies, statuses
+
+        try:
+            return await run()
+        finally:
+            await mpesa.shutdown()
+
+    async def cold_token(callers):
+        client = mpesa.MpesaClient()
+        try:
+            await asyncio.gather(*(client.get_token() for _ in range(callers)))
+            return client.token_refreshes
+        finally:
+            await client.close()
+
+    with standins.serve_app(daraja) as daraja_url:
+        settings.MPESA_BASE_URL = daraja_url
+        settings.MPESA_CONSUMER_KEY, settings.MPESA_CONSUMER_SECRET = "bench-key", "bench-secret"
+        settings.MPESA_PASSKEY = "bench-passkey"
+
+        rows = []
+        for name, path in (("requests, token per call (before)", "/bench/legacy-mpesa"),
+                           ("shared client + cached token", "/payments/mpesa")):
+            with SessionLocal() as db:
+                db.query(Payment).delete()
+                db.commit()
+            stats = daraja.state.stats
+            before = dict(stats, connections=len(stats["connections"]))
+            stats["connections"] = set()
+            elapsed, latencies, statuses = asyncio.run(burst(path))
+            rows.append({
+                "mode": name,
+                "req_per_s": args.requests / elapsed,
+                **{k: v for k, v in common.summarize(latencies).items() if k != "count"},
+                "token_reqs": stats["token_requests"] - before["token_requests"],
+                "connections": len(stats["connections"]),
+                "statuses": statuses,
+            })
+        common.print_table(
+            f"{args.requests} STK pushes, concurrency {args.concurrency}, Daraja latency {args.latency * 1000:.0f} ms",
+            rows,
+        )
+        print(f"\n  200 concurrent callers on a cold token cache -> {asyncio.run(cold_token(200))} token request(s)")
+
+
+if __name__ == "__main__":
+    main()
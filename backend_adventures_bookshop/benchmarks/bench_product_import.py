@@ -0,0 +1,141 @@
+"""
+Bulk product import (POST /admin/products/import) against adding products
+one at a time through POST /admin/products, the way a supplier's list had to
+be loaded before.
+
+Imports --rows generated products as CSV (all new, then the same file again
+so every row is an update) and as NDJSON, each as one upload, and reports
+rows per second; the one-at-a-time path is timed over --single-rows rows and
+its rate extrapolated. Requests go to the ASGI app in-process.
+
+Usage: python -m benchmarks.bench_product_import --rows 100000 --single-rows 1000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import time
+
+import orjson
+
+from benchmarks import common
+
+CATEGORIES = ("books", "stationery", "technology")
+
+
+def build_rows(count: int, prefix: str):
+    rows = []
+    for i in range(count):
+        adjective = common.ADJECTIVES[i % len(common.ADJECTIVES)]
+        noun = common.NOUNS[(i // len(common.ADJECTIVES)) % len(common.NOUNS)]
+        subject = common.SUBJECTS[(i // 7) % len(common.SUBJECTS)]
+        rows.append({
+            "name": f"{adjective.title()} {subject.title()} {noun.title()} {i}",
+            "slug": f"{prefix}-{i}",
+            "description": f"A {adjective} {noun} for {subject} students, supplier item {i}",
+            "price": 100 + i % 500,
+            "original_price": 120 + i % 500,
+            "stock_quantity": i % 200,
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "on_sale": i % 7 == 0,
+        })
+    return rows
+
+
+def as_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def as_ndjson(rows) -> bytes:
+    return b"\n".join(orjson.dumps(row) for row in rows) + b"\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--single-rows", type=int, default=1000, help="rows added one at a time, for comparison")
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-product-import")
+    import httpx
+    from sqlalchemy import func, select
+
+    import main as app_module
+    import setup_database
+    from database import SessionLocal
+    from models import Category, Product
+    from routers.auth import create_access_token
+
+    setup_database.seed_data()
+    with SessionLocal() as db:
+        category_ids = dict(db.execute(select(Category.slug, Category.id)).all())
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'admin@schoolmall.co.ke'})}"}
+
+    def product_count():
+        with SessionLocal() as db:
+            return db.execute(select(func.count()).select_from(Product)).scalar()
+
+    async def run():
+        transport = httpx.ASGITransport(app=app_module.app)
+        results = []
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # before: one POST /admin/products per row
+            single = build_rows(args.single_rows, "single")
+            started = time.perf_counter()
+            for row in single:
+                body = {**row, "category_id": category_ids[row.pop("category")]}
+                response = await client.post("/admin/products", json=body, headers=headers)
+                assert response.status_code == 200, response.text
+            elapsed = time.perf_counter() - started
+            results.append({
+                "path": "POST /admin/products, one per row",
+                "rows": args.single_rows,
+                "seconds": elapsed,
+                "rows_per_s": args.single_rows / elapsed,
+                "est_s_for_rows": args.rows / (args.single_rows / elapsed),
+                "inserted": args.single_rows,
+                "updated": 0,
+                "failed": 0,
+            })
+
+            rows = build_rows(args.rows, "supplier")
+            uploads = [
+                ("import CSV, new products", "products.csv", as_csv(rows), "text/csv"),
+                ("import CSV again, all updates", "products.csv", as_csv(rows), "text/csv"),
+                ("import NDJSON, new products", "products.ndjson",
+                 as_ndjson(build_rows(args.rows, "supplier-nd")), "application/x-ndjson"),
+            ]
+            for name, filename, content, content_type in uploads:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/admin/products/import", files={"file": (filename, content, content_type)}, headers=headers,
+                )
+                elapsed = time.perf_counter() - started
+                report = response.json()
+                assert response.status_code == 200 and not report["failed"], report
+                results.append({
+                    "path": name,
+                    "rows": report["rows"],
+                    "seconds": elapsed,
+                    "rows_per_s": report["rows"] / elapsed,
+                    "est_s_for_rows": elapsed,
+                    "inserted": report["inserted"],
+                    "updated": report["updated"],
+                    "failed": report["failed"],
+                })
+        return results
+
+    results = asyncio.run(run())
+    common.print_table(
+        f"{args.rows} rows per import ({len(results[1:])} uploads), {args.single_rows} one at a time",
+        results,
+    )
+    print(f"\n  products in the database: {product_count()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Reconciliation of pending M-Pesa payments (services/reconciliation.py)
+against the local Daraja mock in benchmarks/standins.py, which answers each
+status query after `--latency` seconds: success, cancelled, or "still being
+processed" in fixed proportions per CheckoutRequestID.
+Runs a full pass at each concurrency level, with 1 standing in for querying
+payments one after the other, and checks the final payment and order states
+against the mock's answers. Then interrupts a run partway through a page and
+counts how many status queries resuming from the checkpoint repeats, against
+starting over.
+
+Usage: python -m benchmarks.bench_reconciliation --payments 2000 --latency 0.05 --concurrency 1,10,50
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import common, standins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per status query")
+    parser.add_argument("--concurrency", default="1,10,50", help="comma-separated levels")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--processing-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-reconciliation")
+    from datetime import datetime, timedelta, timezone
+
+    from sqlalchemy import delete, func, insert, select, update
+
+    import main as app_module  # noqa: F401  (creates the tables)
+    from config import settings
+    from database import SessionLocal
+    from models import JobCheckpoint, Order, OrderStatus, Payment, PaymentStatus
+    from services import mpesa, reconciliation
+
+    common.seed_products(200)
+    common.seed_orders(args.payments)
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        orders = db.execute(select(Order.id, Order.total_amount)).all()
+        db.execute(insert(Payment), [
+            {"order_id": order.id, "transaction_id": f"ws_CO_{order.id:012d}", "payment_method": "mpesa",
+             "amount": order.total_amount, "status": PaymentStatus.pending,
+             "created_at": now - timedelta(minutes=10 + n)}
+            for n, order in enumerate(orders)
+        ])
+        db.commit()
+
+    daraja = standins.daraja_app(
+        latency=args.latency, failure_rate=args.failure_rate, processing_rate=args.processing_rate,
+    )
+
+    def reset():
+        with SessionLocal() as db:
+            db.execute(update(Payment).values(status=PaymentStatus.pending))
+            db.execute(update(Order).values(status=OrderStatus.pending, payment_status=PaymentStatus.pending))
+            db.execute(delete(JobCheckpoint))
+            db.commit()
+
+    def final_state():
+        with SessionLocal() as db:
+            def count(*where):
+                return db.execute(select(func.count()).where(*where)).scalar()
+            return {
+                "completed": count(Payment.status == PaymentStatus.completed),
+                "failed": count(Payment.status == PaymentStatus.failed),
+                "pending": count(Payment.status == PaymentStatus.pending),
+                "orders_confirmed": count(Order.status == OrderStatus.confirmed,
+                                          Order.payment_status == PaymentStatus.completed),
+            }
+
+    async def run(concurrency, resume=True, max_queries=None):
+        """One reconcile() call; with max_queries it is cancelled once that many queries went out"""
+        client = mpesa.MpesaClient()
+        sent = 0
+        crashed = asyncio.Event()
+        stk_query = client.stk_query
+
+        async def counting_query(checkout_request_id):
+            nonlocal sent
+            sent += 1
+            if max_queries is not None and sent >= max_queries:
+                crashed.set()
+            return await stk_query(checkout_request_id)
+
+        client.stk_query = counting_query
+        try:
+            task = asyncio.create_task(reconciliation.reconcile(
+                client=client, page_size=args.page_size, concurrency=concurrency, resume=resume,
+            ))
+            if max_queries is not None:
+                await asyncio.wait([task, asyncio.create_task(crashed.wait())], return_when=asyncio.FIRST_COMPLETED)
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                return None, sent
+            return await task, sent
+        finally:
+            await client.close()
+
+    with standins.serve_app(daraja) as daraja_url:
+        settings.MPESA_BASE_URL = daraja_url
+        settings.MPESA_CONSUMER_KEY, settings.MPESA_CONSUMER_SECRET = "bench-key", "bench-secret"
+        settings.MPESA_PASSKEY = "bench-passkey"
+
+        rows, expected = [], None
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            reset()
+            started = time.perf_counter()
+            report, sent = asyncio.run(run(concurrency))
+            elapsed = time.perf_counter() - started
+            state = final_state()
+            expected = expected or state
+            rows.append({
+                "concurrency": concurrency,
+                "seconds": elapsed,
+                "payments_per_s": args.payments / elapsed,
+                "queries": sent,
+                "pages": report.pages,
+                "completed": state["completed"],
+                "failed": state["failed"],
+                "still_pending": state["pending"],
+                "orders_confirmed": state["orders_confirmed"],
+                "same_result": state == expected,
+            })
+        common.print_table(
+            f"{args.payments} pending payments, page size {args.page_size}, "
+            f"status query latency {args.latency * 1000:.0f} ms",
+            rows,
+        )
+
+        # interrupt mid-page, then finish by resuming or by starting over
+        crash_at = args.page_size * 3 + args.page_size // 2
+        rows = []
+        for name, resume in (("resume from checkpoint", True), ("start over", False)):
+            reset()
+            _, before_crash = asyncio.run(run(10, max_queries=crash_at))
+            report, after_crash = asyncio.run(run(10, resume=resume))
+            rows.append({
+                "mode": name,
+                "queries_before_crash": before_crash,
+                "queries_after": after_crash,
+                "repeated_queries": before_crash + after_crash - args.payments,
+                "same_result": final_state() == expected,
+            })
+        common.print_table(f"Interrupted after {crash_at} status queries, concurrency 10", rows)
+
+
+if __name__ == "__main__":
+    main()
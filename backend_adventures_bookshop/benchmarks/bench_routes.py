@@ -0,0 +1,314 @@
+"""
+Per-route benchmark suite for routers/products.py, routers/orders.py and
+routers/admin.py over a large seeded catalog, with JSON results that can be
+diffed between runs to catch regressions.
+
+The fixture is setup_database.seed_data() plus --products products and
+--orders orders (common.seed_products / seed_orders). On SQLite it is built
+once per scale and kept in BENCH_FIXTURE_DIR (default: a folder in the system
+temp dir), and each run works on a copy, since some routes write. To run on
+Postgres, point BENCH_DATABASE_URL at an empty database; it is seeded on the
+first run and reused while it has the requested number of products.
+
+Each case is sent through the ASGI app in-process, one request at a time,
+after a warm-up; with its own setup (e.g. emptying the catalog cache) run
+untimed before every request. A second, separate pass under tracemalloc
+records per-request peak memory, memory still held afterwards, and SQL
+statements, so the tracing does not skew the latencies.
+
+Usage:
+  python -m benchmarks.bench_routes --products 100000 --orders 100000 --output before.json
+  python -m benchmarks.bench_routes --products 100000 --orders 100000 --output after.json --compare before.json
+  python -m benchmarks.bench_routes --diff before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import common
+
+FIXTURE_DIR = Path(os.environ.get("BENCH_FIXTURE_DIR", Path(tempfile.gettempdir()) / "bookshop-bench-fixtures"))
+
+CUSTOMER = {
+    "full_name": "Bench Buyer",
+    "email": "buyer@example.com",
+    "phone": "0712345678",
+    "address": "1 Bench Road",
+    "city": "Nairobi",
+}
+
+
+def prepare_database(products: int, orders: int, rebuild: bool):
+    """Fresh workdir whose database holds the fixture; returns how it was obtained"""
+    workdir = common.use_temp_workdir("bench-routes")
+    sqlite = os.environ["DATABASE_URL"].startswith("sqlite")
+    cached = FIXTURE_DIR / f"catalog-{products}p-{orders}o.db"
+    if sqlite and cached.exists() and not rebuild:
+        shutil.copyfile(cached, workdir / "bench.db")
+        return f"copied from {cached}"
+
+    from sqlalchemy import func, select
+
+    import main  # noqa: F401  (tables, search index and triggers)
+    import setup_database
+    from database import SessionLocal, engine
+    from models import Order, Product
+
+    with SessionLocal() as db:
+        existing = db.execute(select(func.count()).select_from(Product)).scalar()
+    if not sqlite and existing >= products:
+        return f"reused ({existing} products)"
+
+    started = time.perf_counter()
+    setup_database.seed_data()
+    common.seed_products(products)
+    common.seed_orders(orders)
+    with SessionLocal() as db:
+        counts = (
+            db.execute(select(func.count()).select_from(Product)).scalar(),
+            db.execute(select(func.count()).select_from(Order)).scalar(),
+        )
+    elapsed = time.perf_counter() - started
+    if sqlite:
+        engine.dispose()
+        FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(workdir / "bench.db", cached)
+    return f"seeded {counts[0]} products and {counts[1]} orders in {elapsed:.0f} s"
+
+
+def build_cases(admin_headers):
+    """(name, method, path or path factory, request kwargs, untimed setup before each request)"""
+    from sqlalchemy import select
+
+    from database import SessionLocal
+    from models import Order, Product
+    from routers.products import catalog_cache
+    from utils.pagination import DEFAULT_PAGE_SIZE, encode_cursor
+
+    rng = random.Random(42)
+    with SessionLocal() as db:
+        product_ids = db.execute(select(Product.id).where(Product.is_active == True)).scalars().all()
+        order_ids = db.execute(select(Order.id)).scalars().all()
+        # the cursor a client paging through the catalog sends for page 41
+        row = db.execute(
+            select(Product.created_at, Product.id).where(Product.is_active == True)
+            .order_by(Product.created_at.desc(), Product.id.desc()).offset(40 * DEFAULT_PAGE_SIZE - 1).limit(1)
+        ).one()
+    deep_cursor = encode_cursor(row.created_at, row.id)
+
+    def any_of(ids, template):
+        return lambda: template.format(rng.choice(ids))
+
+    def checkout_body():
+        lines = rng.sample(product_ids, 3)
+        return {"json": {**CUSTOMER, "items": [{"product_id": pid, "quantity": 1} for pid in lines]}}
+
+    cold = catalog_cache.clear
+    admin = {"headers": admin_headers}
+    return [
+        ("products.list cold", "GET", "/products/", {}, cold),
+        ("products.list cached", "GET", "/products/", {}, None),
+        ("products.list deep cursor", "GET", "/products/", {"params": {"cursor": deep_cursor}}, cold),
+        ("products.detail cold", "GET", any_of(product_ids, "/products/{}"), {}, cold),
+        ("products.search", "GET", "/products/search", {"params": {"q": "mathematics guide"}}, None),
+        ("orders.list", "GET", "/orders/", {}, None),
+        ("orders.detail", "GET", any_of(order_ids, "/orders/{}"), {}, None),
+        ("orders.create (3 lines)", "POST", "/orders/", checkout_body, None),
+        ("admin.products", "GET", "/admin/products", admin, None),
+        ("admin.products.search", "GET", "/admin/products/search", {**admin, "params": {"q": "pocket atlas"}}, None),
+        ("admin.orders", "GET", "/admin/orders", admin, None),
+        ("admin.dashboard", "GET", "/admin/dashboard", admin, None),
+    ]
+
+
+async def run_case(client, case, requests: int, warmup: int):
+    name, method, path, options, setup = case
+
+    def next_request():
+        return (path() if callable(path) else path), (options() if callable(options) else options)
+
+    async def one():
+        if setup:
+            setup()
+        url, kwargs = next_request()
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        return time.perf_counter() - started, response.status_code
+
+    for _ in range(warmup):
+        await one()
+    latencies, statuses = [], {}
+    for _ in range(requests):
+        elapsed, status = await one()
+        latencies.append(elapsed)
+        statuses[status] = statuses.get(status, 0) + 1
+    return latencies, statuses
+
+
+async def trace_case(client, case, requests: int):
+    """Peak and retained traced memory and SQL statements per request, under tracemalloc"""
+    from sqlalchemy import event
+
+    from database import async_engine, engine
+
+    name, method, path, options, setup = case
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    targets = (engine, async_engine.sync_engine)
+    peaks, retained = [], []
+    for target in targets:
+        event.listen(target, "after_cursor_execute", count)
+    tracemalloc.start()
+    try:
+        for _ in range(requests):
+            if setup:
+                setup()
+            url = path() if callable(path) else path
+            kwargs = options() if callable(options) else options
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await client.request(method, url, **kwargs)
+            current, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - before)
+            retained.append(current - before)
+    finally:
+        tracemalloc.stop()
+        for target in targets:
+            event.remove(target, "after_cursor_execute", count)
+    peaks.sort()
+    return {
+        "alloc_peak_kib": peaks[len(peaks) // 2] / 1024,
+        "retained_bytes": sorted(retained)[len(retained) // 2],
+        "statements": statements / requests,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float):
+    """
+    Print per-case changes; returns the cases that regressed: p50 more than
+    threshold percent slower, or more SQL statements per request. The tail
+    percentiles are shown but not judged, they are too noisy at these counts.
+    """
+    before = {case["name"]: case for case in baseline["cases"]}
+    rows, regressions = [], []
+    for case in current["cases"]:
+        old = before.get(case["name"])
+        if old is None:
+            continue
+        row = {"case": case["name"]}
+        slower = False
+        for key in ("p50_ms", "p95_ms", "p99_ms", "alloc_peak_kib", "statements"):
+            change = (case[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            row[key.replace("_ms", "").replace("_kib", "")] = f"{old[key]:.2f} -> {case[key]:.2f} ({change:+.0f}%)"
+            slower |= key == "p50_ms" and change > threshold
+        slower |= case["statements"] > old["statements"]
+        row["verdict"] = "REGRESSION" if slower else "ok"
+        if slower:
+            regressions.append(case["name"])
+        rows.append(row)
+    common.print_table(
+        f"{baseline.get('revision')} ({baseline['started_at']}) -> {current.get('revision')} ({current['started_at']}), "
+        f"regression = p50 over +{threshold:.0f}% or more statements",
+        rows,
+    )
+    if baseline["scale"] != current["scale"] or baseline["database"] != current["database"]:
+        print(f"\n  note: different fixtures, {baseline['scale']} on {baseline['database']} "
+              f"vs {current['scale']} on {current['database']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per case")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--trace-requests", type=int, default=20, help="requests per case under tracemalloc")
+    parser.add_argument("--only", default="", help="comma-separated substrings of case names to run")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the cached SQLite fixture")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to diff against")
+    parser.add_argument("--diff", nargs=2, metavar=("BASELINE", "CURRENT"), help="only diff two result files")
+    parser.add_argument("--threshold", type=float, default=10.0, help="p50 slowdown, in percent, counted as a regression")
+    args = parser.parse_args()
+    # the run itself happens in a temp working directory
+    args.output, args.compare = (os.path.abspath(path) if path else None for path in (args.output, args.compare))
+
+    if args.diff:
+        baseline, current = (json.loads(Path(path).read_text()) for path in args.diff)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    fixture = prepare_database(args.products, args.orders, args.rebuild)
+    print(f"  fixture: {fixture}")
+
+    import httpx
+
+    import main as app_module
+    from database import engine
+    from routers.auth import create_access_token
+
+    token = create_access_token({"sub": "admin@schoolmall.co.ke"})
+    cases = build_cases({"Authorization": f"Bearer {token}"})
+    if args.only:
+        wanted = [part.strip() for part in args.only.split(",")]
+        cases = [case for case in cases if any(part in case[0] for part in wanted)]
+
+    async def run_all():
+        transport = httpx.ASGITransport(app=app_module.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = []
+            for case in cases:
+                latencies, statuses = await run_case(client, case, args.requests, args.warmup)
+                traced = await trace_case(client, case, args.trace_requests)
+                summary = common.summarize(latencies)
+                results.append({
+                    "name": case[0],
+                    "method": case[1],
+                    "requests": summary.pop("count"),
+                    **summary,
+                    **traced,
+                    "statuses": {str(status): count for status, count in statuses.items()},
+                })
+            return results
+
+    results = asyncio.run(run_all())
+    report = {
+        "revision": common.git_revision(),
+        "started_at": started_at,
+        "database": engine.dialect.name,
+        "scale": {"products": args.products, "orders": args.orders},
+        "python": platform.python_version(),
+        "requests_per_case": args.requests,
+        "cases": results,
+    }
+    common.print_table(
+        f"{args.products} products, {args.orders} orders on {report['database']}; "
+        f"{args.requests} sequential requests per case",
+        [{k: v for k, v in case.items() if k not in ("method", "requests")} for case in results],
+    )
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"\n  results written to {args.output}")
+    if args.compare:
+        print()
+        regressions = compare(json.loads(Path(args.compare).read_text()), report, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
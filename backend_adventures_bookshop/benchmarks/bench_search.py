@@ -0,0 +1,80 @@
+"""
+Product search latency: the old `name ILIKE '%q%'` scan versus the
+full-text index in services/search (FTS5 on SQLite, tsvector on Postgres)
+
+Usage: python -m benchmarks.bench_search --products 100000 --repeat 20
+"""
+import argparse
+import time
+
+from benchmarks import common
+
+# Common single words (many matches), multi-word queries and a term with no match
+TERMS = ["math", "atlas", "pocket guide", "kiswahili reader", "calc", "spiral notebook 77", "zebra"]
+
+
+def time_query(run, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = run()
+        latencies.append(time.perf_counter() - started)
+    return latencies, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-search")
+    common.seed_products(args.products)
+
+    from database import SessionLocal, engine
+    from models import Product
+    from services import search
+
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        search.install(connection)
+    print(f"Index built for {args.products} products in {time.perf_counter() - started:.2f}s")
+
+    db = SessionLocal()
+    dialect = engine.dialect.name
+    rows = []
+    try:
+        for term in TERMS:
+            def run_ilike():
+                return (
+                    db.query(Product)
+                    .filter(Product.name.ilike(f"%{term}%"))
+                    .order_by(Product.created_at.desc())
+                    .limit(args.limit)
+                    .all()
+                )
+
+            def run_fts():
+                return db.execute(search.search_statement(dialect, term, args.limit)).scalars().all()
+
+            for method, run in (("ilike", run_ilike), ("fulltext", run_fts)):
+                run()  # warm up
+                latencies, found = time_query(run, args.repeat)
+                stats = common.summarize(latencies)
+                rows.append({
+                    "term": term,
+                    "method": method,
+                    "rows": found,
+                    "p50_ms": stats["p50_ms"],
+                    "p95_ms": stats["p95_ms"],
+                })
+                db.expunge_all()
+    finally:
+        db.close()
+
+    common.print_table(f"Search over {args.products} products ({dialect}), limit {args.limit}", rows)
+
+
+if __name__ == "__main__":
+    main()
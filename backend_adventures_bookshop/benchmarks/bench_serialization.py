@@ -0,0 +1,96 @@
+"""
+Per-row cost of turning ORM products into a JSON response body:
+FastAPI's response_model path (validate, dump to dicts, then encode) with the
+stdlib encoder and with orjson, versus the fast path in utils/responses.py
+that validates and dumps bytes in one pass through a cached TypeAdapter.
+No database or HTTP involved; rows are transient ORM objects.
+
+Usage: python -m benchmarks.bench_serialization --rows 100 1000 5000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import List
+
+from benchmarks import common
+
+
+def build_products(count: int):
+    from models import Category, Product
+
+    categories = [
+        Category(id=i, name=name.title(), slug=name, description=f"All {name}", is_active=True,
+                 created_at=datetime.now(timezone.utc))
+        for i, name in enumerate(("books", "stationery", "technology"), start=1)
+    ]
+    return [
+        Product(
+            id=i, name=f"Product {i}", slug=f"product-{i}",
+            description=f"A fairly ordinary description for product {i}. " * 4,
+            price=100.0 + i, original_price=120.0 + i, stock_quantity=50, image=f"/static/images/{i}.jpg",
+            is_active=True, is_featured=i % 10 == 0, on_sale=i % 7 == 0,
+            created_at=datetime.now(timezone.utc), category=categories[i % 3],
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-serialization")
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from pydantic import TypeAdapter
+
+    from schemas import Product as ProductSchema
+    from utils.responses import FastJSONResponse, dump_json
+
+    schema = List[ProductSchema]
+    field = create_response_field(name="bench", type_=schema)
+
+    def response_model_path(response_class):
+        def render(products):
+            content = asyncio.run(serialize_response(field=field, response_content=products, is_coroutine=True))
+            return response_class(content).body
+        return render
+
+    def adapter_per_call(products):
+        adapter = TypeAdapter(schema)
+        return adapter.dump_json(adapter.validate_python(products, from_attributes=True))
+
+    modes = {
+        "response_model + json": response_model_path(JSONResponse),
+        "response_model + orjson": response_model_path(FastJSONResponse),
+        "TypeAdapter per call": adapter_per_call,
+        "cached TypeAdapter": lambda products: FastJSONResponse(dump_json(schema, products)).body,
+    }
+
+    rows = []
+    for count in args.rows:
+        products = build_products(count)
+        for name, render in modes.items():
+            render(products)  # warm up (and build any cached schema)
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                body = render(products)
+                timings.append(time.perf_counter() - started)
+            stats = common.summarize(timings)
+            rows.append({
+                "rows": count,
+                "mode": name,
+                "p50_ms": stats["p50_ms"],
+                "us_per_row": stats["p50_ms"] * 1000 / count,
+                "kib": len(body) / 1024,
+            })
+    common.print_table("ORM rows -> JSON body", rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Peak Python memory inside the image upload handler as the upload grows:
+the old `buffer.write(await file.read())` versus the chunked aiofiles copy
+in utils/uploads.py. Peak is measured with tracemalloc from the start of
+the handler, after the multipart body has already been spooled.
+
+Usage: python -m benchmarks.bench_uploads --sizes-mb 1 8 32 64
+"""
+import argparse
+import asyncio
+import os
+import time
+import tracemalloc
+import uuid
+
+from benchmarks import common
+
+
+def build_app():
+    from fastapi import FastAPI, File, UploadFile
+
+    from utils.uploads import IMAGE_DIR, save_image_upload
+
+    app = FastAPI()
+
+    def measured(save):
+        async def endpoint(file: UploadFile = File(...)):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            started = time.perf_counter()
+            await save(file)
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            return {"peak_bytes": peak - baseline, "seconds": elapsed}
+        return endpoint
+
+    async def save_whole(file):
+        filename = f"{uuid.uuid4()}.bin"
+        with open(os.path.join(IMAGE_DIR, filename), "wb") as buffer:
+            buffer.write(await file.read())
+
+    async def save_streamed(file):
+        await save_image_upload(file, max_bytes=1 << 40)
+
+    app.post("/whole")(measured(save_whole))
+    app.post("/streamed")(measured(save_streamed))
+    return app
+
+
+async def run(args):
+    import httpx
+
+    app = build_app()
+    rows = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size_mb in args.sizes_mb:
+            payload = os.urandom(size_mb * 1024 * 1024)
+            for mode in ("whole", "streamed"):
+                response = await client.post(
+                    f"/{mode}", files={"file": ("photo.jpg", payload, "image/jpeg")}
+                )
+                result = response.json()
+                rows.append({
+                    "upload_mb": size_mb,
+                    "mode": mode,
+                    "handler_peak_mb": result["peak_bytes"] / (1024 * 1024),
+                    "handler_ms": result["seconds"] * 1000,
+                })
+            del payload
+    common.print_table("Upload handler peak memory", rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 8, 32, 64])
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-uploads")
+    tracemalloc.start()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
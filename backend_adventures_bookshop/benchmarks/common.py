@@ -0,0 +1,209 @@
+"""
+Shared helpers for the benchmark scripts
+Every benchmark runs against a throwaway database inside a temp working
+directory, so dev.db and static/images are never touched.
+Run them from the backend folder, e.g. `python -m benchmarks.bench_db_modes`
+Set BENCH_DATABASE_URL to benchmark against Postgres instead of SQLite.
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def use_temp_workdir(name: str = "bench") -> Path:
+    """
+    Create a temp working directory with static/images and point
+    DATABASE_URL at a fresh SQLite file inside it.
+    Must be called before `database` or `main` is imported.
+    """
+    workdir = Path(tempfile.mkdtemp(prefix=f"{name}-"))
+    (workdir / "static" / "images").mkdir(parents=True)
+    os.environ["DATABASE_URL"] = os.environ.get(
+        "BENCH_DATABASE_URL", f"sqlite:///{workdir / 'bench.db'}"
+    )
+    os.chdir(workdir)
+    return workdir
+
+
+# Small vocabulary so product names and descriptions are worth searching
+ADJECTIVES = ["revised", "illustrated", "pocket", "deluxe", "spiral", "hardcover", "premium", "compact"]
+NOUNS = ["guide", "workbook", "atlas", "notebook", "calculator", "dictionary", "pen", "reader", "kit"]
+SUBJECTS = ["mathematics", "english", "kiswahili", "science", "geography", "history", "art", "music"]
+
+
+def seed_products(count: int, batch_size: int = 5000):
+    """Insert `count` active products spread over a few categories"""
+    from sqlalchemy import insert
+    from database import SessionLocal, engine
+    from models import Base, Category, Product
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        categories = []
+        for slug in ("books", "stationery", "technology"):
+            category = db.query(Category).filter_by(slug=slug).first()
+            if not category:
+                category = Category(name=slug.title(), slug=slug, description=f"Bench {slug}")
+                db.add(category)
+                db.flush()
+            categories.append(category.id)
+
+        rows = []
+        for i in range(count):
+            adjective = ADJECTIVES[i % len(ADJECTIVES)]
+            noun = NOUNS[(i // len(ADJECTIVES)) % len(NOUNS)]
+            subject = SUBJECTS[(i // 7) % len(SUBJECTS)]
+            rows.append({
+                "name": f"{adjective.title()} {subject.title()} {noun.title()} {i}",
+                "slug": f"bench-product-{i}",
+                "description": f"A {adjective} {noun} for {subject} students, item number {i}",
+                "price": 100.0 + i % 500,
+                "original_price": 120.0 + i % 500,
+                "stock_quantity": 100,
+                "category_id": categories[i % len(categories)],
+                "is_active": True,
+                "is_featured": i % 10 == 0,
+                "on_sale": i % 7 == 0,
+            })
+            if len(rows) >= batch_size:
+                db.execute(insert(Product), rows)
+                rows = []
+        if rows:
+            db.execute(insert(Product), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def seed_orders(count: int, max_items: int = 5, batch_size: int = 2000):
+    """
+    Insert `count` orders, each with 1..max_items lines over the existing
+    products (call seed_products first), one minute apart going back from now.
+    """
+    import random
+    from datetime import datetime, timedelta, timezone
+
+    from sqlalchemy import func, insert, select
+    from database import SessionLocal
+    from models import Order, OrderItem, Product
+
+    rng = random.Random(42)
+    db = SessionLocal()
+    try:
+        products = db.execute(select(Product.id, Product.price)).all()
+        next_id = (db.execute(select(func.max(Order.id))).scalar() or 0) + 1
+        now = datetime.now(timezone.utc)
+        orders, items = [], []
+        for i in range(count):
+            order_id = next_id + i
+            lines = rng.sample(products, rng.randint(1, min(max_items, len(products))))
+            quantities = [rng.randint(1, 3) for _ in lines]
+            orders.append({
+                "id": order_id,
+                "order_number": f"BENCH{order_id:08d}",
+                "email": f"customer{i % 5000}@example.com",
+                "phone": f"07{i % 100000000:08d}",
+                "full_name": f"Customer {i % 5000}",
+                "address": "P.O. Box 123, Moi Avenue",
+                "city": "Nairobi",
+                "total_amount": sum(p.price * q for p, q in zip(lines, quantities)),
+                "created_at": now - timedelta(minutes=i),
+            })
+            items += [
+                {"order_id": order_id, "product_id": p.id, "quantity": q, "price": p.price}
+                for p, q in zip(lines, quantities)
+            ]
+            if len(orders) >= batch_size:
+                db.execute(insert(Order), orders)
+                db.execute(insert(OrderItem), items)
+                orders, items = [], []
+        if orders:
+            db.execute(insert(Order), orders)
+            db.execute(insert(OrderItem), items)
+        db.commit()
+    finally:
+        db.close()
+
+
+def summarize(latencies):
+    """p50/p95/p99/mean of a list of latencies in seconds, reported in ms"""
+    if not latencies:
+        return {"count": 0}
+    ordered = sorted(latencies)
+
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
+
+
+async def drive(app, method: str, path: str, total: int, concurrency: int, **kwargs):
+    """
+    Fire `total` requests at an ASGI app in-process with at most
+    `concurrency` in flight. Returns (elapsed seconds, latencies, status codes).
+    """
+    import httpx
+
+    latencies = []
+    statuses = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    # unhandled app errors come back as 500s instead of aborting the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.request(method, path, **kwargs)
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+
+    return elapsed, latencies, statuses
+
+
+def git_revision():
+    """Short hash of the checked-out commit, for labelling saved results"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(title: str, rows):
+    """Print a list of dicts as an aligned table"""
+    print(f"\n{title}")
+    if not rows:
+        print("  (no results)")
+        return
+    columns = list(rows[0].keys())
+    formatted = [
+        [f"{row[c]:.2f}" if isinstance(row[c], float) else str(row[c]) for c in columns]
+        for row in rows
+    ]
+    widths = [max(len(c), *(len(r[i]) for r in formatted)) for i, c in enumerate(columns)]
+    print("  " + "  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in formatted:
+        print("  " + "  ".join(v.ljust(w) for v, w in zip(r, widths)))
@@ -0,0 +1,119 @@
+"""
+Checks every route in utils/query_budget.py's ROUTE_BUDGETS against a seeded
+database: sends one request to each, cold caches first, and reports how many
+SQL statements it issued, its budget, and any likely N+1 (the same SELECT
+repeated), with the lines of code behind the statements when something fails.
+Exits with status 1 if any route is over budget or shows an N+1, so it can
+gate CI; run with --all to also list the routes without a budget.
+
+Usage: python -m benchmarks.query_budgets --products 500 --orders 200
+"""
+import argparse
+import logging
+import os
+import sys
+
+from benchmarks import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--all", action="store_true", help="also exercise routes without a budget")
+    args = parser.parse_args()
+
+    common.use_temp_workdir("bench-query-budgets")
+    os.environ["QUERY_DEBUG"] = "true"
+    os.environ["QUERY_BUDGET_STRICT"] = "false"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import insert, select
+
+    import main as app_module
+    import setup_database
+    from database import SessionLocal
+    from models import Order, Payment, PaymentStatus, Product
+    from utils import query_budget
+
+    # this script prints its own report
+    logging.getLogger("query_budget").setLevel(logging.CRITICAL)
+
+    common.seed_products(args.products)
+    common.seed_orders(args.orders)
+    setup_database.seed_data()
+    with SessionLocal() as db:
+        orders = db.execute(select(Order.id, Order.total_amount)).all()
+        db.execute(insert(Payment), [
+            {"order_id": order.id, "transaction_id": f"ws_CO_{order.id:012d}", "payment_method": "card",
+             "amount": order.total_amount, "status": PaymentStatus.completed}
+            for order in orders
+        ])
+        db.commit()
+        product_ids = db.execute(
+            select(Product.id).where(Product.is_active == True).order_by(Product.id).limit(5)
+        ).scalars().all()
+        product_id = product_ids[0]
+        order_id = orders[0].id
+
+    order_body = {
+        "full_name": "Query Budget", "email": "budget@example.com", "phone": "0712345678",
+        "address": "P.O. Box 1", "city": "Nairobi",
+        "items": [{"product_id": pid, "quantity": 1} for pid in product_ids],
+    }
+    requests = {
+        ("POST", "/auth/login"): {"json": {"email": "admin@schoolmall.co.ke", "password": "admin123"}},
+        ("GET", "/products/"): {},
+        ("GET", "/products/search"): {"params": {"q": "mathematics"}},
+        ("GET", "/products/{product_id}"): {"path": f"/products/{product_id}"},
+        ("POST", "/orders/"): {"json": order_body},
+        ("GET", "/orders/"): {},
+        ("GET", "/orders/{order_id}"): {"path": f"/orders/{order_id}"},
+        ("GET", "/admin/orders"): {},
+        ("GET", "/admin/orders/export"): {"params": {"format": "ndjson"}},
+        ("GET", "/admin/dashboard"): {},
+        ("GET", "/admin/products"): {},
+        ("GET", "/admin/products/search"): {"params": {"q": "mathematics"}},
+        ("GET", "/admin/products/export"): {},
+        ("GET", "/admin/hero-banners"): {},
+        ("GET", "/payments/verify/{transaction_id}"): {"path": f"/payments/verify/ws_CO_{order_id:012d}"},
+    }
+    if args.all:
+        for route in app_module.app.routes:
+            for method in getattr(route, "methods", None) or []:
+                if method == "GET" and "{" not in route.path:
+                    requests.setdefault((method, route.path), {})
+
+    rows, failures = [], []
+    with TestClient(app_module.app) as client:
+        for (method, route), options in requests.items():
+            options = dict(options)
+            path = options.pop("path", route)
+            with query_budget.recording(requests_only=True) as log:
+                response = client.request(method, path, **options)
+            log.label = f"{method} {route}"
+            budget = query_budget.ROUTE_BUDGETS.get((method, route))
+            problems = query_budget.check(log, budget)
+            errored = response.status_code >= 400 and budget is not None
+            if errored:
+                problems = f"{log.label}: status {response.status_code}, so its budget was not checked\n{problems}"
+            if problems:
+                failures.append(problems.rstrip())
+            rows.append({
+                "route": log.label,
+                "status": response.status_code,
+                "statements": len(log),
+                "budget": "-" if budget is None else budget,
+                "result": "ERROR" if errored else "N+1" if "N+1" in problems else "OVER" if problems else "ok",
+            })
+
+    missing = set(query_budget.ROUTE_BUDGETS) - set(requests)
+    common.print_table(f"Statements per request ({args.products} products, {args.orders} orders)", rows)
+    for problems in failures:
+        print(f"\n{problems}")
+    if missing:
+        print(f"\n  budgeted but not exercised here: {sorted(missing)}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
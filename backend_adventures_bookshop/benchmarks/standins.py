@@ -0,0 +1,295 @@
+"""
+Local stand-ins for the external services the app talks to, so benchmarks
+(and manual runs) never reach real SMTP servers or third-party APIs.
+Each one runs in a background thread with its own event loop and can add
+latency and inject failures.
+
+- SMTPStandIn: a minimal ESMTP server (no TLS or AUTH) that accepts and
+  counts messages
+- serve_app: runs any ASGI app (e.g. a FastAPI mock of a provider API) on
+  uvicorn; whatsapp_app mocks the WhatsApp Cloud API and daraja_app the
+  M-Pesa Daraja API
+"""
+import asyncio
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class SMTPStandIn:
+    """
+    Accepts mail on 127.0.0.1:<port>. `latency` seconds are added to every
+    reply, like a network round trip; `transient_failure_rate` of messages
+    get a 451 after DATA and recipients starting with "bounce" get a 550.
+    """
+
+    def __init__(self, latency: float = 0.0, transient_failure_rate: float = 0.0, seed: int = 42):
+        self.latency = latency
+        self.transient_failure_rate = transient_failure_rate
+        self.rng = random.Random(seed)
+        self.port = free_port()
+        self.connections = 0
+        self.messages = 0
+        self.rejected = 0
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    async def _reply(self, writer, line: str):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    async def _session(self, reader, writer):
+        self.connections += 1
+        try:
+            await self._reply(writer, "220 standin ESMTP ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command[:4].upper()
+                if verb in ("EHLO", "HELO"):
+                    await self._reply(writer, "250-standin\r\n250-8BITMIME\r\n250 SIZE 10485760")
+                elif verb == "RCPT" and "<bounce" in command.lower():
+                    await self._reply(writer, "550 5.1.1 No such user")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    if self.rng.random() < self.transient_failure_rate:
+                        self.rejected += 1
+                        await self._reply(writer, "451 4.3.0 Try again later")
+                    else:
+                        self.messages += 1
+                        await self._reply(writer, "250 2.0.0 Ok: queued")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    break
+                else:  # MAIL, RCPT, RSET, NOOP
+                    await self._reply(writer, "250 Ok")
+        finally:
+            writer.close()
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        server = self._loop.run_until_complete(asyncio.start_server(self._session, "127.0.0.1", self.port))
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            self._loop.run_until_complete(server.wait_closed())
+            self._loop.close()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._serve, name="smtp-standin", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+@contextmanager
+def serve_app(app, port: int = None, lifespan: str = "off"):
+    """
+    Run an ASGI app on uvicorn in a background thread; yields its base URL.
+    Pass lifespan="on" to run the app's startup/shutdown hooks (e.g. to serve
+    this project's own app with its in-process workers).
+    """
+    import uvicorn
+
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan=lifespan))
+    thread = threading.Thread(target=server.run, name="http-standin", daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def whatsapp_app(latency: float = 0.0, transient_failure_rate: float = 0.0, seed: int = 42):
+    """
+    WhatsApp Cloud API mock: POST /{phone_number_id}/messages. Returns 429 for
+    `transient_failure_rate` of requests and 400 for recipients ending in 000.
+    Counters are on app.state.stats.
+    """
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse
+
+    app = FastAPI()
+    app.state.stats = {"requests": 0, "messages": 0, "connections": set()}
+    rng = random.Random(seed)
+
+    @app.post("/{phone_number_id}/messages")
+    async def send_message(phone_number_id: str, request: Request):
+        stats = app.state.stats
+        stats["requests"] += 1
+        stats["connections"].add(request.client.port)
+        payload = await request.json()
+        if latency:
+            await asyncio.sleep(latency)
+        if payload["to"].endswith("000"):
+            return JSONResponse({"error": {"message": "Invalid recipient"}}, status_code=400)
+        if rng.random() < transient_failure_rate:
+            return JSONResponse({"error": {"message": "Rate limited"}}, status_code=429)
+        stats["messages"] += 1
+        return {"messaging_product": "whatsapp", "messages": [{"id": f"wamid.{stats['messages']}"}]}
+
+    return app
+
+
+def daraja_app(
+    latency: float = 0.0,
+    token_ttl: int = 3599,
+    failure_rate: float = 0.0,
+    processing_rate: float = 0.0,
+    callback_delay: float = None,
+):
+    """
+    M-Pesa Daraja mock: OAuth tokens, STK push and STK push query.
+    API calls need a token it issued and that has not expired (else 401).
+    A query's outcome is fixed per CheckoutRequestID: `failure_rate` of them
+    report ResultCode 1032 (cancelled) and `processing_rate` get the 500
+    "transaction is being processed" error; the rest succeeded.
+    With `callback_delay` set, each push is also answered like the real API
+    does, with the stkCallback POSTed to its CallBackURL that many seconds
+    later (the "processing" ones succeed by then).
+    Counters (token requests, STK pushes, callbacks, client connections) are on
+    app.state.stats; pushes are kept in app.state.pushes by CheckoutRequestID.
+    """
+    import itertools
+    import uuid
+    import zlib
+
+    from fastapi import FastAPI, Request, Response
+    from fastapi.responses import JSONResponse
+    from starlette.requests import ClientDisconnect
+
+    app = FastAPI()
+    app.state.stats = {
+        "token_requests": 0, "stk_pushes": 0, "queries": 0,
+        "callbacks_sent": 0, "callback_errors": 0, "connections": set(),
+    }
+    app.state.pushes = {}
+    tokens = {}
+    counter = itertools.count(1)
+    callbacks = set()  # delivery tasks, kept so they are not garbage collected
+
+    def bucket(checkout_request_id: str) -> float:
+        return zlib.crc32(checkout_request_id.encode()) % 10000 / 10000
+
+    async def deliver_callback(checkout_request_id: str, merchant_request_id: str, payload: dict):
+        import httpx
+
+        await asyncio.sleep(callback_delay)
+        failed = processing_rate <= bucket(checkout_request_id) < processing_rate + failure_rate
+        callback = {
+            "MerchantRequestID": merchant_request_id,
+            "CheckoutRequestID": checkout_request_id,
+            "ResultCode": 1032 if failed else 0,
+            "ResultDesc": "Request cancelled by user" if failed else "The service request is processed successfully.",
+        }
+        if not failed:
+            callback["CallbackMetadata"] = {"Item": [
+                {"Name": "Amount", "Value": payload["Amount"]},
+                {"Name": "MpesaReceiptNumber", "Value": f"QK{checkout_request_id[-8:]}"},
+                {"Name": "PhoneNumber", "Value": int(payload["PhoneNumber"])},
+            ]}
+        if getattr(app.state, "callback_client", None) is None:
+            app.state.callback_client = httpx.AsyncClient(timeout=30)
+        try:
+            response = await app.state.callback_client.post(
+                payload["CallBackURL"], json={"Body": {"stkCallback": callback}}
+            )
+            response.raise_for_status()
+            app.state.stats["callbacks_sent"] += 1
+        except httpx.HTTPError:
+            app.state.stats["callback_errors"] += 1
+
+    def authorized(request: Request) -> bool:
+        app.state.stats["connections"].add(request.client.port)
+        token = request.headers.get("authorization", "").removeprefix("Bearer ")
+        return tokens.get(token, 0) > time.monotonic()
+
+    @app.get("/oauth/v1/generate")
+    async def generate_token(request: Request, grant_type: str):
+        app.state.stats["connections"].add(request.client.port)
+        app.state.stats["token_requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        token = uuid.uuid4().hex
+        tokens[token] = time.monotonic() + token_ttl
+        return {"access_token": token, "expires_in": str(token_ttl)}
+
+    @app.post("/mpesa/stkpush/v1/processrequest")
+    async def stk_push(request: Request):
+        if not authorized(request):
+            return JSONResponse({"errorCode": "404.001.03", "errorMessage": "Invalid Access Token"}, status_code=401)
+        payload = await request.json()
+        if latency:
+            await asyncio.sleep(latency)
+        app.state.stats["stk_pushes"] += 1
+        n = next(counter)
+        checkout_request_id = f"ws_CO_{n:012d}"
+        merchant_request_id = f"{n:05d}-{n:08d}-1"
+        app.state.pushes[checkout_request_id] = payload
+        if callback_delay is not None:
+            task = asyncio.create_task(deliver_callback(checkout_request_id, merchant_request_id, payload))
+            callbacks.add(task)
+            task.add_done_callback(callbacks.discard)
+        return {
+            "MerchantRequestID": merchant_request_id,
+            "CheckoutRequestID": checkout_request_id,
+            "ResponseCode": "0",
+            "ResponseDescription": "Success. Request accepted for processing",
+            "CustomerMessage": "Success. Request accepted for processing",
+        }
+
+    @app.post("/mpesa/stkpushquery/v1/query")
+    async def stk_query(request: Request):
+        if not authorized(request):
+            return JSONResponse({"errorCode": "404.001.03", "errorMessage": "Invalid Access Token"}, status_code=401)
+        try:
+            payload = await request.json()
+        except ClientDisconnect:  # the caller was cancelled mid-request
+            return Response(status_code=499)
+        if latency:
+            await asyncio.sleep(latency)
+        app.state.stats["queries"] += 1
+        checkout_request_id = payload["CheckoutRequestID"]
+        outcome = bucket(checkout_request_id)
+        if outcome < processing_rate:
+            return JSONResponse(
+                {"requestId": checkout_request_id, "errorCode": "500.001.1001",
+                 "errorMessage": "The transaction is being processed"},
+                status_code=500,
+            )
+        failed = outcome < processing_rate + failure_rate
+        return {
+            "ResponseCode": "0",
+            "ResponseDescription": "The service request has been accepted successsfully",
+            "MerchantRequestID": "",
+            "CheckoutRequestID": checkout_request_id,
+            "ResultCode": "1032" if failed else "0",
+            "ResultDesc": "Request cancelled by user" if failed else "The service request is processed successfully.",
+        }
+
+    return app
@@ -0,0 +1,117 @@
+"""
+Shared pytest fixtures
+Like the benchmarks, a test run works in a throwaway directory with its own
+SQLite database and static/images (benchmarks/common.use_temp_workdir), set
+up here before anything imports `database` or `main`. Set BENCH_DATABASE_URL
+to run the suite against an empty Postgres database instead.
+Tests marked `postgres` only run there (row locks, deadlocks).
+Every request a test makes is held to its query budget (the plugin in
+utils/pytest_query_budget.py); the max_queries fixture sets tighter ones.
+Run from the backend folder with `python -m pytest`.
+"""
+import os
+
+import pytest
+
+from benchmarks import common
+
+common.use_temp_workdir("pytest")
+# order notifications are queued but never sent from a test run
+os.environ.setdefault("OUTBOX_DISPATCH_IN_APP", "false")
+
+pytest_plugins = ["utils.pytest_query_budget"]
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "postgres: needs the suite on Postgres (BENCH_DATABASE_URL)")
+
+
+def pytest_collection_modifyitems(config, items):
+    from sqlalchemy.engine import make_url
+
+    if make_url(os.environ["DATABASE_URL"]).get_backend_name() == "postgresql":
+        return
+    skip = pytest.mark.skip(reason="needs Postgres: set BENCH_DATABASE_URL")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
+CUSTOMER = {
+    "full_name": "Test Buyer",
+    "email": "buyer@example.com",
+    "phone": "0712345678",
+    "address": "P.O. Box 1",
+    "city": "Nairobi",
+}
+
+
+def add_payment(transaction_id: str, order_id: int = None) -> int:
+    """A pending M-Pesa payment, for a new order unless order_id is given; returns the order id"""
+    from database import SessionLocal
+    from models import Order, Payment
+
+    with SessionLocal() as db:
+        if order_id is None:
+            order = Order(order_number=f"T{transaction_id[-8:]}", email=CUSTOMER["email"], phone=CUSTOMER["phone"],
+                          full_name=CUSTOMER["full_name"], address=CUSTOMER["address"], city=CUSTOMER["city"],
+                          total_amount=100.0)
+            db.add(order)
+            db.flush()
+            order_id = order.id
+        db.add(Payment(order_id=order_id, transaction_id=transaction_id, payment_method="mpesa", amount=100.0))
+        db.commit()
+    return order_id
+
+
+@pytest.fixture(scope="session")
+def app():
+    import main
+
+    return main.app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def catalog(app):
+    """Ids of a seeded catalog of 50 active products"""
+    from sqlalchemy import select
+
+    from database import SessionLocal
+    from models import Product
+
+    common.seed_products(50)
+    with SessionLocal() as db:
+        return db.execute(select(Product.id).order_by(Product.id)).scalars().all()
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    """Bearer token of the seeded admin, from POST /auth/login"""
+    import setup_database
+
+    setup_database.seed_data()
+    response = client.post("/auth/login", json={"email": "admin@schoolmall.co.ke", "password": "admin123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def set_stock():
+    """set_stock({product_id: quantity})"""
+    from sqlalchemy import update
+
+    from database import SessionLocal
+    from models import Product
+
+    def set_stock(stock: dict):
+        with SessionLocal() as db:
+            for product_id, quantity in stock.items():
+                db.execute(update(Product).where(Product.id == product_id).values(stock_quantity=quantity))
+            db.commit()
+    return set_stock
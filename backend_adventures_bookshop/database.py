@@ -1,23 +1,62 @@
 """
 Sets up SQLAlchemy database connection and session management
+Both a sync engine (SessionLocal / get_db) and an async engine
+(AsyncSessionLocal / get_async_db) are configured from the same DATABASE_URL
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from decouple import config
 
+from config import settings
+
 # Load DATABASE_URL from .env
 DATABASE_URL = config("DATABASE_URL", default="sqlite:///./dev.db")
 
+# Async drivers used for each backend when building the async engine
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its async counterpart"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = config("ASYNC_DATABASE_URL", default=get_async_database_url(DATABASE_URL))
+
+# Pool sizes come from the connection budget in config.py. In-memory SQLite
+# keeps its single shared connection, and aiosqlite opens one per use
+# (NullPool), so neither takes pool sizes
+POOL_OPTIONS = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+if make_url(DATABASE_URL).database in (None, "", ":memory:"):
+    POOL_OPTIONS = {}
+ASYNC_POOL_OPTIONS = {"pool_size": settings.ASYNC_DB_POOL_SIZE, "max_overflow": settings.ASYNC_DB_MAX_OVERFLOW}
+if make_url(ASYNC_DATABASE_URL).get_backend_name() == "sqlite":
+    ASYNC_POOL_OPTIONS = {}
+
 # SQLite needs extra args
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
-        DATABASE_URL, connect_args={"check_same_thread": False}
+        DATABASE_URL, connect_args={"check_same_thread": False}, **POOL_OPTIONS
     )
 else:
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, **POOL_OPTIONS)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **ASYNC_POOL_OPTIONS)
 
-# Session factory
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False so objects can still be serialized after commit
+# without triggering a lazy refresh outside the event loop
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 # Base class for models
 Base = declarative_base()
@@ -29,3 +68,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Async dependency for FastAPI routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
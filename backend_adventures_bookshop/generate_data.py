@@ -0,0 +1,465 @@
+# generate_data.py
+"""
+Bulk synthetic data for performance work: users, categories, products,
+orders with their items, and payments, in the millions if asked for.
+seed_data() in setup_database.py stays the small dev seed (and is run first,
+for the admin login); this writes to the same DATABASE_URL.
+
+The shape is meant to look like the shop's real traffic:
+- product popularity is Zipf-distributed, so a few products are in most
+  orders, and a few customers place many orders (guests place the rest)
+- orders follow the school calendar, peaking in January, May and September,
+  plus a weekly and daily cycle and slow growth over the --days of history
+- order and payment statuses depend on the order's age: old orders are
+  delivered or cancelled, recent ones still pending or on their way; some
+  paid orders have a failed M-Pesa attempt first
+
+Rows go in with Core insert() executemany on SQLite and COPY on Postgres, in
+batches of --batch-size, with fresh ids after the current maximum, so it can
+add to an existing database. The search index, dashboard counter and image
+reference triggers are dropped for the load and reinstalled (rebuilding them
+once) at the end, then ANALYZE refreshes the planner statistics.
+A fixed --seed gives the same dataset on an empty database.
+
+Usage: python generate_data.py --users 100000 --products 100000 --orders 1000000
+"""
+import argparse
+import csv
+import io
+import itertools
+import math
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+FIRST_NAMES = [
+    "Amina", "Brian", "Cynthia", "David", "Esther", "Faith", "George", "Grace", "Hassan", "Irene",
+    "James", "Joy", "Kevin", "Lucy", "Mercy", "Mohamed", "Nancy", "Otieno", "Peter", "Wanjiru",
+]
+LAST_NAMES = [
+    "Achieng", "Chege", "Kamau", "Kariuki", "Kiprop", "Mohamed", "Mutua", "Mwangi", "Njoroge",
+    "Ochieng", "Odhiambo", "Omondi", "Otieno", "Wafula", "Wambui", "Wanjiku",
+]
+CITIES = {
+    "Nairobi": 45, "Mombasa": 12, "Kisumu": 8, "Nakuru": 8, "Eldoret": 6, "Thika": 5,
+    "Machakos": 4, "Nyeri": 4, "Meru": 4, "Kakamega": 4,
+}
+STREETS = ["Moi Avenue", "Kenyatta Avenue", "Ngong Road", "Thika Road", "Oginga Odinga Street", "Kimathi Street"]
+
+# (name, median price in KES); the first three are the ones seed_data creates
+CATEGORIES = [
+    ("Books", 600), ("Stationery", 80), ("Technology", 15000), ("Revision Guides", 450),
+    ("Storybooks", 350), ("Exercise Books", 60), ("Pens & Pencils", 40), ("Art Supplies", 250),
+    ("Calculators", 1800), ("School Bags", 1500), ("Geometry Sets", 300), ("Dictionaries", 1200),
+    ("Atlases", 900), ("Laptops", 55000), ("Tablets", 22000), ("Printers", 18000),
+]
+ADJECTIVES = ["revised", "illustrated", "pocket", "deluxe", "spiral", "hardcover", "premium", "compact"]
+NOUNS = ["guide", "workbook", "atlas", "notebook", "calculator", "dictionary", "pen", "reader", "kit"]
+SUBJECTS = ["mathematics", "english", "kiswahili", "science", "geography", "history", "art", "music"]
+
+# Relative order volume by month (January to December), weekday (Monday
+# first) and hour of day
+MONTH_WEIGHTS = [3.0, 1.2, 0.9, 1.0, 1.8, 0.9, 0.8, 1.0, 1.6, 0.9, 0.8, 1.4]
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 1.1, 1.3, 0.8]
+HOUR_WEIGHTS = [
+    0.2, 0.1, 0.1, 0.1, 0.1, 0.3, 0.8, 1.5, 2.2, 2.6, 2.8, 2.9,
+    3.2, 3.0, 2.7, 2.6, 2.7, 3.0, 3.6, 4.2, 4.4, 3.6, 2.2, 0.9,
+]
+LINES_PER_ORDER = {1: 50, 2: 25, 3: 12, 4: 7, 5: 3, 6: 1, 7: 1, 8: 1}
+QUANTITIES = {1: 75, 2: 14, 3: 5, 4: 2, 5: 2, 10: 1, 20: 1}
+
+ZIPF_PRODUCTS = 1.1
+ZIPF_CUSTOMERS = 0.9
+ZIPF_CATEGORIES = 1.0
+GUEST_SHARE = 0.4
+MPESA_SHARE = 0.85
+RETRIED_PAYMENT_SHARE = 0.06
+
+
+def zipf_cum_weights(n: int, s: float):
+    """Cumulative weights for rank 1..n under a Zipf law with exponent s"""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def weighted(choices: dict):
+    """(population, cumulative weights) for random.choices"""
+    return list(choices), list(itertools.accumulate(choices.values()))
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def customer_name(user_id: int) -> str:
+    return f"{FIRST_NAMES[user_id % len(FIRST_NAMES)]} {LAST_NAMES[user_id * 7 % len(LAST_NAMES)]}"
+
+
+class Loader:
+    """Writes batches of rows to one table: COPY on Postgres, Core insert() executemany elsewhere"""
+
+    def __init__(self, engine, table, columns):
+        self.engine = engine
+        self.table = table
+        self.columns = columns
+        self.rows = 0
+        self.seconds = 0.0  # writing only; generating rows is counted by the caller
+
+    def write(self, rows):
+        if not rows:
+            return
+        started = time.perf_counter()
+        with self.engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                self._copy(connection, rows)
+            else:
+                connection.execute(self.table.insert(), [dict(zip(self.columns, row)) for row in rows])
+        self.seconds += time.perf_counter() - started
+        self.rows += len(rows)
+
+    def _copy(self, connection, rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)  # None becomes an empty, unquoted field: NULL
+        buffer.seek(0)
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {self.table.name} ({', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+            )
+        finally:
+            cursor.close()
+
+
+class Generator:
+    def __init__(self, engine, args):
+        self.engine = engine
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+        self.start = self.now - timedelta(days=args.days)
+        self.report = []  # (table, rows, generate + write seconds, write seconds)
+
+    def next_id(self, table):
+        from sqlalchemy import func, select
+
+        with self.engine.connect() as connection:
+            return (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+    def timed(self, name, loader, batches):
+        """Write each batch from the iterator; returns what it returned when done"""
+        started = time.perf_counter()
+        result = None
+        try:
+            while True:
+                loader.write(next(batches))
+        except StopIteration as done:
+            result = done.value
+        self.report.append((name, loader.rows, time.perf_counter() - started, loader.seconds))
+        print(f"  {name}: {loader.rows} rows in {time.perf_counter() - started:.1f} s")
+        return result
+
+    def users(self, password_hash):
+        from models import User
+
+        columns = ["id", "email", "phone", "full_name", "hashed_password", "role", "is_active", "created_at"]
+        first = self.next_id(User.__table__)
+        span = (self.now - self.start).total_seconds()
+
+        def batches():
+            rows = []
+            for user_id in range(first, first + self.args.users):
+                rows.append((
+                    user_id, f"user{user_id}@example.com", f"07{user_id:08d}", customer_name(user_id),
+                    password_hash, "customer", self.rng.random() > 0.02,
+                    self.start + timedelta(seconds=self.rng.random() * span),
+                ))
+                if len(rows) >= self.args.batch_size:
+                    yield rows
+                    rows = []
+            yield rows
+            return list(range(first, first + self.args.users))
+
+        return self.timed("users", Loader(self.engine, User.__table__, columns), batches())
+
+    def categories(self):
+        """{category id: median price} over the existing and new categories"""
+        from sqlalchemy import select
+
+        from models import Category
+
+        with self.engine.connect() as connection:
+            existing = connection.execute(select(Category.id, Category.name, Category.slug)).all()
+        names = {row.name for row in existing}
+        slugs = {row.slug for row in existing}
+        medians = {row.id: dict(CATEGORIES).get(row.name, 500) for row in existing}
+
+        columns = ["id", "name", "slug", "description", "is_active", "created_at"]
+        first = self.next_id(Category.__table__)
+        rows = []
+        for n in range(self.args.categories):
+            category_id = first + n
+            name, median = CATEGORIES[n % len(CATEGORIES)]
+            if n >= len(CATEGORIES):
+                name = f"{name} {n // len(CATEGORIES) + 1}"
+            if name in names or slugify(name) in slugs:
+                continue
+            names.add(name)
+            slugs.add(slugify(name))
+            medians[category_id] = median
+            rows.append((category_id, name, slugify(name), f"{name} for school and home", True, self.start))
+
+        def batches():
+            yield rows
+
+        self.timed("categories", Loader(self.engine, Category.__table__, columns), batches())
+        return medians
+
+    def products(self, category_medians):
+        """(product ids, prices) in popularity order, most popular first"""
+        from models import Product
+
+        columns = [
+            "id", "name", "slug", "description", "price", "original_price", "stock_quantity",
+            "category_id", "is_active", "is_featured", "on_sale", "created_at",
+        ]
+        first = self.next_id(Product.__table__)
+        category_ids = list(category_medians)
+        self.rng.shuffle(category_ids)
+        category_weights = zipf_cum_weights(len(category_ids), ZIPF_CATEGORIES)
+        # the catalog was built up over the year before the order history
+        catalog_start, span = self.start - timedelta(days=365), 365 * 86400
+        ids, prices = [], []
+
+        def batches():
+            rows = []
+            for product_id in range(first, first + self.args.products):
+                category_id = self.rng.choices(category_ids, cum_weights=category_weights)[0]
+                median = category_medians[category_id]
+                price = max(5.0, round(self.rng.lognormvariate(math.log(median), 0.5) / 5) * 5)
+                on_sale = self.rng.random() < 0.15
+                adjective, noun, subject = (
+                    self.rng.choice(ADJECTIVES), self.rng.choice(NOUNS), self.rng.choice(SUBJECTS),
+                )
+                grade = self.rng.randint(1, 12)
+                name = f"{adjective.title()} {subject.title()} {noun.title()} Grade {grade}"
+                rows.append((
+                    product_id, name, f"{slugify(name)}-{product_id}",
+                    f"A {adjective} {noun} for grade {grade} {subject}",
+                    price, round(price * 1.15 / 5) * 5 if on_sale else None,
+                    0 if self.rng.random() < 0.05 else self.rng.randint(5, 500),
+                    category_id, self.rng.random() > 0.05, self.rng.random() < 0.02, on_sale,
+                    catalog_start + timedelta(seconds=self.rng.random() * span),
+                ))
+                ids.append(product_id)
+                prices.append(price)
+                if len(rows) >= self.args.batch_size:
+                    yield rows
+                    rows = []
+            yield rows
+
+        self.timed("products", Loader(self.engine, Product.__table__, columns), batches())
+        # popularity does not follow the id order
+        ranked = list(zip(ids, prices))
+        self.rng.shuffle(ranked)
+        return [product_id for product_id, _ in ranked], [price for _, price in ranked]
+
+    def order_times(self):
+        """Order timestamps in ascending order, spread by season, weekday and hour"""
+        days = [self.start.date() + timedelta(days=n) for n in range(self.args.days)]
+        weights = [
+            MONTH_WEIGHTS[day.month - 1] * WEEKDAY_WEIGHTS[day.weekday()]
+            * (0.6 + 0.4 * n / max(1, len(days) - 1))  # growth over the history
+            * self.rng.uniform(0.85, 1.15)
+            for n, day in enumerate(days)
+        ]
+        total = sum(weights)
+        hours, hour_weights = list(range(24)), list(itertools.accumulate(HOUR_WEIGHTS))
+        emitted, cumulative = 0, 0.0
+        for day, weight in zip(days, weights):
+            cumulative += weight
+            count = round(self.args.orders * cumulative / total) - emitted
+            emitted += count
+            midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+            times = sorted(
+                midnight + timedelta(hours=hour, seconds=self.rng.randrange(3600))
+                for hour in self.rng.choices(hours, cum_weights=hour_weights, k=count)
+            )
+            yield from times
+
+    def order_status(self, created_at):
+        """(order status, payment status) for an order placed at created_at"""
+        age = (self.now - created_at).total_seconds() / 86400
+        roll = self.rng.random()
+        if age < 1:
+            if roll < 0.35:
+                return "pending", "pending"
+            if roll < 0.45:
+                return "cancelled", "failed"
+            return ("confirmed" if roll < 0.75 else "processing"), "completed"
+        if age < 7:
+            if roll < 0.08:
+                return "cancelled", "failed"
+            return ("processing" if roll < 0.25 else "shipped" if roll < 0.6 else "delivered"), "completed"
+        if roll < 0.06:
+            return "cancelled", "failed"
+        if roll < 0.08:
+            return "cancelled", "refunded"
+        return "delivered", "completed"
+
+    def orders(self, customer_ids, product_ids, product_prices):
+        from models import Order, OrderItem, Payment
+
+        order_columns = [
+            "id", "order_number", "user_id", "email", "phone", "full_name", "address", "city",
+            "total_amount", "status", "payment_status", "created_at",
+        ]
+        item_columns = ["id", "order_id", "product_id", "quantity", "price", "created_at"]
+        payment_columns = [
+            "id", "order_id", "transaction_id", "payment_method", "amount", "status",
+            "provider_reference", "created_at",
+        ]
+        orders = Loader(self.engine, Order.__table__, order_columns)
+        items = Loader(self.engine, OrderItem.__table__, item_columns)
+        payments = Loader(self.engine, Payment.__table__, payment_columns)
+        order_id = self.next_id(Order.__table__)
+        item_id = self.next_id(OrderItem.__table__)
+        payment_id = self.next_id(Payment.__table__)
+
+        rng = self.rng
+        product_weights = zipf_cum_weights(len(product_ids), ZIPF_PRODUCTS)
+        product_indexes = range(len(product_ids))
+        customer_weights = zipf_cum_weights(len(customer_ids), ZIPF_CUSTOMERS) if customer_ids else None
+        cities, city_weights = weighted(CITIES)
+        line_counts, line_weights = weighted(LINES_PER_ORDER)
+        quantities, quantity_weights = weighted(QUANTITIES)
+
+        started = time.perf_counter()
+        order_rows, item_rows, payment_rows = [], [], []
+
+        def flush():
+            orders.write(order_rows)
+            items.write(item_rows)
+            payments.write(payment_rows)
+            order_rows.clear()
+            item_rows.clear()
+            payment_rows.clear()
+
+        for created_at in self.order_times():
+            if customer_ids and rng.random() >= GUEST_SHARE:
+                user_id = rng.choices(customer_ids, cum_weights=customer_weights)[0]
+                email, phone, name = f"user{user_id}@example.com", f"07{user_id:08d}", customer_name(user_id)
+            else:
+                user_id = None
+                email, phone = f"guest{order_id}@example.com", f"07{rng.randrange(10 ** 8):08d}"
+                name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+            lines = set(rng.choices(product_indexes, cum_weights=product_weights,
+                                    k=rng.choices(line_counts, cum_weights=line_weights)[0]))
+            total = 0.0
+            for index in lines:
+                quantity = rng.choices(quantities, cum_weights=quantity_weights)[0]
+                total += product_prices[index] * quantity
+                item_rows.append((item_id, order_id, product_ids[index], quantity, product_prices[index], created_at))
+                item_id += 1
+
+            status, payment_status = self.order_status(created_at)
+            order_rows.append((
+                order_id, f"GEN{order_id:09d}", user_id, email, phone, name,
+                f"P.O. Box {rng.randint(1, 99999)}, {rng.choice(STREETS)}",
+                rng.choices(cities, cum_weights=city_weights)[0],
+                total, status, payment_status, created_at,
+            ))
+
+            if status != "pending" or rng.random() < 0.7:
+                mpesa = rng.random() < MPESA_SHARE
+                attempts = ["failed"] if payment_status == "completed" and rng.random() < RETRIED_PAYMENT_SHARE else []
+                attempts.append(payment_status)
+                for attempt, payment in enumerate(attempts):
+                    payment_rows.append((
+                        payment_id, order_id,
+                        f"ws_CO_GEN{payment_id:012d}" if mpesa else f"CARD-GEN{payment_id:012d}",
+                        "mpesa" if mpesa else "card", total, payment,
+                        f"R{payment_id:09d}" if payment in ("completed", "refunded") else None,
+                        created_at + timedelta(seconds=30 + 90 * attempt),
+                    ))
+                    payment_id += 1
+            order_id += 1
+
+            if len(order_rows) >= self.args.batch_size:
+                flush()
+        flush()
+
+        elapsed = time.perf_counter() - started
+        for name, loader in (("orders", orders), ("order_items", items), ("payments", payments)):
+            # generated together, so the generation time is shared by row count
+            share = loader.rows / max(1, orders.rows + items.rows + payments.rows)
+            generating = (elapsed - orders.seconds - items.seconds - payments.seconds) * share
+            self.report.append((name, loader.rows, loader.seconds + generating, loader.seconds))
+        print(f"  orders, order_items, payments: {orders.rows + items.rows + payments.rows} rows in {elapsed:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load synthetic users, products, orders and payments")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--categories", type=int, default=len(CATEGORIES))
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=730, help="days of order history, up to now")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per insert batch and transaction")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from sqlalchemy import text
+
+    import setup_database
+    from database import engine
+    from models import Base
+    from services import dashboard_stats, image_refs, passwords, search
+
+    Base.metadata.create_all(bind=engine)
+    setup_database.seed_data()
+    print(f"⏳ Generating into {engine.url.render_as_string(hide_password=True)}")
+
+    # Per-row trigger work is replaced by one rebuild after the load
+    with engine.begin() as connection:
+        search.uninstall(connection)
+        dashboard_stats.uninstall(connection)
+        image_refs.uninstall(connection)
+
+    started = time.perf_counter()
+    generator = Generator(engine, args)
+    # one hash for every generated user (password: "password"); bcrypt per row would take hours
+    customer_ids = generator.users(passwords.hash_password_sync("password"))
+    medians = generator.categories()
+    product_ids, product_prices = generator.products(medians)
+    generator.orders(customer_ids, product_ids, product_prices)
+    loaded = time.perf_counter() - started
+
+    indexing = time.perf_counter()
+    with engine.begin() as connection:
+        search.install(connection)
+        dashboard_stats.install(connection)
+        image_refs.install(connection)
+        if connection.dialect.name == "postgresql":
+            # ids were given explicitly, so move the sequences past them
+            for table in ("users", "categories", "products", "orders", "order_items", "payments"):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT coalesce(max(id), 1) FROM {table}))"
+                ))
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("ANALYZE"))
+    indexing = time.perf_counter() - indexing
+
+    rows = sum(count for _, count, _, _ in generator.report)
+    print(f"\n{'table':<12} {'rows':>10} {'seconds':>8} {'rows/s':>10} {'write rows/s':>13}")
+    for name, count, seconds, writing in generator.report:
+        print(f"{name:<12} {count:>10} {seconds:>8.1f} {count / max(seconds, 1e-9):>10.0f} "
+              f"{count / max(writing, 1e-9):>13.0f}")
+    print(f"{'total':<12} {rows:>10} {loaded:>8.1f} {rows / loaded:>10.0f}")
+    print(f"✅ {rows} rows in {loaded:.1f} s, plus {indexing:.1f} s rebuilding the search index, "
+          f"counters and statistics")
+
+
+if __name__ == "__main__":
+    main()
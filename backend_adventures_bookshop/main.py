@@ -1,16 +1,35 @@
-from fastapi import FastAPI, Depends
+import hmac
+import logging
+
+import anyio.to_thread
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 
-from database import engine
+from database import engine, async_engine
 from models import Base
 from routers import products, orders, auth, admin, payments
 from routers.auth import get_current_admin_user
+from config import settings
+from services import search, dashboard_stats, image_refs, images, passwords, outbox, mpesa, payment_callbacks
+from utils import metrics, query_budget
+from utils.responses import FastJSONResponse
+from utils.static import ContentAddressedStaticFiles
+
+logger = logging.getLogger(__name__)
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Zeus technologie API")
+# Full-text product search index, dashboard counters and image reference
+# counts, with their sync triggers
+with engine.begin() as connection:
+    search.install(connection)
+    dashboard_stats.install(connection)
+    image_refs.install(connection)
+
+# orjson for every JSON response; see utils/responses.py for the list fast path
+app = FastAPI(title="Zeus technologie API", default_response_class=FastJSONResponse)
 
 # CORS middleware - add this FIRST
 app.add_middleware(
@@ -22,8 +41,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Dev/test only: N+1 and per-route query budget checks (utils/query_budget.py)
+if settings.QUERY_DEBUG:
+    query_budget.enable(app)
+
+# Per-route request counts, latency and SQL statements, served at /metrics.
+# Added last, so it is the outermost middleware and times the whole stack
+if settings.METRICS_ENABLED:
+    metrics.install(engine)
+    metrics.install(async_engine.sync_engine)
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Static files (hashed image paths are served as immutable)
+app.mount("/static", ContentAddressedStaticFiles(directory="static"), name="static")
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
@@ -38,6 +68,58 @@ app.include_router(
     # dependencies=[Depends(get_current_admin_user)]
 )
 
+@app.on_event("startup")
+async def size_threadpool():
+    per_worker = (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+                  + settings.ASYNC_DB_POOL_SIZE + settings.ASYNC_DB_MAX_OVERFLOW)
+    if per_worker * settings.WEB_CONCURRENCY > settings.DB_MAX_CONNECTIONS:
+        logger.warning(
+            "%d workers x %d database connections each is over DB_MAX_CONNECTIONS (%d); "
+            "lower the pool sizes or the number of workers",
+            settings.WEB_CONCURRENCY, per_worker, settings.DB_MAX_CONNECTIONS,
+        )
+    # one thread per sync pooled connection (DB_POOL_SIZE), so excess sync
+    # requests wait for a thread instead of a connection; see config.py
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+@app.on_event("startup")
+async def start_background_workers():
+    if settings.OUTBOX_DISPATCH_IN_APP:
+        await outbox.start()
+    elif settings.NOTIFICATIONS_ENABLED and outbox.enabled_channels():
+        logger.warning(
+            "Order notifications are queued but OUTBOX_DISPATCH_IN_APP is off: "
+            "nothing is sent unless `python -m services.outbox` is running"
+        )
+    if settings.PAYMENT_CALLBACKS_IN_APP:
+        await payment_callbacks.start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await outbox.stop()
+    await payment_callbacks.stop()
+    await payment_callbacks.writer.close()
+
+@app.on_event("shutdown")
+async def close_mpesa_client():
+    await mpesa.shutdown()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    images.shutdown()
+    passwords.shutdown()
+
 @app.get("/")
 async def root():
-    return {"message": "AdventurersBookshop API is running!"}
\ No newline at end of file
+    return {"message": "AdventurersBookshop API is running!"}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    # async: rendered on the event loop, where the middleware updates the counters
+    # per-route traffic and SQL counts are not for anyone who asks: no token, no endpoint
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
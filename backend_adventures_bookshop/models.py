@@ -6,14 +6,24 @@ Defines all database tables using SQLAlchemy ORM:
 - Order: Customer orders
 - OrderItem: Individual items in an order
 - Payment: Payment records
+- DashboardStat: Precomputed admin dashboard counters
+- StoredImage: Uploaded images, their resized variants and reference counts
+- OutboxMessage: Pending email/WhatsApp notifications
+- PaymentCallback: Raw M-Pesa callbacks, one per checkout request
+- JobCheckpoint: Resume positions for long-running jobs
 """
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Enum, Index, JSON
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import relationship, query_expression
 from sqlalchemy.sql import func
 from database import Base
 import enum
 
+# SQLite's CURRENT_TIMESTAMP has no microseconds; bind Python datetimes in the
+# same format so keyset comparisons on created_at line up with stored values
+Timestamp = DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite")
+
 class UserRole(str, enum.Enum):
     admin = "admin"
     customer = "customer"
@@ -32,6 +42,11 @@ class PaymentStatus(str, enum.Enum):
     failed = "failed"
     refunded = "refunded"
 
+class OutboxStatus(str, enum.Enum):
+    pending = "pending"
+    sent = "sent"
+    failed = "failed"
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -41,7 +56,7 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(UserRole), default=UserRole.customer)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     orders = relationship("Order", back_populates="user")
 
 class Category(Base):
@@ -52,7 +67,7 @@ class Category(Base):
     description = Column(Text, nullable=True)
     image = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     products = relationship("Product", back_populates="category")
 
 class Product(Base):
@@ -69,9 +84,22 @@ class Product(Base):
     is_active = Column(Boolean, default=True)
     is_featured = Column(Boolean, default=False)
     on_sale = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     category = relationship("Category", back_populates="products")
     order_items = relationship("OrderItem", back_populates="product")
+    image_asset = relationship(
+        "StoredImage", primaryjoin="foreign(Product.image) == StoredImage.path",
+        viewonly=True, lazy="selectin",
+    )
+    __table_args__ = (
+        # keyset pagination: admin listing and public (active-only) listing
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_is_active_created_at_id", "is_active", "created_at", "id"),
+    )
+
+    @property
+    def image_variants(self):
+        return self.image_asset.variants if self.image_asset else None
 
 class Order(Base):
     __tablename__ = "orders"
@@ -87,21 +115,25 @@ class Order(Base):
     status = Column(Enum(OrderStatus), default=OrderStatus.pending)
     payment_status = Column(Enum(PaymentStatus), default=PaymentStatus.pending)
     notes = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     user = relationship("User", back_populates="orders")
-    order_items = relationship("OrderItem", back_populates="order", lazy="joined")
+    order_items = relationship("OrderItem", back_populates="order")
     payments = relationship("Payment", back_populates="order")
+    item_count = query_expression()  # filled by with_expression() in list queries
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+    )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     order = relationship("Order", back_populates="order_items")
-    product = relationship("Product", back_populates="order_items", lazy="joined")
+    product = relationship("Product", back_populates="order_items")
 
 class Payment(Base):
     __tablename__ = "payments"
@@ -113,8 +145,12 @@ class Payment(Base):
     status = Column(Enum(PaymentStatus), default=PaymentStatus.pending)
     provider_reference = Column(String, nullable=True)
     provider_response = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(Timestamp, server_default=func.now())
     order = relationship("Order", back_populates="payments")
+    __table_args__ = (
+        # pending payments oldest first, for reconciliation
+        Index("ix_payments_status_created_at_id", "status", "created_at", "id"),
+    )
 
 
     #For admin to be able to change Hero banner
@@ -127,5 +163,91 @@ class HeroBanner(Base):
     subtitle = Column(String, nullable=True)
     description = Column(String, nullable=True)
     image = Column(String, nullable=False)  # store /static/images/filename
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
- 
\ No newline at end of file
+    created_at = Column(Timestamp, server_default=func.now())
+    image_asset = relationship(
+        "StoredImage", primaryjoin="foreign(HeroBanner.image) == StoredImage.path",
+        viewonly=True, lazy="selectin",
+    )
+
+    @property
+    def image_variants(self):
+        return self.image_asset.variants if self.image_asset else None
+
+class DashboardStat(Base):
+    # Precomputed admin dashboard counters, kept current by database
+    # triggers (see services/dashboard_stats.py). Each counter is the sum of
+    # its shard rows, so concurrent writes don't all lock the same row
+    __tablename__ = "dashboard_stats"
+
+    name = Column(String, primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    value = Column(Integer, nullable=False, default=0)
+
+
+class StoredImage(Base):
+    # One row per distinct uploaded image, keyed by its public path, with the
+    # resized variants rendered by services/images.py. Files are named after
+    # their sha256 so identical uploads share a row; ref_count (how many
+    # products and banners point at it) is kept by triggers, see
+    # services/image_refs.py
+    __tablename__ = "images"
+
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String, unique=True, index=True, nullable=False)  # /static/images/filename
+    content_hash = Column(String(64), unique=True, index=True, nullable=True)  # sha256 hex, null for legacy uploads
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    variants = Column(JSON, nullable=True)  # sizes + srcset, see services/images.render_variants
+    created_at = Column(Timestamp, server_default=func.now())
+
+class OutboxMessage(Base):
+    # Notifications written in the same transaction as the change that
+    # triggers them, delivered afterwards by services/outbox.py.
+    # next_attempt_at doubles as the claim lease while a dispatcher works on it
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    channel = Column(String, nullable=False)  # "email" or "whatsapp"
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=True)
+    body = Column(Text, nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.pending, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(Timestamp, server_default=func.now(), nullable=False)
+    claim_token = Column(String(32), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(Timestamp, server_default=func.now())
+    sent_at = Column(Timestamp, nullable=True)
+    __table_args__ = (
+        Index("ix_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+class PaymentCallback(Base):
+    # Written once per CheckoutRequestID by POST /payments/mpesa/callback
+    # (repeat deliveries are ignored) and applied to payments and orders
+    # in batches by services/payment_callbacks.py, which sets processed_at
+    __tablename__ = "payment_callbacks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    checkout_request_id = Column(String, nullable=False, unique=True)
+    merchant_request_id = Column(String, nullable=True)
+    result_code = Column(Integer, nullable=False)
+    result_desc = Column(String, nullable=True)
+    receipt_number = Column(String, nullable=True)
+    amount = Column(Float, nullable=True)
+    payload = Column(Text, nullable=False)
+    received_at = Column(Timestamp, server_default=func.now())
+    processed_at = Column(Timestamp, nullable=True)
+    __table_args__ = (
+        Index("ix_payment_callbacks_processed_at_id", "processed_at", "id"),
+    )
+
+class JobCheckpoint(Base):
+    # Where a long-running job (e.g. services/reconciliation.py) got to, saved
+    # in the same transaction as the work it covers
+    __tablename__ = "job_checkpoints"
+
+    name = Column(String, primary_key=True)
+    position = Column(JSON, nullable=False)
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
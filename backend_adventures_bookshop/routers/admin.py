@@ -1,12 +1,25 @@
+from dataclasses import asdict
+from datetime import datetime
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Form
-from sqlalchemy.orm import Session
-import os, uuid
-
-from database import get_db
-from models import User, Product, Order, HeroBanner
-from schemas import ProductCreate, ProductUpdate, Product as ProductSchema, Order as OrderSchema
-from routers.auth import get_current_admin_user
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+import os
+
+from config import settings
+from database import get_db, get_async_db
+from models import User, Product, Order, HeroBanner, StoredImage
+from schemas import ProductCreate, ProductUpdate, Product as ProductSchema, OrderSummary, Page, HeroBanner as HeroBannerSchema
+from routers.auth import get_current_admin_user, token_cache, user_cache
+from routers.orders import ORDER_SUMMARY_OPTIONS
+from routers.products import catalog_cache, invalidate_catalog
+from utils.pagination import page_params, paginate, make_page, MAX_PAGE_SIZE
+from utils.responses import fast_response
+from utils.uploads import save_image_upload, remove_file, image_url, IMAGE_DIR
+from services import search, dashboard_stats, exports, images, product_import, reconciliation
 
 
 
@@ -15,41 +28,98 @@ router = APIRouter()
 STATIC_DIR = "static/images"
 
 # Admin-only routes
-@router.get("/orders", response_model=List[OrderSchema])
-def get_all_orders(db: Session = Depends(get_db), admin_user: User = Depends(get_current_admin_user)):
-    return db.query(Order).order_by(Order.created_at.desc()).all()
+@router.get("/orders", response_model=Page[OrderSummary])
+def get_all_orders(page: dict = Depends(page_params), db: Session = Depends(get_db), admin_user: User = Depends(get_current_admin_user)):
+    orders = paginate(db.query(Order).options(*ORDER_SUMMARY_OPTIONS), Order, **page).all()
+    return fast_response(Page[OrderSummary], make_page(orders, page["limit"]))
+
+def export_params(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    created_from: datetime = Query(None, description="inclusive; ISO 8601, UTC if no offset is given"),
+    created_to: datetime = Query(None, description="exclusive; ISO 8601, UTC if no offset is given"),
+) -> dict:
+    return {"fmt": format, "created_from": created_from, "created_to": created_to}
+
+def export_response(kind: str, chunks, fmt: str) -> StreamingResponse:
+    # chunks is a sync generator, so Starlette runs it in the threadpool
+    return StreamingResponse(
+        chunks,
+        media_type=exports.MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{exports.export_filename(kind, fmt)}"'},
+    )
+
+@router.get("/orders/export")
+def export_orders(params: dict = Depends(export_params), admin_user: User = Depends(get_current_admin_user)):
+    # streamed from a server-side cursor on its own connection; see services/exports.py
+    return export_response("orders", exports.export_orders(**params), params["fmt"])
 
 @router.get("/dashboard")
 def get_dashboard_stats(db: Session = Depends(get_db), admin_user: User = Depends(get_current_admin_user)):
-    total_products = db.query(Product).filter(Product.is_active == True).count()
-    total_orders = db.query(Order).count()
-    total_users = db.query(User).count()
-    recent_orders = db.query(Order).order_by(Order.created_at.desc()).limit(5).all()
+    # counters are maintained by triggers; see services/dashboard_stats.py
+    stats = dashboard_stats.read(db)
+    recent_orders = (
+        db.query(Order)
+        .options(*ORDER_SUMMARY_OPTIONS)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(5)
+        .all()
+    )
     return {
-        "total_products": total_products,
-        "total_orders": total_orders,
-        "total_users": total_users,
-        "recent_orders": recent_orders
+        "total_products": stats.get("total_products", 0),
+        "total_orders": stats.get("total_orders", 0),
+        "total_users": stats.get("total_users", 0),
+        "recent_orders": [OrderSummary.model_validate(order) for order in recent_orders]
     }
 
 
-@router.get("/products", response_model=List[ProductSchema])
-def get_all_products(db: Session = Depends(get_db), admin_user: User = Depends(get_current_admin_user)):
-    return db.query(Product).order_by(Product.created_at.desc()).all()
+@router.get("/cache-stats")
+def get_cache_stats(admin_user: User = Depends(get_current_admin_user)):
+    # Hit/miss counters for the in-process caches (per worker process)
+    return {
+        "catalog": catalog_cache.stats(),
+        "auth_tokens": token_cache.stats(),
+        "auth_users": user_cache.stats(),
+    }
+
+
+@router.post("/payments/reconcile")
+async def reconcile_payments(
+    restart: bool = False,
+    max_pages: int = Query(settings.RECONCILE_REQUEST_MAX_PAGES, ge=1, le=settings.RECONCILE_REQUEST_MAX_PAGES),
+    admin_user: User = Depends(get_current_admin_user),
+):
+    # Settles pending M-Pesa payments from the status API; see services/reconciliation.py.
+    # A bounded slice per request, so it finishes well within proxy timeouts;
+    # "finished": false means call again to carry on from the checkpoint
+    try:
+        report = await reconciliation.reconcile(resume=not restart, max_pages=max_pages)
+    except reconciliation.AlreadyRunning:
+        raise HTTPException(status_code=409, detail="Reconciliation is already running")
+    return {**asdict(report), "summary": report.summary()}
+
+
+@router.get("/products", response_model=Page[ProductSchema])
+def get_all_products(page: dict = Depends(page_params), db: Session = Depends(get_db), admin_user: User = Depends(get_current_admin_user)):
+    products = paginate(db.query(Product).options(selectinload(Product.category)), Product, **page).all()
+    return fast_response(Page[ProductSchema], make_page(products, page["limit"]))
 
     # to enable searching products by fetching api
 @router.get("/products/search", response_model=List[ProductSchema])
 def search_products(
     q: str = Query(..., description="Search term"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     admin_user: User = Depends(get_current_admin_user)
 ):
-    return (
-        db.query(Product)
-        .filter(Product.name.ilike(f"%{q}%"))  # case-insensitive search
-        .order_by(Product.created_at.desc())
-        .all()
-    ) 
+    # ranked full-text search; admins also see inactive products
+    stmt = search.search_statement(db.bind.dialect.name, q, limit, active_only=False)
+    if stmt is None:
+        return []
+    return fast_response(List[ProductSchema], db.execute(stmt).scalars().all())
+
+@router.get("/products/export")
+def export_products(params: dict = Depends(export_params), admin_user: User = Depends(get_current_admin_user)):
+    return export_response("products", exports.export_products(**params), params["fmt"])
 
 @router.post("/products", response_model=ProductSchema)
 def create_product(product: ProductCreate, db: Session = Depends(get_db), admin_user: User = Depends(get_current_admin_user)):
@@ -60,9 +130,30 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db), admin_
     db_product = Product(**product.dict(exclude_unset=True))
     db.add(db_product)
     db.commit()
+    invalidate_catalog()
     db.refresh(db_product)
     return db_product
 
+@router.post("/products/import")
+def import_products(
+    file: UploadFile = File(...),
+    format: str = Query(None, description="csv or ndjson; taken from the file name or content type if not given"),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(get_current_admin_user),
+):
+    # Sync: the upload is read row by row from its spooled temp file and
+    # upserted in batches in the threadpool; see services/product_import.py
+    try:
+        fmt = format or product_import.detect_format(file.filename, file.content_type)
+        report = product_import.import_products(db, file.file, fmt, dry_run=dry_run)
+    except product_import.ImportFileError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        if not dry_run:
+            invalidate_catalog()  # batches committed before a failure count too
+    return asdict(report)
+
 @router.put("/products/{product_id}", response_model=ProductSchema)
 def update_product(product_id: int, product_update: ProductUpdate, db: Session = Depends(get_db), admin_user: User = Depends(get_current_admin_user)):
     db_product = db.query(Product).filter(Product.id == product_id).first()
@@ -77,6 +168,7 @@ def update_product(product_id: int, product_update: ProductUpdate, db: Session =
     for field, value in product_update.dict(exclude_unset=True).items():
         setattr(db_product, field, value)
     db.commit()
+    invalidate_catalog()
     db.refresh(db_product)
     return db_product
 
@@ -87,65 +179,88 @@ def delete_product(product_id: int, db: Session = Depends(get_db), admin_user: U
         raise HTTPException(status_code=404, detail="Product not found")
     db.delete(db_product)  # ✅ Hard delete
     db.commit()
+    invalidate_catalog()
     return {"message": "Product deleted successfully"}
 
 # ----------------------
 # Image Upload
 # ----------------------
 
-@router.post("/upload-image")
-async def upload_image(file: UploadFile = File(...), admin_user: User = Depends(get_current_admin_user)):
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
-
-    os.makedirs("static/images", exist_ok=True)
-    file_extension = os.path.splitext(file.filename)[1]
-    filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join("static/images", filename)
+async def store_image(file: UploadFile, db: AsyncSession) -> StoredImage:
+    """
+    Save an upload, render its variants in the process pool and record them
+    (caller commits). Identical content is stored once: a re-upload returns
+    the existing row, whose ref_count the referencing row's trigger bumps.
+    Call before making other changes in the session: losing a race for the
+    same content rolls it back.
+    """
+    filename, digest = await save_image_upload(file)
+    existing = (await db.execute(
+        select(StoredImage).where(StoredImage.content_hash == digest)
+    )).scalar_one_or_none()
+    if existing:
+        if existing.path != image_url(filename):
+            # same bytes uploaded under another extension
+            await remove_file(os.path.join(IMAGE_DIR, filename))
+        return existing
 
     try:
-        with open(file_path, "wb") as buffer:
-            buffer.write(await file.read())
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+        variants = await images.generate_variants(IMAGE_DIR, filename)
+    except ValueError:
+        await remove_file(os.path.join(IMAGE_DIR, filename))
+        raise HTTPException(status_code=400, detail="File must be a valid image")
+    stored = StoredImage(
+        path=image_url(filename),
+        content_hash=digest,
+        width=variants["width"],
+        height=variants["height"],
+        variants=variants,
+    )
+    db.add(stored)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # a concurrent request stored the same content first
+        await db.rollback()
+        return (await db.execute(select(StoredImage).where(StoredImage.content_hash == digest))).scalar_one()
+    return stored
 
-    return {"filename": filename, "url": f"/static/images/{filename}"}
+@router.post("/upload-image")
+async def upload_image(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db), admin_user: User = Depends(get_current_admin_user)):
+    stored = await store_image(file, db)
+    await db.commit()
+    return {
+        "filename": os.path.basename(stored.path),
+        "url": stored.path,
+        "variants": stored.variants,
+    }
 
     #Admin to be able to add or delete hero banners
-@router.get("/hero-banners")
+@router.get("/hero-banners", response_model=List[HeroBannerSchema])
 def get_banners(db: Session = Depends(get_db)):
     return db.query(HeroBanner).order_by(HeroBanner.created_at.desc()).all()
 
 
-@router.post("/hero-banners")
+@router.post("/hero-banners", response_model=HeroBannerSchema)
 async def create_banner(
     title: str,
     subtitle: str = None,
     description: str = None,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     admin_user = Depends(get_current_admin_user)
 ):
-    if not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="File must be an image")
-
-    os.makedirs("static/images", exist_ok=True)
-    ext = os.path.splitext(file.filename)[1]
-    filename = f"{uuid.uuid4()}{ext}"
-    file_path = os.path.join("static/images", filename)
-
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
+    stored = await store_image(file, db)
 
     banner = HeroBanner(
         title=title,
         subtitle=subtitle,
         description=description,
-        image=f"/static/images/{filename}"
+        image=stored.path
     )
     db.add(banner)
-    db.commit()
-    db.refresh(banner)
+    await db.commit()
+    await db.refresh(banner)
     return banner
 
 @router.delete("/admin/hero-banners/{banner_id}")
@@ -154,13 +269,8 @@ def delete_hero_banner(banner_id: int, db: Session = Depends(get_db)):
     if not banner:
         raise HTTPException(status_code=404, detail="Banner not found")
 
-    # Remove old image file
-    if banner.image:
-        # remove leading "/" if stored like "/static/images/file.jpg"
-        file_path = banner.image.lstrip("/")
-        if os.path.exists(file_path):
-            os.remove(file_path)
-
+    # the image may be shared; its file goes once its ref_count reaches zero
+    # (triggers in services/image_refs.py, files removed by clean_oldphotos.py)
     db.delete(banner)
     db.commit()
     return {"message": "Banner and image deleted successfully"}
@@ -168,36 +278,31 @@ def delete_hero_banner(banner_id: int, db: Session = Depends(get_db)):
 
 from fastapi import UploadFile, Form
 
-@router.put("/admin/hero-banners/{banner_id}")
+@router.put("/admin/hero-banners/{banner_id}", response_model=HeroBannerSchema)
 async def update_hero_banner(
     banner_id: int,
     title: str = Form(...),
     subtitle: str = Form(None),
     description: str = Form(None),
     image: UploadFile = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    banner = db.query(HeroBanner).filter(HeroBanner.id == banner_id).first()
+    banner = await db.get(HeroBanner, banner_id)
     if not banner:
         raise HTTPException(status_code=404, detail="Banner not found")
 
+    # If new image is uploaded → store it (deduplicated); the old one is
+    # released by the ref_count trigger when banner.image changes
+    if image:
+        stored = await store_image(image, db)
+        banner = await db.get(HeroBanner, banner_id)  # reloaded if store_image rolled back
+        banner.image = stored.path  # keep format /static/images/filename
+
     # Update fields
     banner.title = title
     banner.subtitle = subtitle
     banner.description = description
 
-    # If new image is uploaded → delete old file and save new
-    if image:
-        if banner.image:
-            old_path = banner.image.lstrip("/")
-            if os.path.exists(old_path):
-                os.remove(old_path)
-
-        file_location = f"static/images/{image.filename}"
-        with open(file_location, "wb+") as f:
-            f.write(await image.read())
-        banner.image = f"/{file_location}"  # keep format /static/images/filename
-
-    db.commit()
-    db.refresh(banner)
+    await db.commit()
+    await db.refresh(banner)
     return banner
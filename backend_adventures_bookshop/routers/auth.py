@@ -1,27 +1,58 @@
+import time
 from datetime import datetime, timedelta
+from itertools import chain
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.responses import JSONResponse
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 
-from database import get_db
+from database import get_async_db
 from models import User
 from schemas import UserLogin, Token, User as UserSchema
 from config import settings
+from services import passwords
+from utils.cache import TTLCache
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+# Per-process caches for get_current_user: verified claims by token (never
+# kept past the token's exp) and user column values by email. The session
+# hooks below clear the user cache when a session in this process commits a
+# change to a User, through the ORM or an ORM-enabled update()/delete().
+# Anything they can't see (another worker, a Core statement on a connection,
+# SQL run by hand) shows up only once the entry expires, so a deactivated
+# user or a revoked admin keeps access for up to AUTH_CACHE_TTL_SECONDS
+token_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+user_cache = TTLCache(maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+
+USER_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+@event.listens_for(Session, "after_flush")
+def _note_user_changes(session, flush_context):
+    if any(isinstance(obj, User) for obj in chain(session.dirty, session.deleted)):
+        session.info["users_changed"] = True
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+@event.listens_for(Session, "do_orm_execute")
+def _note_user_statements(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and any(
+        mapper.class_ is User for mapper in orm_execute_state.all_mappers
+    ):
+        orm_execute_state.session.info["users_changed"] = True
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+@event.listens_for(Session, "after_commit")
+def _invalidate_user_cache(session):
+    if session.info.pop("users_changed", False):
+        user_cache.clear()
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_user_changes(session, previous_transaction):
+    session.info.pop("users_changed", None)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -32,13 +63,50 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email)
-    if not user or not verify_password(password, user.hashed_password):
+def decode_token(token: str) -> dict:
+    """Verified claims for a token, cached until it expires; raises JWTError"""
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        ttl = min(token_cache.ttl, claims.get("exp", 0) - time.time())
+        if ttl > 0:
+            token_cache.set(token, claims, ttl=ttl)
+    return claims
+
+async def get_cached_user(db: AsyncSession, email: str):
+    """
+    User by email without blocking the event loop. Cache hits return a fresh
+    detached copy (column attributes only), so requests never share an instance.
+    """
+    values = user_cache.get(email)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return user
+
+    generation = user_cache.generation
+    result = await db.execute(select(User).filter(User.email == email))
+    user = result.scalars().first()
+    if user is not None:
+        user_cache.set(email, {key: getattr(user, key) for key in USER_COLUMNS}, generation=generation)
+    return user
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    result = await db.execute(select(User).filter(User.email == email))
+    user = result.scalars().first()
+    if not user:
+        return None
+    # bcrypt runs on the bounded password pool (503 when saturated)
+    valid, new_hash = await passwords.verify_password(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # stored hash used an old cost; upgrade it transparently
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
-async def get_current_user(request: Request, db: Session = Depends(get_db)):
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -57,15 +125,15 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)):
         raise credentials_exception
         
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = get_user_by_email(db, email=email)
-    if user is None:
+    user = await get_cached_user(db, email=email)
+    if user is None or not user.is_active:
         raise credentials_exception
     return user
 
@@ -76,8 +144,8 @@ async def get_current_admin_user(current_user: User = Depends(get_current_user))
 
 # Admin login only - REMOVED response_model since we're returning JSONResponse
 @router.post("/login")
-def login_admin(user_login: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_login.email, user_login.password)
+async def login_admin(user_login: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, user_login.email, user_login.password)
     if not user:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
     if user.role != "admin":
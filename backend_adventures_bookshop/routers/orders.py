@@ -1,16 +1,40 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, raiseload, selectinload, with_expression
+from sqlalchemy import case, func, insert, select, update
 
+from config import settings
 from database import get_db
 from models import Order, OrderItem, Product, User
-from schemas import Order as OrderSchema, OrderCreate
+from schemas import Order as OrderSchema, OrderCreate, OrderSummary, Page
 from routers.auth import get_current_user
+from routers.products import invalidate_catalog
+from services import outbox
+from utils.pagination import page_params, paginate, make_page
+from utils.responses import fast_response
 import uuid
 
 router = APIRouter()
 
+# Loader strategies per view. Detail: items, their products and categories
+# in one extra query per level. Lists: a correlated line count, and any
+# accidental access to items raises instead of lazy-loading per row.
+ORDER_DETAIL_OPTIONS = (
+    selectinload(Order.order_items)
+    .selectinload(OrderItem.product)
+    .selectinload(Product.category),
+)
+ORDER_SUMMARY_OPTIONS = (
+    with_expression(
+        Order.item_count,
+        select(func.count(OrderItem.id))
+        .where(OrderItem.order_id == Order.id)
+        .correlate_except(OrderItem)
+        .scalar_subquery(),
+    ),
+    raiseload(Order.order_items),
+)
+
 def generate_order_number():
     return f"SM{uuid.uuid4().hex[:8].upper()}"
 
@@ -20,31 +44,59 @@ def create_order(
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
-    # Calculate total amount
-    total_amount = 0
-    order_items = []
-    
+    # Merge repeated lines for the same product
+    quantities = {}
     for item in order.items:
-        product = db.Query(Product).filter(Product.id == item.product_id).first()
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    # One round trip for every product in the cart, locking their rows in id
+    # order (FOR UPDATE; SQLite has no row locks and ignores it). Carts that
+    # share products then queue one behind the other instead of each holding
+    # a row the other is waiting for, which deadlocks on Postgres
+    products = {
+        product.id: product
+        for product in db.query(Product)
+        .filter(Product.id.in_(quantities))
+        .order_by(Product.id)
+        .with_for_update()
+        .all()
+    }
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
         if not product:
-            raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
-        
-        if product.stock_quantity < item.quantity:
+            raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+        if product.stock_quantity < quantity:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Insufficient stock for {product.name}. Available: {product.stock_quantity}"
             )
-        
-        item_total = product.price * item.quantity
-        total_amount += item_total
-        
-        order_items.append({
-            "product_id": product.id,
-            "quantity": item.quantity,
-            "price": product.price
-        })
-    
-    # Create order
+
+    total_amount = sum(products[product_id].price * quantity for product_id, quantity in quantities.items())
+
+    # Reserve stock for every line in one conditional UPDATE, on the rows
+    # locked above. Its WHERE clause is the guard against overselling where
+    # nothing was locked (SQLite: checkouts can race past the check above).
+    # If any line is short, fewer rows match and the whole order is rolled back. Nothing is committed until the end, so if anything
+    # raises, get_db's close() discards the half-finished order.
+    ordered = case(quantities, value=Product.id)
+    result = db.execute(
+        update(Product)
+        .where(Product.id.in_(quantities), Product.stock_quantity >= ordered)
+        .values(stock_quantity=Product.stock_quantity - ordered)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(quantities):
+        db.rollback()
+        short = db.execute(
+            select(Product.name)
+            .where(Product.id.in_(quantities), Product.stock_quantity < ordered)
+            .order_by(Product.id)
+        ).scalars().first()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Insufficient stock for {short or 'an item in the order'}"
+        )
+
     db_order = Order(
         order_number=generate_order_number(),
         email=order.email,
@@ -55,39 +107,44 @@ def create_order(
         total_amount=total_amount,
         notes=order.notes
     )
-    
     db.add(db_order)
+    db.flush()
+
+    db.execute(insert(OrderItem), [
+        {
+            "order_id": db_order.id,
+            "product_id": product_id,
+            "quantity": quantity,
+            "price": products[product_id].price,
+        }
+        for product_id, quantity in quantities.items()
+    ])
+
+    # Notifications are only queued here, in the same transaction;
+    # services/outbox.py delivers them after the commit
+    if settings.NOTIFICATIONS_ENABLED:
+        outbox.enqueue_order_notifications(db, db_order, [
+            (products[product_id].name, quantity, products[product_id].price)
+            for product_id, quantity in quantities.items()
+        ])
+
+    # Order, items, stock changes and notifications land together or not at all
     db.commit()
-    db.refresh(db_order)
-    
-    # Create order items
-    for item_data in order_items:
-        db_item = OrderItem(
-            order_id=db_order.id,
-            **item_data
-        )
-        db.add(db_item)
-        
-        # Update product stock
-        product = db.query(Product).filter(Product.id == item_data["product_id"]).first()
-        product.stock_quantity -= item_data["quantity"]
-    
-    db.commit()
-    db.refresh(db_order)
-    return db_order
+    invalidate_catalog()  # cached list and product bodies carry stock_quantity
+    background_tasks.add_task(outbox.notify)
+    return db.query(Order).options(*ORDER_DETAIL_OPTIONS).filter(Order.id == db_order.id).one()
 
-@router.get("/", response_model=List[OrderSchema])
+@router.get("/", response_model=Page[OrderSummary])
 def get_orders(
-    skip: int = 0,
-    limit: int = 100,
+    page: dict = Depends(page_params),
     db: Session = Depends(get_db)
 ):
-    orders = db.query(Order).offset(skip).limit(limit).all()
-    return orders
+    orders = paginate(db.query(Order).options(*ORDER_SUMMARY_OPTIONS), Order, **page).all()
+    return fast_response(Page[OrderSummary], make_page(orders, page["limit"]))
 
 @router.get("/{order_id}", response_model=OrderSchema)
 def get_order(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = db.query(Order).options(*ORDER_DETAIL_OPTIONS).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
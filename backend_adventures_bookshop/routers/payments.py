@@ -1,52 +1,75 @@
-import base64
 import json
-import requests
-from datetime import datetime
-from typing import Optional
+import httpx
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
-from models import Payment, Order
+from database import get_async_db
+from models import Payment, PaymentStatus, Order
 from schemas import PaymentCreate
-from config import settings
+from services import mpesa, payment_callbacks
 
 router = APIRouter()
 
-def get_mpesa_access_token():
-    consumer_key = settings.MPESA_CONSUMER_KEY
-    consumer_secret = settings.MPESA_CONSUMER_SECRET
-    
-    api_url = "https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials"
-    encoded_credentials = base64.b64encode(f"{consumer_key}:{consumer_secret}".encode()).decode()
-    
-    headers = {"Authorization": f"Basic {encoded_credentials}"}
-    response = requests.get(api_url, headers=headers)
-    return response.json().get("access_token")
-
 @router.post("/mpesa")
-def initiate_mpesa_payment(payment: PaymentCreate, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == payment.order_id).first()
+async def initiate_mpesa_payment(payment: PaymentCreate, db: AsyncSession = Depends(get_async_db)):
+    order = await db.get(Order, payment.order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    
-    # For demo purposes, return success
+
+    # The amount charged is the order total, not what the client sent
+    try:
+        result = await mpesa.get_client().stk_push(
+            phone=payment.phone_number,
+            amount=order.total_amount,
+            account_reference=order.order_number,
+            description=f"Order {order.order_number}",
+        )
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="M-Pesa did not respond in time, please try again")
+    except httpx.HTTPError:
+        raise HTTPException(status_code=502, detail="Could not reach M-Pesa, please try again")
+
+    if result.get("ResponseCode") != "0":
+        raise HTTPException(status_code=400, detail=result.get("ResponseDescription", "STK push rejected"))
+
+    # Pending until the callback (or reconciliation) reports the outcome
+    db.add(Payment(
+        order_id=order.id,
+        transaction_id=result["CheckoutRequestID"],
+        payment_method="mpesa",
+        amount=order.total_amount,
+        provider_reference=result.get("MerchantRequestID"),
+        provider_response=json.dumps(result),
+    ))
+    await db.commit()
     return {
         "success": True,
-        "message": "STK Push sent successfully",
-        "checkout_request_id": "sample_request_id"
+        "message": result.get("CustomerMessage", "STK Push sent successfully"),
+        "checkout_request_id": result["CheckoutRequestID"],
     }
 
 @router.post("/mpesa/callback")
-async def mpesa_callback(request: Request, db: Session = Depends(get_db)):
-    return {"ResultCode": 0, "ResultDesc": "Success"}
+async def mpesa_callback(request: Request):
+    # Store and acknowledge only; services/payment_callbacks.py applies it
+    # on its next poll. A repeat delivery of the same CheckoutRequestID is a no-op
+    try:
+        await payment_callbacks.ingest(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Malformed M-Pesa callback")
+    return {"ResultCode": 0, "ResultDesc": "Accepted"}
 
 @router.get("/verify/{transaction_id}")
-def verify_payment(transaction_id: str, db: Session = Depends(get_db)):
+async def verify_payment(transaction_id: str, db: AsyncSession = Depends(get_async_db)):
+    payment = (await db.execute(select(Payment).where(Payment.transaction_id == transaction_id))).scalar_one_or_none()
+    if not payment:
+        raise HTTPException(status_code=404, detail="Payment not found")
+
+    # Read-only: a pending payment is settled by its callback, or by
+    # reconciliation (services/reconciliation.py) if the callback never comes
     return {
         "transaction_id": transaction_id,
-        "status": "completed",
-        "amount": 1000,
-        "created_at": datetime.now()
+        "status": payment.status.value,
+        "amount": payment.amount,
+        "created_at": payment.created_at,
     }
-    
\ No newline at end of file
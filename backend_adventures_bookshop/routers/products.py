@@ -1,32 +1,90 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
 from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from database import get_db
+from config import settings
+from database import get_async_db
 from models import Product as ProductModel
-from schemas import Product as ProductSchema
+from schemas import Page, Product as ProductSchema
+from services import search
+from utils.cache import TTLCache
+from utils.pagination import page_params, paginate, make_page, MAX_PAGE_SIZE
+from utils.responses import FastJSONResponse, dump_json, fast_response
 
 router = APIRouter()
 
+# Serialized JSON for the public catalog endpoints. The catalog changes
+# through the admin product routes and checkout (stock), which call
+# invalidate_catalog().
+catalog_cache = TTLCache(
+    maxsize=settings.CATALOG_CACHE_MAX_ENTRIES,
+    ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+)
+
+def invalidate_catalog():
+    """Drop every cached list page and product; call after any product write"""
+    catalog_cache.clear()
+
 # ----------------------------
 # Public: Get all active products
 # ----------------------------
-@router.get("/", response_model=List[ProductSchema])
-def list_products(db: Session = Depends(get_db)):
-    return db.query(ProductModel).filter(ProductModel.is_active == True).all()
+@router.get("/", response_model=Page[ProductSchema])
+async def list_products(page: dict = Depends(page_params), db: AsyncSession = Depends(get_async_db)):
+    key = ("list", page["cursor"], page["limit"])
+    body = catalog_cache.get(key)
+    if body is not None:
+        return FastJSONResponse(body)
+
+    generation = catalog_cache.generation
+    query = (
+        select(ProductModel)
+        .options(selectinload(ProductModel.category))
+        .filter(ProductModel.is_active == True)
+    )
+    result = await db.execute(paginate(query, ProductModel, **page))
+    products_page = make_page(result.scalars().all(), page["limit"])
+    body = dump_json(Page[ProductSchema], products_page)
+    catalog_cache.set(key, body, generation=generation)
+    return FastJSONResponse(body)
+
+# ----------------------------
+# Public: Full-text search over active products, best match first
+# ----------------------------
+@router.get("/search", response_model=List[ProductSchema])
+async def search_products(
+    q: str = Query(..., min_length=1, description="Search term"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    stmt = search.search_statement(db.bind.dialect.name, q, limit)
+    if stmt is None:
+        return []
+    result = await db.execute(stmt)
+    return fast_response(List[ProductSchema], result.scalars().all())
 
 # ----------------------------
 # Public: Get one active product by ID
 # ----------------------------
 @router.get("/{product_id}", response_model=ProductSchema)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = (
-        db.query(ProductModel)
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    key = ("product", product_id)
+    body = catalog_cache.get(key)
+    if body is not None:
+        return FastJSONResponse(body)
+
+    generation = catalog_cache.generation
+    result = await db.execute(
+        select(ProductModel)
+        .options(selectinload(ProductModel.category))
         .filter(ProductModel.id == product_id, ProductModel.is_active == True)
-        .first()
     )
+    product = result.scalars().first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    body = dump_json(ProductSchema, product)
+    catalog_cache.set(key, body, generation=generation)
+    return FastJSONResponse(body)
 
 # UPDATE, POST AND DELETE IS FOR ADMIN
@@ -3,11 +3,18 @@ Pydantic models for API request/response validation
 Ensures data types and formats are correct
 """
 
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Generic, TypeVar
 from datetime import datetime
 from models import UserRole, OrderStatus, PaymentStatus
 
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    """One page of a keyset-paginated listing; pass next_cursor back to get the next page"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 class UserCreate(BaseModel):
     email: EmailStr
     full_name: str
@@ -75,9 +82,27 @@ class Product(BaseModel):
     on_sale: bool
     created_at: datetime
     category: Optional[Category] = None
+    image_variants: Optional[dict] = None
     class Config:
         from_attributes = True
 
+class ProductImportRow(BaseModel):
+    """One row of a bulk product import (services/product_import.py); category is a category slug"""
+    name: str = Field(min_length=1)
+    slug: str = Field(min_length=1)
+    description: Optional[str] = None
+    price: float = Field(ge=0)
+    original_price: Optional[float] = Field(None, ge=0)
+    stock_quantity: int = Field(0, ge=0)
+    category: Optional[str] = None
+    image: Optional[str] = None
+    is_active: bool = True
+    is_featured: bool = False
+    on_sale: bool = False
+    class Config:
+        str_strip_whitespace = True
+        extra = "forbid"
+
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
     slug: Optional[str] = None
@@ -92,9 +117,12 @@ class ProductUpdate(BaseModel):
     is_active: Optional[bool] = None
         
 
+# Lines per order; checkout reserves them all in one statement (routers/orders.py)
+MAX_ORDER_LINES = 100
+
 class OrderItemCreate(BaseModel):
     product_id: int
-    quantity: int
+    quantity: int = Field(gt=0)
 
 class OrderCreate(BaseModel):
     full_name: str
@@ -103,7 +131,7 @@ class OrderCreate(BaseModel):
     address: str
     city: str
     notes: Optional[str] = None
-    items: List[OrderItemCreate]
+    items: List[OrderItemCreate] = Field(min_length=1, max_length=MAX_ORDER_LINES)
 
 class OrderItem(BaseModel):
     id: int
@@ -130,7 +158,34 @@ class Order(BaseModel):
     class Config:
         from_attributes = True
 
+# Lean shape for order lists: no line items or nested products
+class OrderSummary(BaseModel):
+    id: int
+    order_number: str
+    full_name: str
+    email: EmailStr
+    phone: str
+    city: str
+    total_amount: float
+    status: OrderStatus
+    payment_status: PaymentStatus
+    created_at: datetime
+    item_count: int = 0
+    class Config:
+        from_attributes = True
+
 class PaymentCreate(BaseModel):
     order_id: int
     phone_number: str
-    amount: float
\ No newline at end of file
+    amount: float
+
+class HeroBanner(BaseModel):
+    id: int
+    title: str
+    subtitle: Optional[str] = None
+    description: Optional[str] = None
+    image: str
+    image_variants: Optional[dict] = None
+    created_at: datetime
+    class Config:
+        from_attributes = True
@@ -0,0 +1,215 @@
+# services/dashboard_stats.py
+"""
+Precomputed admin dashboard counters in the dashboard_stats table
+Database triggers on products, orders and users adjust the counters in the
+same transaction as the write, so reads are one small indexed scan and bulk
+inserts or raw SQL are counted too.
+
+Each counter is split over SHARDS rows, (name, shard), and a trigger adds to
+the shard picked by the changed row's id modulo SHARDS. Concurrent checkouts
+get consecutive order ids, so they update different rows instead of all
+queueing on one row lock until each commits (which serializes every write
+to a counted table on Postgres). read() sums the shards.
+Recompute every counter from scratch (to fix drift) with:
+    python -m services.dashboard_stats
+"""
+from sqlalchemy import case, func, select, text
+
+from models import DashboardStat, Order, Product, User
+
+# Rows per counter; the triggers and the migration that creates them bake
+# this number in, so changing it needs a new migration
+SHARDS = 16
+
+# Counter name -> query that computes it from scratch
+STAT_QUERIES = {
+    "total_products": select(func.count()).select_from(Product).where(Product.is_active == True),
+    "total_orders": select(func.count()).select_from(Order),
+    "total_users": select(func.count()).select_from(User),
+}
+
+SQLITE_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_ai AFTER INSERT ON products
+    WHEN new.is_active = 1 BEGIN
+        UPDATE dashboard_stats SET value = value + 1
+        WHERE name = 'total_products' AND shard = new.id % {SHARDS};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_ad AFTER DELETE ON products
+    WHEN old.is_active = 1 BEGIN
+        UPDATE dashboard_stats SET value = value - 1
+        WHERE name = 'total_products' AND shard = old.id % {SHARDS};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS dashboard_stats_products_au AFTER UPDATE OF is_active ON products
+    WHEN coalesce(old.is_active, 0) != coalesce(new.is_active, 0) BEGIN
+        UPDATE dashboard_stats SET value = value + (CASE WHEN new.is_active = 1 THEN 1 ELSE -1 END)
+        WHERE name = 'total_products' AND shard = new.id % {SHARDS};
+    END
+    """,
+]
+for _table, _stat in (("orders", "total_orders"), ("users", "total_users")):
+    SQLITE_DDL += [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS dashboard_stats_{_table}_ai AFTER INSERT ON {_table} BEGIN
+            UPDATE dashboard_stats SET value = value + 1
+            WHERE name = '{_stat}' AND shard = new.id % {SHARDS};
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS dashboard_stats_{_table}_ad AFTER DELETE ON {_table} BEGIN
+            UPDATE dashboard_stats SET value = value - 1
+            WHERE name = '{_stat}' AND shard = old.id % {SHARDS};
+        END
+        """,
+    ]
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS dashboard_stats_{table}_{event}"
+    for table in ("products", "orders", "users")
+    for event in ("ai", "ad", "au")
+]
+
+POSTGRES_DDL = [
+    f"""
+    CREATE OR REPLACE FUNCTION dashboard_stats_products() RETURNS trigger AS $$
+    DECLARE
+        delta integer := 0;
+    BEGIN
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.is_active THEN
+            delta := delta + 1;
+        END IF;
+        IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.is_active THEN
+            delta := delta - 1;
+        END IF;
+        IF delta <> 0 THEN
+            UPDATE dashboard_stats SET value = value + delta
+            WHERE name = 'total_products'
+              AND shard = (CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END) % {SHARDS};
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    f"""
+    CREATE OR REPLACE FUNCTION dashboard_stats_count() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE dashboard_stats SET value = value + 1
+            WHERE name = TG_ARGV[0] AND shard = NEW.id % {SHARDS};
+        ELSE
+            UPDATE dashboard_stats SET value = value - 1
+            WHERE name = TG_ARGV[0] AND shard = OLD.id % {SHARDS};
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_products ON products",
+    """
+    CREATE TRIGGER dashboard_stats_products
+    AFTER INSERT OR DELETE OR UPDATE OF is_active ON products
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_products()
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders ON orders",
+    """
+    CREATE TRIGGER dashboard_stats_orders AFTER INSERT OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_count('total_orders')
+    """,
+    "DROP TRIGGER IF EXISTS dashboard_stats_users ON users",
+    """
+    CREATE TRIGGER dashboard_stats_users AFTER INSERT OR DELETE ON users
+    FOR EACH ROW EXECUTE FUNCTION dashboard_stats_count('total_users')
+    """,
+]
+
+POSTGRES_DROP = [
+    "DROP TRIGGER IF EXISTS dashboard_stats_users ON users",
+    "DROP TRIGGER IF EXISTS dashboard_stats_orders ON orders",
+    "DROP TRIGGER IF EXISTS dashboard_stats_products ON products",
+    "DROP FUNCTION IF EXISTS dashboard_stats_count()",
+    "DROP FUNCTION IF EXISTS dashboard_stats_products()",
+]
+
+
+def _execute_all(connection, statements):
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _is_installed(connection) -> bool:
+    if connection.dialect.name == "sqlite":
+        found = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'dashboard_stats_products_ai'"
+        )).first()
+    else:
+        found = connection.execute(text(
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'dashboard_stats_products'"
+        )).first()
+    return found is not None
+
+
+def install(connection):
+    """Create the counter triggers if they are missing and seed the counters"""
+    dialect = connection.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return
+    if _is_installed(connection):
+        return
+    _execute_all(connection, SQLITE_DDL if dialect == "sqlite" else POSTGRES_DDL)
+    reconcile(connection)
+
+
+def uninstall(connection):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        _execute_all(connection, SQLITE_DROP)
+    elif dialect == "postgresql":
+        _execute_all(connection, POSTGRES_DROP)
+
+
+def read(db):
+    """All counters as {name: value}, summed over their shards; works with a Session or a Connection"""
+    rows = db.execute(
+        select(DashboardStat.name, func.sum(DashboardStat.value)).group_by(DashboardStat.name)
+    ).all()
+    return {name: value for name, value in rows}
+
+
+def reconcile(connection):
+    """Recompute every counter from its source table; returns {name: (old, new)}
+
+    The whole count goes in shard 0 and the other shards are zeroed; rows
+    for missing shards are created first, since the triggers only update.
+    """
+    current = read(connection)
+    table = DashboardStat.__table__
+    changes = {}
+    for name, query in STAT_QUERIES.items():
+        value = connection.execute(query).scalar()
+        present = set(connection.execute(select(table.c.shard).where(table.c.name == name)).scalars())
+        missing = [{"name": name, "shard": shard, "value": 0} for shard in range(SHARDS) if shard not in present]
+        if missing:
+            connection.execute(table.insert(), missing)
+        connection.execute(
+            table.update()
+            .where(table.c.name == name)
+            .values(value=case((table.c.shard == 0, value), else_=0))
+        )
+        changes[name] = (current.get(name), value)
+    return changes
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    with engine.begin() as connection:
+        install(connection)
+        changes = reconcile(connection)
+    for name, (old, new) in changes.items():
+        note = "" if old == new else f" (was {old})"
+        print(f"{name}: {new}{note}")
+    print("✅ Dashboard counters reconciled")
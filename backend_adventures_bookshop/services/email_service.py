@@ -1,6 +1,81 @@
-def send_order_confirmation(email: str, order_number: str):
-    print(f"Sending order confirmation to {email} for order {order_number}")
+# services/email_service.py
+"""
+Order emails and the SMTP sender used by the outbox dispatcher
+Messages are built when the order is placed (and stored in the outbox);
+SMTPSender keeps one authenticated connection open across a batch and
+reconnects if the server has dropped it in between.
+"""
+from email.message import EmailMessage
 
-def send_admin_order_notification(order_number: str, total_amount: float):
-    print(f"Sending admin notification for order {order_number}, amount: {total_amount}")
+import aiosmtplib
 
+from config import settings
+
+
+def format_lines(lines) -> str:
+    return "\n".join(f"  {quantity} x {name} @ KES {price:,.2f}" for name, quantity, price in lines)
+
+
+def order_confirmation(order, lines):
+    """(subject, body) for the customer; lines are (name, quantity, price)"""
+    subject = f"Order {order.order_number} received"
+    body = (
+        f"Hi {order.full_name},\n\n"
+        f"Thank you for your order {order.order_number}.\n\n"
+        f"{format_lines(lines)}\n\n"
+        f"Total: KES {order.total_amount:,.2f}\n"
+        f"Delivery to: {order.address}, {order.city}\n\n"
+        "We will let you know as soon as it is on its way."
+    )
+    return subject, body
+
+
+def admin_order_notification(order, lines):
+    """(subject, body) for the shop admin"""
+    subject = f"New order {order.order_number} - KES {order.total_amount:,.2f}"
+    body = (
+        f"Order {order.order_number} from {order.full_name} ({order.email}, {order.phone})\n"
+        f"{order.address}, {order.city}\n\n"
+        f"{format_lines(lines)}\n\n"
+        f"Total: KES {order.total_amount:,.2f}\n"
+        f"Notes: {order.notes or '-'}"
+    )
+    return subject, body
+
+
+class SMTPSender:
+    """Sends plain-text emails over a single reused SMTP connection"""
+
+    def __init__(self, hostname=None, port=None, username=None, password=None, start_tls=None, timeout=30):
+        self.smtp = aiosmtplib.SMTP(
+            hostname=hostname or settings.MAIL_SERVER,
+            port=port or settings.MAIL_PORT,
+            username=(settings.MAIL_USERNAME if username is None else username) or None,
+            password=(settings.MAIL_PASSWORD if password is None else password) or None,
+            start_tls=settings.MAIL_STARTTLS if start_tls is None else start_tls,
+            timeout=timeout,
+        )
+        self.sender = settings.MAIL_FROM
+
+    async def send(self, recipient: str, subject: str, body: str):
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = recipient
+        message["Subject"] = subject
+        message.set_content(body)
+
+        if not self.smtp.is_connected:
+            await self.smtp.connect()
+        try:
+            await self.smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            # idle connection closed by the server since the last batch
+            await self.smtp.connect()
+            await self.smtp.send_message(message)
+
+    async def close(self):
+        if self.smtp.is_connected:
+            try:
+                await self.smtp.quit()
+            except aiosmtplib.SMTPException:
+                self.smtp.close()
@@ -0,0 +1,187 @@
+# services/exports.py
+"""
+Streaming CSV/NDJSON exports of orders and products
+(GET /admin/orders/export, GET /admin/products/export)
+Rows are read with a server-side cursor (stream_results + yield_per, a
+named cursor on Postgres) and written out a partition at a time, one
+chunk of the response body per partition, so memory stays flat however
+many rows the export covers. Plain Core rows are selected, not ORM
+objects, so nothing builds up in a session's identity map either.
+
+Each export runs on its own connection, opened when the response starts
+streaming: the request's session from get_db is not relied on to outlive
+the route. Both are ordered by (created_at, id), on the existing indexes,
+and can be limited to a created_at range [created_from, created_to).
+
+- orders, CSV: one line per order item, the order's columns repeated
+  (an order without items gets one line with the item columns empty)
+- orders, NDJSON: one object per order, its items nested
+- products: id and created_at, then the columns POST /admin/products/import
+  takes (category by slug); without the first two, an edited export can
+  be imported back
+"""
+import csv
+import io
+from datetime import datetime, timezone
+
+import orjson
+from sqlalchemy import select
+
+from config import settings
+from database import engine
+from models import Category, Order, OrderItem, Product
+
+FORMATS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}  # Starlette adds charset=utf-8 to text/*
+
+ORDER_COLUMNS = (
+    Order.id, Order.order_number, Order.created_at, Order.status, Order.payment_status,
+    Order.full_name, Order.email, Order.phone, Order.address, Order.city, Order.total_amount, Order.notes,
+)
+ITEM_COLUMNS = (
+    OrderItem.product_id.label("product_id"), Product.slug.label("product_slug"),
+    Product.name.label("product_name"), OrderItem.quantity.label("quantity"), OrderItem.price.label("unit_price"),
+)
+ORDER_FIELDS = ["order_id" if column.key == "id" else column.key for column in ORDER_COLUMNS]
+ITEM_FIELDS = [column.key for column in ITEM_COLUMNS] + ["line_total"]
+
+PRODUCT_COLUMNS = (
+    Product.id, Product.created_at, Product.slug, Product.name, Product.description, Product.price,
+    Product.original_price, Product.stock_quantity, Category.slug.label("category"), Product.image, Product.is_active,
+    Product.is_featured, Product.on_sale,
+)
+PRODUCT_FIELDS = [column.key for column in PRODUCT_COLUMNS]
+
+
+def export_filename(kind: str, fmt: str) -> str:
+    return f"{kind}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{fmt}"
+
+
+def _utc(value: datetime) -> datetime:
+    """created_at is stored as UTC; naive values (SQLite keeps no offset, bounds given without one) are UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _created_between(query, column, created_from: datetime = None, created_to: datetime = None):
+    if created_from is not None:
+        query = query.where(column >= _utc(created_from))
+    if created_to is not None:
+        query = query.where(column < _utc(created_to))
+    return query
+
+
+def _plain(value):
+    """Column value as it goes in a CSV cell or JSON document"""
+    if isinstance(value, datetime):
+        return _utc(value).isoformat()
+    return getattr(value, "value", value)  # enums
+
+
+def _stream_partitions(query, batch_size: int = None):
+    """Result partitions of query from a server-side cursor, on a connection of its own"""
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    with engine.connect() as connection:
+        streaming = connection.execution_options(stream_results=True, yield_per=batch_size)
+        yield from streaming.execute(query).partitions()
+
+
+class _CSVChunks:
+    """csv.writer into a buffer that is handed out and emptied once per partition"""
+
+    def __init__(self, header):
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow(header)
+
+    def take(self) -> bytes:
+        chunk = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return chunk
+
+
+def order_rows_query(created_from: datetime = None, created_to: datetime = None):
+    query = (
+        select(*ORDER_COLUMNS, *ITEM_COLUMNS)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .order_by(Order.created_at, Order.id, OrderItem.id)
+    )
+    return _created_between(query, Order.created_at, created_from, created_to)
+
+
+def export_orders(fmt: str, created_from: datetime = None, created_to: datetime = None, batch_size: int = None):
+    """Generator of response body chunks for an orders export"""
+    partitions = _stream_partitions(order_rows_query(created_from, created_to), batch_size)
+    if fmt == "csv":
+        return _orders_csv(partitions)
+    return _orders_ndjson(partitions)
+
+
+def _orders_csv(partitions):
+    out = _CSVChunks(ORDER_FIELDS + ITEM_FIELDS)
+    yield out.take()
+    for partition in partitions:
+        for row in partition:
+            line_total = row.quantity * row.unit_price if row.quantity is not None else None
+            out.writer.writerow([_plain(value) for value in row] + [line_total])
+        yield out.take()
+
+
+def _orders_ndjson(partitions):
+    # rows arrive grouped by order; an order is written once its last row is
+    # seen, which may be in the next partition
+    order_width = len(ORDER_COLUMNS)
+    current = None
+    for partition in partitions:
+        lines = []
+        for row in partition:
+            if current is None or current["order_id"] != row.id:
+                if current is not None:
+                    lines.append(orjson.dumps(current))
+                current = {field: _plain(value) for field, value in zip(ORDER_FIELDS, row[:order_width])}
+                current["items"] = []
+            if row.quantity is not None:  # None: an order without items
+                item = dict(zip(ITEM_FIELDS, row[order_width:]))
+                item["line_total"] = row.quantity * row.unit_price
+                current["items"].append(item)
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+    if current is not None:
+        yield orjson.dumps(current) + b"\n"
+
+
+def product_rows_query(created_from: datetime = None, created_to: datetime = None):
+    query = (
+        select(*PRODUCT_COLUMNS)
+        .outerjoin(Category, Category.id == Product.category_id)
+        .order_by(Product.created_at, Product.id)
+    )
+    return _created_between(query, Product.created_at, created_from, created_to)
+
+
+def export_products(fmt: str, created_from: datetime = None, created_to: datetime = None, batch_size: int = None):
+    """Generator of response body chunks for a products export"""
+    partitions = _stream_partitions(product_rows_query(created_from, created_to), batch_size)
+    if fmt == "csv":
+        return _products_csv(partitions)
+    return _products_ndjson(partitions)
+
+
+def _products_csv(partitions):
+    out = _CSVChunks(PRODUCT_FIELDS)
+    yield out.take()
+    for partition in partitions:
+        for row in partition:
+            out.writer.writerow([_plain(value) for value in row])
+        yield out.take()
+
+
+def _products_ndjson(partitions):
+    for partition in partitions:
+        yield b"".join(
+            orjson.dumps({field: _plain(value) for field, value in zip(PRODUCT_FIELDS, row)}) + b"\n"
+            for row in partition
+        )
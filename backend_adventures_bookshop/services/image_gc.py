@@ -0,0 +1,244 @@
+# services/image_gc.py
+"""
+Garbage collection for static/images
+A file is kept if anything can still reach it: an images row with a
+non-zero ref_count (the original and all its variants), or a products /
+hero_banners image column (which covers legacy uploads that predate the
+images table). Everything else under the image directory is garbage once it
+is older than the grace period, which protects uploads whose product or
+banner has not been saved yet and stale-looking files a duplicate upload has
+just touched. Content-addressed files are aged per digest, so a variant is
+never removed while its original is still fresh.
+
+Referenced paths are streamed from the database in batches, the directory
+is walked with os.scandir (only unreferenced entries are stat'ed), and
+deletions run on a thread pool. images rows whose original was deleted are
+removed afterwards, re-checking ref_count in the DELETE.
+
+Run nightly with:
+    python -m services.image_gc [--dry-run] [--grace-seconds N] [--workers N]
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from sqlalchemy import delete, select
+
+from models import HeroBanner, Product, StoredImage
+from services import images
+from utils.uploads import CONTENT_ADDRESSED_NAME, IMAGE_DIR
+
+GRACE_SECONDS = 60 * 60
+BATCH_SIZE = 5000
+DELETE_WORKERS = 16
+DELETE_CHUNK = 256  # files per thread-pool task
+
+# Tables with a plain `image` column pointing into IMAGE_DIR
+IMAGE_COLUMNS = (Product.image, HeroBanner.image)
+
+IMAGE_PREFIX = f"/{IMAGE_DIR}/"
+
+
+@dataclass
+class GCReport:
+    referenced: int = 0
+    scanned: int = 0
+    kept_in_grace: int = 0
+    deleted: int = 0
+    failed: int = 0
+    bytes_freed: int = 0
+    rows_deleted: int = 0
+    timings: dict = field(default_factory=dict)
+
+    def summary(self, dry_run: bool) -> str:
+        verb = "Would delete" if dry_run else "Deleted"
+        lines = [
+            f"Referenced files: {self.referenced}",
+            f"Scanned files: {self.scanned}",
+            f"Kept (grace period): {self.kept_in_grace}",
+            f"{verb}: {self.deleted} files, {self.bytes_freed / (1024 * 1024):.1f} MiB",
+        ]
+        if self.failed:
+            lines.append(f"Failed deletes: {self.failed}")
+        if not dry_run:
+            lines.append(f"Image rows removed: {self.rows_deleted}")
+        for phase, seconds in self.timings.items():
+            count = {"references": self.referenced, "scan": self.scanned, "delete": self.deleted}.get(phase, 0)
+            rate = f", {count / seconds:,.0f} files/s" if seconds > 0 and count else ""
+            lines.append(f"{phase}: {seconds:.2f}s{rate}")
+        return "\n".join(lines)
+
+
+def relative_image_path(value):
+    """Path relative to IMAGE_DIR for a stored image reference, or None if it points elsewhere"""
+    if not value:
+        return None
+    if IMAGE_PREFIX in value:
+        return value.split(IMAGE_PREFIX, 1)[1]
+    if "/" not in value:
+        return value  # bare filename (older product rows)
+    return None
+
+
+def stream_referenced(connection, batch_size: int = BATCH_SIZE):
+    """Yield every referenced path (relative to IMAGE_DIR), a batch of rows at a time"""
+    streaming = connection.execution_options(stream_results=True, yield_per=batch_size)
+
+    live_images = select(StoredImage.path, StoredImage.variants).where(StoredImage.ref_count > 0)
+    for partition in streaming.execute(live_images).partitions():
+        for path, variants in partition:
+            yield relative_image_path(path)
+            for variant_path in images.variant_paths(variants):
+                yield relative_image_path("/" + variant_path)
+
+    for column in IMAGE_COLUMNS:
+        query = select(column).where(column.isnot(None))
+        for partition in streaming.execute(query).partitions():
+            for (value,) in partition:
+                yield relative_image_path(value)
+
+
+def scan_files(root: str):
+    """Yield (relative path, DirEntry) for every file below root, using os.scandir"""
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        try:
+            with os.scandir(os.path.join(root, relative_dir)) as entries:
+                for entry in entries:
+                    relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(relative)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield relative, entry
+        except FileNotFoundError:
+            continue
+
+
+def _remove_batch(batch):
+    """Delete [(path, size)]; returns (deleted, failed, bytes freed)"""
+    deleted = failed = freed = 0
+    for path, size in batch:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            continue
+        except OSError:
+            failed += 1
+            continue
+        deleted += 1
+        freed += size
+    return deleted, failed, freed
+
+
+def collect_garbage(
+    engine,
+    image_dir: str = IMAGE_DIR,
+    grace_seconds: int = GRACE_SECONDS,
+    dry_run: bool = False,
+    workers: int = DELETE_WORKERS,
+    batch_size: int = BATCH_SIZE,
+) -> GCReport:
+    report = GCReport()
+    cutoff = time.time() - grace_seconds
+
+    started = time.perf_counter()
+    with engine.connect() as connection:
+        referenced = {path for path in stream_referenced(connection, batch_size) if path}
+    report.referenced = len(referenced)
+    report.timings["references"] = time.perf_counter() - started
+
+    # Unreferenced files, with the newest mtime seen for each content digest
+    started = time.perf_counter()
+    candidates = []
+    fresh_digests = set()
+    for relative, entry in scan_files(image_dir):
+        report.scanned += 1
+        if relative in referenced:
+            continue
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        match = CONTENT_ADDRESSED_NAME.match(entry.name)
+        digest = match.group("digest") if match else None
+        if stat.st_mtime > cutoff:
+            report.kept_in_grace += 1
+            if digest:
+                fresh_digests.add(digest)
+            continue
+        candidates.append((relative, digest, stat.st_size))
+    report.timings["scan"] = time.perf_counter() - started
+    del referenced
+
+    doomed = []
+    for relative, digest, size in candidates:
+        if digest and digest in fresh_digests:
+            report.kept_in_grace += 1
+            continue
+        doomed.append((relative, size))
+
+    started = time.perf_counter()
+    if dry_run:
+        report.deleted = len(doomed)
+        report.bytes_freed = sum(size for _, size in doomed)
+    else:
+        paths = [(os.path.join(image_dir, relative), size) for relative, size in doomed]
+        batches = [paths[i:i + DELETE_CHUNK] for i in range(0, len(paths), DELETE_CHUNK)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for deleted, failed, freed in executor.map(_remove_batch, batches):
+                report.deleted += deleted
+                report.failed += failed
+                report.bytes_freed += freed
+        report.rows_deleted = _delete_orphan_rows(engine, [relative for relative, _ in doomed], batch_size)
+    report.timings["delete"] = time.perf_counter() - started
+    return report
+
+
+def _delete_orphan_rows(engine, deleted, batch_size: int) -> int:
+    """Drop images rows whose original file was just deleted, if still unreferenced"""
+    paths = [IMAGE_PREFIX + relative for relative in deleted if "/" not in relative]
+    removed = 0
+    for start in range(0, len(paths), batch_size):
+        with engine.begin() as connection:
+            result = connection.execute(
+                delete(StoredImage).where(
+                    StoredImage.path.in_(paths[start:start + batch_size]),
+                    StoredImage.ref_count <= 0,
+                )
+            )
+            removed += result.rowcount
+    return removed
+
+
+def main(argv=None):
+    import argparse
+
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Delete image files nothing references any more")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be deleted")
+    parser.add_argument("--grace-seconds", type=int, default=GRACE_SECONDS)
+    parser.add_argument("--workers", type=int, default=DELETE_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--image-dir", default=IMAGE_DIR)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.image_dir):
+        print(f"{args.image_dir} does not exist")
+        return
+    report = collect_garbage(
+        engine,
+        image_dir=args.image_dir,
+        grace_seconds=args.grace_seconds,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        batch_size=args.batch_size,
+    )
+    print(report.summary(args.dry_run))
+    print("✅ Dry run complete." if args.dry_run else "✅ Cleanup complete.")
+
+
+if __name__ == "__main__":
+    main()
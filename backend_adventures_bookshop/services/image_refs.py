@@ -0,0 +1,161 @@
+# services/image_refs.py
+"""
+Reference counts for stored images in images.ref_count
+Triggers on products and hero_banners adjust the count of the image a row
+points at in the same transaction as the write, so a shared (deduplicated)
+file is only dropped once nothing uses it. Images with a zero count are
+removed by clean_oldphotos.py after a grace period.
+Image columns hold either the public path (/static/images/<file>) or, for
+older product rows, the bare filename; both forms are counted.
+Recompute every count from scratch (to fix drift) with:
+    python -m services.image_refs
+"""
+from sqlalchemy import inspect, text
+
+# Tables whose `image` column references images.path
+REFERENCING_TABLES = ("products", "hero_banners")
+
+IMAGE_PREFIX = "/static/images/"
+
+
+def _sqlite_ddl(table):
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS image_refs_{table}_ai AFTER INSERT ON {table}
+        WHEN new.image IS NOT NULL BEGIN
+            UPDATE images SET ref_count = ref_count + 1
+            WHERE path IN (new.image, '{IMAGE_PREFIX}' || new.image);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS image_refs_{table}_ad AFTER DELETE ON {table}
+        WHEN old.image IS NOT NULL BEGIN
+            UPDATE images SET ref_count = ref_count - 1
+            WHERE path IN (old.image, '{IMAGE_PREFIX}' || old.image);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS image_refs_{table}_au AFTER UPDATE OF image ON {table}
+        WHEN old.image IS NOT new.image BEGIN
+            UPDATE images SET ref_count = ref_count - 1
+            WHERE old.image IS NOT NULL AND path IN (old.image, '{IMAGE_PREFIX}' || old.image);
+            UPDATE images SET ref_count = ref_count + 1
+            WHERE new.image IS NOT NULL AND path IN (new.image, '{IMAGE_PREFIX}' || new.image);
+        END
+        """,
+    ]
+
+
+def _sqlite_drop(table):
+    return [f"DROP TRIGGER IF EXISTS image_refs_{table}_{event}" for event in ("ai", "ad", "au")]
+
+
+POSTGRES_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION image_refs_count() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.image IS NOT DISTINCT FROM NEW.image THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') AND OLD.image IS NOT NULL THEN
+        UPDATE images SET ref_count = ref_count - 1
+        WHERE path IN (OLD.image, '{IMAGE_PREFIX}' || OLD.image);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.image IS NOT NULL THEN
+        UPDATE images SET ref_count = ref_count + 1
+        WHERE path IN (NEW.image, '{IMAGE_PREFIX}' || NEW.image);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def _postgres_ddl(table):
+    return [
+        POSTGRES_FUNCTION,
+        f"DROP TRIGGER IF EXISTS image_refs_{table} ON {table}",
+        f"""
+        CREATE TRIGGER image_refs_{table}
+        AFTER INSERT OR DELETE OR UPDATE OF image ON {table}
+        FOR EACH ROW EXECUTE FUNCTION image_refs_count()
+        """,
+    ]
+
+
+def _postgres_drop(table):
+    return [f"DROP TRIGGER IF EXISTS image_refs_{table} ON {table}"]
+
+
+def _reconcile_sql(tables):
+    # one correlated count per referencing table, matching either image form
+    counts = [
+        f"(SELECT count(*) FROM {table} WHERE {table}.image IN "
+        f"(images.path, substr(images.path, {len(IMAGE_PREFIX) + 1})))"
+        for table in tables
+    ]
+    return "UPDATE images SET ref_count = " + (" + ".join(counts) or "0")
+
+
+def _execute_all(connection, statements):
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _is_installed(connection, table) -> bool:
+    if connection.dialect.name == "sqlite":
+        found = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name"
+        ), {"name": f"image_refs_{table}_ai"}).first()
+    else:
+        found = connection.execute(text(
+            "SELECT 1 FROM pg_trigger WHERE tgname = :name"
+        ), {"name": f"image_refs_{table}"}).first()
+    return found is not None
+
+
+def _existing_tables(connection):
+    return [table for table in REFERENCING_TABLES if inspect(connection).has_table(table)]
+
+
+def install(connection):
+    """
+    Create the reference-count triggers on every referencing table that has
+    them missing, then backfill the counts. Tables that do not exist yet are
+    skipped and picked up by a later call.
+    """
+    dialect = connection.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return
+    missing = [table for table in _existing_tables(connection) if not _is_installed(connection, table)]
+    if not missing:
+        return
+    for table in missing:
+        _execute_all(connection, _sqlite_ddl(table) if dialect == "sqlite" else _postgres_ddl(table))
+    reconcile(connection)
+
+
+def uninstall(connection):
+    dialect = connection.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return
+    for table in _existing_tables(connection):
+        _execute_all(connection, _sqlite_drop(table) if dialect == "sqlite" else _postgres_drop(table))
+    if dialect == "postgresql":
+        connection.execute(text("DROP FUNCTION IF EXISTS image_refs_count()"))
+
+
+def reconcile(connection) -> int:
+    """Recompute every image's reference count; returns how many counts changed"""
+    before = dict(connection.execute(text("SELECT id, ref_count FROM images")).all())
+    connection.execute(text(_reconcile_sql(_existing_tables(connection))))
+    after = dict(connection.execute(text("SELECT id, ref_count FROM images")).all())
+    return sum(1 for image_id, count in after.items() if before.get(image_id) != count)
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    with engine.begin() as connection:
+        install(connection)
+        changed = reconcile(connection)
+    print(f"✅ Image reference counts reconciled ({changed} corrected)")
@@ -0,0 +1,119 @@
+# services/images.py
+"""
+Responsive image variants for uploaded product and banner photos
+Each upload is resized to a few widths and encoded as WebP plus a JPEG
+fallback. Decoding and encoding are CPU-bound, so they run in a process
+pool and request workers only await the result.
+"""
+import asyncio
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from config import settings
+
+# Variant name -> maximum width in pixels (never upscaled)
+VARIANT_WIDTHS = {
+    "thumbnail": 200,
+    "card": 480,
+    "hero": 1600,
+}
+
+# (file extension, Pillow format, save options)
+ENCODINGS = [
+    ("webp", "WEBP", {"quality": 80, "method": 4}),
+    ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+]
+
+VARIANTS_SUBDIR = "variants"
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn rather than fork: the parent is multi-threaded (event loop + threadpool)
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def render_variants(source_path: str, output_dir: str, url_prefix: str) -> dict:
+    """
+    Resize and encode every variant of one image. Runs in a worker process.
+    Returns the original size, each variant's size and URLs, and srcset strings.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    # Pillow only warns between MAX_IMAGE_PIXELS and twice that, and would
+    # still decode the image; here both are refused when the file is opened
+    Image.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(source_path) as original:
+                image = ImageOps.exif_transpose(original).convert("RGB")
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise ValueError(f"Image too large: {e}")
+    except (UnidentifiedImageError, OSError) as e:
+        raise ValueError(f"Not a readable image: {e}")
+
+    width, height = image.size
+    sizes = {}
+    for name, max_width in VARIANT_WIDTHS.items():
+        target_width = min(max_width, width)
+        target_height = max(1, round(height * target_width / width))
+        resized = image
+        if target_width != width:
+            resized = image.resize((target_width, target_height), Image.Resampling.LANCZOS)
+
+        entry = {"width": target_width, "height": target_height}
+        for extension, pil_format, options in ENCODINGS:
+            filename = f"{stem}-{name}.{extension}"
+            resized.save(os.path.join(output_dir, filename), pil_format, **options)
+            entry[extension] = f"{url_prefix}/{filename}"
+        sizes[name] = entry
+
+    # one candidate per distinct width (small originals collapse variants)
+    srcset = {}
+    for extension, _, _ in ENCODINGS:
+        candidates = {entry["width"]: entry[extension] for entry in sizes.values()}
+        srcset[extension] = ", ".join(f"{url} {w}w" for w, url in sorted(candidates.items()))
+
+    return {"width": width, "height": height, "sizes": sizes, "srcset": srcset}
+
+
+async def generate_variants(image_dir: str, filename: str) -> dict:
+    """Render variants for static/images/<filename> without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(),
+        render_variants,
+        os.path.join(image_dir, filename),
+        os.path.join(image_dir, VARIANTS_SUBDIR),
+        f"/{image_dir}/{VARIANTS_SUBDIR}",
+    )
+
+
+def variant_paths(variants: dict):
+    """Filesystem paths of every rendered variant file"""
+    if not variants:
+        return []
+    return [
+        entry[extension].lstrip("/")
+        for entry in variants.get("sizes", {}).values()
+        for extension, _, _ in ENCODINGS
+    ]
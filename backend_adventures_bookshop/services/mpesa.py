@@ -0,0 +1,142 @@
+# services/mpesa.py
+"""
+Async client for the M-Pesa Daraja API
+One httpx.AsyncClient per process keeps connections to the provider alive
+(bounded by MPESA_MAX_CONNECTIONS) instead of a new TLS handshake per call.
+The OAuth token is cached until MPESA_TOKEN_REFRESH_MARGIN_SECONDS before it
+expires; refreshes are single-flight, so a burst of checkouts on a cold or
+expiring token makes one token request, not one each. A 401 from the API
+drops the cached token and retries the call once.
+Callers get httpx exceptions (TimeoutException, HTTPStatusError, ...).
+"""
+import asyncio
+import base64
+import math
+import time
+from datetime import datetime
+
+import httpx
+
+from config import settings
+from services.whatsapp_service import normalize_phone
+
+TOKEN_PATH = "/oauth/v1/generate"
+STK_PUSH_PATH = "/mpesa/stkpush/v1/processrequest"
+STK_QUERY_PATH = "/mpesa/stkpushquery/v1/query"
+
+
+class MpesaClient:
+    def __init__(
+        self,
+        base_url=None,
+        consumer_key=None,
+        consumer_secret=None,
+        shortcode=None,
+        passkey=None,
+        callback_url=None,
+        max_connections=None,
+    ):
+        self.consumer_key = consumer_key or settings.MPESA_CONSUMER_KEY
+        self.consumer_secret = consumer_secret or settings.MPESA_CONSUMER_SECRET
+        self.shortcode = shortcode or settings.MPESA_SHORTCODE
+        self.passkey = passkey or settings.MPESA_PASSKEY
+        self.callback_url = callback_url or settings.MPESA_CALLBACK_URL
+        max_connections = max_connections or settings.MPESA_MAX_CONNECTIONS
+        self.client = httpx.AsyncClient(
+            base_url=base_url or settings.MPESA_BASE_URL,
+            timeout=httpx.Timeout(settings.MPESA_TIMEOUT_SECONDS, connect=settings.MPESA_CONNECT_TIMEOUT_SECONDS),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._token = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+        self.token_refreshes = 0
+
+    def _token_fresh(self) -> bool:
+        margin = settings.MPESA_TOKEN_REFRESH_MARGIN_SECONDS
+        return self._token is not None and time.monotonic() < self._token_expires_at - margin
+
+    async def get_token(self) -> str:
+        if self._token_fresh():
+            return self._token
+        async with self._token_lock:
+            # whoever held the lock before us may have refreshed it already
+            if not self._token_fresh():
+                credentials = base64.b64encode(f"{self.consumer_key}:{self.consumer_secret}".encode()).decode()
+                response = await self.client.get(
+                    TOKEN_PATH,
+                    params={"grant_type": "client_credentials"},
+                    headers={"Authorization": f"Basic {credentials}"},
+                )
+                response.raise_for_status()
+                data = response.json()
+                self._token = data["access_token"]
+                self._token_expires_at = time.monotonic() + int(data.get("expires_in", 3599))
+                self.token_refreshes += 1
+            return self._token
+
+    def invalidate_token(self, token: str):
+        if self._token == token:
+            self._token = None
+
+    async def _post(self, path: str, payload: dict) -> dict:
+        for attempt in range(2):
+            token = await self.get_token()
+            response = await self.client.post(path, json=payload, headers={"Authorization": f"Bearer {token}"})
+            if response.status_code == 401 and attempt == 0:
+                self.invalidate_token(token)  # revoked or expired early
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def _password(self, timestamp: str) -> str:
+        return base64.b64encode(f"{self.shortcode}{self.passkey}{timestamp}".encode()).decode()
+
+    async def stk_push(self, phone: str, amount: float, account_reference: str, description: str = "Payment") -> dict:
+        """Send an STK push prompt to the customer's phone"""
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        phone = normalize_phone(phone)
+        return await self._post(STK_PUSH_PATH, {
+            "BusinessShortCode": self.shortcode,
+            "Password": self._password(timestamp),
+            "Timestamp": timestamp,
+            "TransactionType": "CustomerPayBillOnline",
+            "Amount": math.ceil(amount),  # whole shillings only
+            "PartyA": phone,
+            "PartyB": self.shortcode,
+            "PhoneNumber": phone,
+            "CallBackURL": self.callback_url,
+            "AccountReference": account_reference,
+            "TransactionDesc": description,
+        })
+
+    async def stk_query(self, checkout_request_id: str) -> dict:
+        """Status of an STK push, by its CheckoutRequestID"""
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        return await self._post(STK_QUERY_PATH, {
+            "BusinessShortCode": self.shortcode,
+            "Password": self._password(timestamp),
+            "Timestamp": timestamp,
+            "CheckoutRequestID": checkout_request_id,
+        })
+
+    async def close(self):
+        await self.client.aclose()
+
+
+_client = None
+
+
+def get_client() -> MpesaClient:
+    """The process-wide client; created on first use inside the event loop"""
+    global _client
+    if _client is None:
+        _client = MpesaClient()
+    return _client
+
+
+async def shutdown():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,284 @@
+# services/outbox.py
+"""
+Transactional outbox for customer and admin notifications
+Checkout only inserts rows into `outbox` inside the order transaction, so a
+slow or unreachable mail server never holds up (or rolls back) an order and
+no message is lost if the process dies after the commit.
+
+A Dispatcher delivers them afterwards:
+- claims a batch of due rows with one UPDATE (FOR UPDATE SKIP LOCKED on
+  Postgres), so several dispatchers can run side by side; the claim is a
+  lease on next_attempt_at, so rows of a crashed dispatcher come back
+- sends emails over one reused SMTP connection and WhatsApp messages
+  concurrently over one shared HTTP client pool
+- writes every outcome back in one executemany: sent, failed for good
+  (rejected recipient, 4xx), or retried with exponential backoff and jitter
+  until OUTBOX_MAX_ATTEMPTS
+
+Run it in the API process (OUTBOX_DISPATCH_IN_APP) or as a worker:
+`python -m services.outbox` (add --once to drain what is due and exit)
+"""
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import aiosmtplib
+import httpx
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import OutboxMessage, OutboxStatus
+from services import email_service, whatsapp_service
+from utils.worker import InAppWorker, PollingWorker
+
+EMAIL = "email"
+WHATSAPP = "whatsapp"
+
+outbox_table = OutboxMessage.__table__
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+def enabled_channels():
+    channels = set()
+    if settings.MAIL_SERVER:
+        channels.add(EMAIL)
+    if settings.WHATSAPP_TOKEN and settings.WHATSAPP_PHONE_NUMBER_ID:
+        channels.add(WHATSAPP)
+    return channels
+
+
+def enqueue_order_notifications(db: Session, order, lines):
+    """
+    Queue the messages for a new order in the caller's transaction
+    `order` must be flushed (it needs its order_number); lines are
+    (product name, quantity, unit price). Returns the number queued.
+    """
+    channels = enabled_channels()
+    rows = []
+    if EMAIL in channels:
+        subject, body = email_service.order_confirmation(order, lines)
+        rows.append({"channel": EMAIL, "recipient": order.email, "subject": subject, "body": body})
+        if settings.ADMIN_NOTIFICATION_EMAIL:
+            subject, body = email_service.admin_order_notification(order, lines)
+            rows.append({
+                "channel": EMAIL, "recipient": settings.ADMIN_NOTIFICATION_EMAIL,
+                "subject": subject, "body": body,
+            })
+    if WHATSAPP in channels and order.phone:
+        rows.append({
+            "channel": WHATSAPP, "recipient": order.phone, "subject": None,
+            "body": whatsapp_service.order_message(order),
+        })
+    if rows:
+        db.execute(insert(OutboxMessage), rows)
+    return len(rows)
+
+
+def is_permanent(exc: Exception) -> bool:
+    """
+    Errors that retrying the same message cannot fix. Authentication and
+    rate-limit errors are not: they are about our configuration or timing.
+    """
+    if isinstance(exc, aiosmtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(exc, aiosmtplib.SMTPDataError):
+        return exc.code >= 500
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return 400 <= status < 500 and status not in (401, 403, 408, 429)
+    return False
+
+
+def is_connection_error(exc: Exception) -> bool:
+    """The SMTP server is unreachable; no point trying the rest of the batch"""
+    return isinstance(exc, (
+        aiosmtplib.SMTPConnectError,
+        aiosmtplib.SMTPServerDisconnected,
+        aiosmtplib.SMTPAuthenticationError,
+        aiosmtplib.SMTPTimeoutError,
+        OSError,
+    ))
+
+
+def backoff(attempts: int) -> timedelta:
+    delay = min(settings.OUTBOX_BACKOFF_MAX_SECONDS, settings.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+async def claim(db, batch_size: int, lease_seconds: int):
+    """Lease up to batch_size due messages to this caller and return them"""
+    now = utcnow()
+    token = uuid.uuid4().hex
+    due = (
+        select(OutboxMessage.id)
+        .where(OutboxMessage.status == OutboxStatus.pending, OutboxMessage.next_attempt_at <= now)
+        .order_by(OutboxMessage.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    await db.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(due))
+        .values(claim_token=token, next_attempt_at=now + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    result = await db.execute(
+        select(outbox_table).where(outbox_table.c.claim_token == token).order_by(outbox_table.c.id)
+    )
+    return result.all()
+
+
+# One statement for every outcome; the token check skips rows whose lease
+# expired and were claimed again by another dispatcher in the meantime
+RECORD_OUTCOME = (
+    outbox_table.update()
+    .where(outbox_table.c.id == bindparam("b_id"), outbox_table.c.claim_token == bindparam("b_token"))
+    .values(
+        status=bindparam("b_status"),
+        attempts=bindparam("b_attempts"),
+        next_attempt_at=bindparam("b_next_attempt_at"),
+        last_error=bindparam("b_last_error"),
+        sent_at=bindparam("b_sent_at"),
+        claim_token=None,
+    )
+)
+
+
+class Dispatcher(PollingWorker):
+    name = "Outbox dispatcher"
+
+    def __init__(self, session_factory=None, email_sender=None, whatsapp_sender=None, batch_size=None):
+        super().__init__(batch_size or settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_POLL_SECONDS)
+        if session_factory is None:
+            from database import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self.session_factory = session_factory
+        self._email = email_sender
+        self._whatsapp = whatsapp_sender
+        self.stats = {"sent": 0, "retried": 0, "failed": 0}
+
+    @property
+    def email(self):
+        if self._email is None:
+            self._email = email_service.SMTPSender()
+        return self._email
+
+    @property
+    def whatsapp(self):
+        if self._whatsapp is None:
+            self._whatsapp = whatsapp_service.WhatsAppSender()
+        return self._whatsapp
+
+    async def _send_emails(self, messages, outcomes):
+        # sequential on purpose: one SMTP connection carries one message at a time
+        for index, message in enumerate(messages):
+            try:
+                await self.email.send(message.recipient, message.subject, message.body)
+                outcomes[message.id] = None
+            except Exception as exc:
+                outcomes[message.id] = exc
+                if is_connection_error(exc):
+                    for rest in messages[index + 1:]:
+                        outcomes[rest.id] = exc
+                    return
+
+    async def _send_whatsapp(self, messages, outcomes):
+        semaphore = asyncio.Semaphore(settings.OUTBOX_HTTP_CONCURRENCY)
+
+        async def send(message):
+            async with semaphore:
+                try:
+                    await self.whatsapp.send(message.recipient, message.body)
+                    outcomes[message.id] = None
+                except Exception as exc:
+                    outcomes[message.id] = exc
+
+        await asyncio.gather(*(send(message) for message in messages))
+
+    def _outcome_row(self, message, error, now):
+        attempts = message.attempts + 1
+        row = {
+            "b_id": message.id,
+            "b_token": message.claim_token,
+            "b_attempts": attempts,
+            "b_next_attempt_at": now,
+            "b_last_error": None,
+            "b_sent_at": None,
+        }
+        if error is None:
+            self.stats["sent"] += 1
+            return {**row, "b_status": OutboxStatus.sent, "b_sent_at": now}
+        row["b_last_error"] = f"{type(error).__name__}: {error}"[:1000]
+        if is_permanent(error) or attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            self.stats["failed"] += 1
+            return {**row, "b_status": OutboxStatus.failed}
+        self.stats["retried"] += 1
+        return {**row, "b_status": OutboxStatus.pending, "b_next_attempt_at": now + backoff(attempts)}
+
+    async def process_batch(self) -> int:
+        """Claim, send and record one batch; returns how many were claimed"""
+        async with self.session_factory() as db:
+            messages = await claim(db, self.batch_size, settings.OUTBOX_LEASE_SECONDS)
+            if not messages:
+                return 0
+
+            outcomes = {}
+            emails = [m for m in messages if m.channel == EMAIL]
+            chats = [m for m in messages if m.channel == WHATSAPP]
+            for message in messages:
+                if message.channel not in (EMAIL, WHATSAPP):
+                    outcomes[message.id] = ValueError(f"Unknown channel {message.channel!r}")
+            await asyncio.gather(self._send_emails(emails, outcomes), self._send_whatsapp(chats, outcomes))
+
+            now = utcnow()
+            await db.execute(RECORD_OUTCOME, [self._outcome_row(m, outcomes[m.id], now) for m in messages])
+            await db.commit()
+            return len(messages)
+
+    async def close(self):
+        if self._email is not None:
+            await self._email.close()
+        if self._whatsapp is not None:
+            await self._whatsapp.close()
+
+
+# In-app dispatcher, started and stopped by main.py; notify() is called
+# after an order commits, so it sends right away
+in_app = InAppWorker(Dispatcher)
+start, stop, notify = in_app.start, in_app.stop, in_app.notify
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Deliver queued email and WhatsApp notifications")
+    parser.add_argument("--once", action="store_true", help="send everything that is due, then exit")
+    parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    async def work():
+        dispatcher = Dispatcher(batch_size=args.batch_size)
+        try:
+            if args.once:
+                await dispatcher.drain()
+            else:
+                await dispatcher.run()
+        finally:
+            await dispatcher.close()
+        return dispatcher.stats
+
+    try:
+        stats = asyncio.run(work())
+    except KeyboardInterrupt:
+        return
+    print(f"✅ Outbox: {stats['sent']} sent, {stats['retried']} to retry, {stats['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
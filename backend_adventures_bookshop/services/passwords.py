@@ -0,0 +1,100 @@
+# services/passwords.py
+"""
+Password hashing and verification on a dedicated, bounded thread pool
+bcrypt is deliberately slow, so it never runs on the event loop or in the
+request threadpool. The bcrypt binding releases the GIL, so a few threads
+use a few cores. Jobs beyond PASSWORD_HASH_MAX_PENDING (running + queued)
+are refused with a 503 instead of piling up behind a burst of logins.
+The bcrypt cost comes from settings.BCRYPT_ROUNDS; hashes made with another
+cost are flagged by passlib's needs_update and re-hashed on the next login.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from config import settings
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
+
+_executor = None
+_pending = 0
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            thread_name_prefix="bcrypt",
+        )
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def pending() -> int:
+    """Jobs currently running or queued"""
+    return _pending
+
+
+def _submit(fn, *args):
+    global _pending
+    with _lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-in attempts in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        future = get_executor().submit(fn, *args)
+    except BaseException:
+        _release()
+        raise
+    future.add_done_callback(lambda _: _release())
+    return future
+
+
+def _release():
+    global _pending
+    with _lock:
+        _pending -= 1
+
+
+def _verify_and_upgrade(password: str, hashed: str):
+    if not pwd_context.verify(password, hashed):
+        return False, None
+    if pwd_context.needs_update(hashed):
+        return True, pwd_context.hash(password)
+    return True, None
+
+
+async def hash_password(password: str) -> str:
+    return await asyncio.wrap_future(_submit(pwd_context.hash, password))
+
+
+async def verify_password(password: str, hashed: str):
+    """
+    Check a password; returns (ok, new_hash). new_hash is set when the stored
+    hash uses outdated settings (e.g. a different cost) and should be saved.
+    """
+    return await asyncio.wrap_future(_submit(_verify_and_upgrade, password, hashed))
+
+
+def hash_password_sync(password: str) -> str:
+    """For scripts outside the event loop (e.g. setup_database)"""
+    return _submit(pwd_context.hash, password).result()
@@ -0,0 +1,311 @@
+# services/payment_callbacks.py
+"""
+M-Pesa STK callbacks: append-only ingestion and a batch consumer
+The callback endpoint only inserts the raw callback, keyed on its
+CheckoutRequestID with ON CONFLICT DO NOTHING, so the provider's retries and
+duplicate deliveries are no-ops and a burst never queues up behind row locks
+on payments or orders. Inserts arriving together share one statement and
+commit (CallbackWriter).
+
+CallbackConsumer applies them afterwards in batches, one transaction each:
+- a successful result completes the payment, marks the order paid and moves
+  a pending order to confirmed; anything else fails the payment
+- only pending payments change, only the orders of payments that did
+  change are updated, and a paid order never goes back, so replays,
+  out-of-order callbacks and results reconciliation already applied are
+  harmless
+- a callback can beat the STK push response it belongs to (no Payment row
+  yet); it is retried every PAYMENT_CALLBACK_RETRY_SECONDS and dropped after
+  PAYMENT_CALLBACK_ORPHAN_SECONDS, leaving the payment to reconciliation
+
+Runs in the API process (PAYMENT_CALLBACKS_IN_APP) or as a worker:
+`python -m services.payment_callbacks` (add --once to apply what is queued)
+"""
+import asyncio
+import contextvars
+import time
+from datetime import datetime, timedelta, timezone
+
+import orjson
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import settings
+from models import Order, OrderStatus, Payment, PaymentCallback, PaymentStatus
+from utils.worker import InAppWorker, PollingWorker
+
+RESULT_SUCCESS = 0
+
+callbacks_table = PaymentCallback.__table__
+payments_table = Payment.__table__
+orders_table = Order.__table__
+
+
+def parse(body: bytes) -> dict:
+    """Callback columns from a raw stkCallback body; ValueError if malformed"""
+    try:
+        callback = orjson.loads(body)["Body"]["stkCallback"]
+        items = {
+            item["Name"]: item.get("Value")
+            for item in (callback.get("CallbackMetadata") or {}).get("Item", [])
+        }
+        return {
+            "checkout_request_id": str(callback["CheckoutRequestID"]),
+            "merchant_request_id": callback.get("MerchantRequestID"),
+            "result_code": int(callback["ResultCode"]),
+            "result_desc": callback.get("ResultDesc"),
+            "receipt_number": items.get("MpesaReceiptNumber"),
+            "amount": items.get("Amount"),
+            "payload": body.decode(),
+        }
+    except (KeyError, TypeError, AttributeError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Malformed callback: {exc!r}") from exc
+
+
+def insert_ignoring_duplicates(dialect: str):
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    return insert(PaymentCallback).on_conflict_do_nothing(index_elements=["checkout_request_id"])
+
+
+class CallbackWriter:
+    """
+    Group commit for the callback endpoint: callbacks that arrive while the
+    previous INSERT is in flight are stored together in the next one, with a
+    single commit. Each request is acknowledged only after its row is
+    committed, but a burst costs a handful of write transactions instead of
+    one per callback, which keeps request handlers from queueing on the
+    database's write lock.
+    """
+
+    def __init__(self, engine=None, max_batch=None):
+        if engine is None:
+            from database import async_engine
+            engine = async_engine
+        self.engine = engine
+        self.max_batch = max_batch or settings.PAYMENT_CALLBACK_BATCH_SIZE
+        self._loop = None
+        self._queue = None
+        self._task = None
+
+    async def write(self, row: dict):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # first use, or a new event loop
+            self._loop, self._queue = loop, asyncio.Queue()
+            # The task outlives the request that starts it, so it gets an
+            # empty context rather than a copy of the request's (per-request
+            # ContextVars in utils/metrics.py and utils/query_budget.py would
+            # otherwise count every later batch against this first request)
+            self._task = loop.create_task(self._run(), context=contextvars.Context())
+        future = loop.create_future()
+        self._queue.put_nowait((row, future))
+        await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                async with self.engine.begin() as connection:
+                    await connection.execute(
+                        insert_ignoring_duplicates(connection.dialect.name), [row for row, _ in batch]
+                    )
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._loop = self._queue = self._task = None
+
+
+writer = CallbackWriter()
+
+
+async def ingest(body: bytes):
+    """Store a callback (a repeat of a stored CheckoutRequestID is ignored)"""
+    await writer.write(parse(body))
+
+
+# Batched writes; the WHERE clauses make every one of them idempotent
+SETTLE_PAYMENT = (
+    payments_table.update()
+    .where(payments_table.c.id == bindparam("b_id"), payments_table.c.status == PaymentStatus.pending)
+    .values(
+        status=bindparam("b_status"),
+        provider_reference=func.coalesce(bindparam("b_receipt"), payments_table.c.provider_reference),
+    )
+)
+MARK_ORDER_PAID = (
+    orders_table.update()
+    .where(orders_table.c.id == bindparam("b_id"), orders_table.c.payment_status != PaymentStatus.completed)
+    .values(
+        payment_status=PaymentStatus.completed,
+        status=case((orders_table.c.status == OrderStatus.pending, OrderStatus.confirmed), else_=orders_table.c.status),
+    )
+)
+MARK_ORDER_UNPAID = (
+    orders_table.update()
+    .where(orders_table.c.id == bindparam("b_id"), orders_table.c.payment_status != PaymentStatus.completed)
+    .values(payment_status=PaymentStatus.failed)
+)
+
+
+async def settle(db, outcomes):
+    """
+    Apply payment results with one executemany per statement; outcomes are
+    (payment_id, order_id, success, receipt_number). Shared with
+    services/reconciliation.py. The caller commits.
+    Only payments still pending are settled, and only their orders are
+    touched: a result for a payment that something else already settled
+    (a replay, reconciliation, a late callback) changes nothing.
+    """
+    if not outcomes:
+        return
+    # lock the pending ones in id order, as orders.py does for stock, so a
+    # concurrent settle of the same payments waits and then finds them settled
+    pending = set((await db.execute(
+        select(payments_table.c.id)
+        .where(
+            payments_table.c.id.in_([payment_id for payment_id, *_ in outcomes]),
+            payments_table.c.status == PaymentStatus.pending,
+        )
+        .order_by(payments_table.c.id)
+        .with_for_update()
+    )).scalars())
+
+    settled, paid, unpaid = [], [], []
+    for payment_id, order_id, success, receipt in outcomes:
+        if payment_id not in pending:
+            continue
+        pending.discard(payment_id)  # a payment twice in one batch: the first result wins
+        settled.append({
+            "b_id": payment_id,
+            "b_status": PaymentStatus.completed if success else PaymentStatus.failed,
+            "b_receipt": receipt,
+        })
+        (paid if success else unpaid).append({"b_id": order_id})
+    if settled:
+        await db.execute(SETTLE_PAYMENT, settled)
+    if paid:
+        await db.execute(MARK_ORDER_PAID, paid)
+    if unpaid:
+        await db.execute(MARK_ORDER_UNPAID, unpaid)
+
+
+class CallbackConsumer(PollingWorker):
+    name = "Payment callback consumer"
+
+    def __init__(self, session_factory=None, batch_size=None):
+        super().__init__(batch_size or settings.PAYMENT_CALLBACK_BATCH_SIZE, settings.PAYMENT_CALLBACK_POLL_SECONDS)
+        if session_factory is None:
+            from database import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        self.session_factory = session_factory
+        self._deferred = {}  # callback id -> when to look for its payment again
+        self.stats = {"applied": 0, "ignored": 0, "orphaned": 0}
+
+    async def process_batch(self) -> int:
+        """Apply one batch of unprocessed callbacks; returns how many were looked at"""
+        now = time.monotonic()
+        waiting = [callback_id for callback_id, retry_at in self._deferred.items() if retry_at > now]
+        expired_before = datetime.now(timezone.utc) - timedelta(seconds=settings.PAYMENT_CALLBACK_ORPHAN_SECONDS)
+
+        async with self.session_factory() as db:
+            callbacks = (await db.execute(
+                select(
+                    callbacks_table.c.id,
+                    callbacks_table.c.checkout_request_id,
+                    callbacks_table.c.result_code,
+                    callbacks_table.c.receipt_number,
+                    (callbacks_table.c.received_at < expired_before).label("expired"),
+                )
+                .where(callbacks_table.c.processed_at.is_(None), callbacks_table.c.id.notin_(waiting))
+                .order_by(callbacks_table.c.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not callbacks:
+                return 0
+
+            payments = {
+                payment.transaction_id: payment
+                for payment in (await db.execute(
+                    select(payments_table.c.id, payments_table.c.transaction_id,
+                           payments_table.c.order_id, payments_table.c.status)
+                    .where(payments_table.c.transaction_id.in_([c.checkout_request_id for c in callbacks]))
+                )).all()
+            }
+
+            processed, outcomes = [], []
+            for callback in callbacks:
+                payment = payments.get(callback.checkout_request_id)
+                if payment is None and not callback.expired:
+                    self._deferred[callback.id] = now + settings.PAYMENT_CALLBACK_RETRY_SECONDS
+                    continue
+                self._deferred.pop(callback.id, None)
+                processed.append(callback.id)
+                if payment is None:
+                    self.stats["orphaned"] += 1
+                    continue
+                if payment.status != PaymentStatus.pending:
+                    self.stats["ignored"] += 1
+                    continue
+                outcomes.append((
+                    payment.id, payment.order_id, callback.result_code == RESULT_SUCCESS, callback.receipt_number,
+                ))
+                self.stats["applied"] += 1
+
+            await settle(db, outcomes)
+            if processed:
+                await db.execute(
+                    update(PaymentCallback)
+                    .where(PaymentCallback.id.in_(processed))
+                    .values(processed_at=datetime.now(timezone.utc))
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+            return len(callbacks)
+
+
+# In-app consumer, started and stopped by main.py. It is not woken per
+# callback: polling lets a burst be applied in a few large transactions
+in_app = InAppWorker(CallbackConsumer)
+start, stop = in_app.start, in_app.stop
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply stored M-Pesa callbacks to payments and orders")
+    parser.add_argument("--once", action="store_true", help="apply everything queued, then exit")
+    parser.add_argument("--batch-size", type=int, default=settings.PAYMENT_CALLBACK_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    async def work():
+        consumer = CallbackConsumer(batch_size=args.batch_size)
+        if args.once:
+            await consumer.drain()
+        else:
+            await consumer.run()
+        return consumer.stats
+
+    try:
+        stats = asyncio.run(work())
+    except KeyboardInterrupt:
+        return
+    print(f"✅ Callbacks: {stats['applied']} applied, {stats['ignored']} already settled, {stats['orphaned']} without a payment")
+
+
+if __name__ == "__main__":
+    main()
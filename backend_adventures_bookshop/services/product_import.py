@@ -0,0 +1,241 @@
+# services/product_import.py
+"""
+Bulk product import from CSV or NDJSON (POST /admin/products/import)
+The upload is read row by row, never whole, and each row is validated
+against schemas.ProductImportRow as it is read. Valid rows are upserted in
+batches of PRODUCT_IMPORT_BATCH_SIZE, keyed on slug, with the dialect's
+INSERT ... ON CONFLICT (slug) DO UPDATE, one transaction per batch:
+- a new slug inserts the product; an existing one updates only the columns
+  the row gives (a CSV's header, or an NDJSON object's keys)
+- categories are given by slug and resolved from one lookup per import
+- empty CSV cells are treated as not given
+- when a slug appears twice in a batch, the later row wins; one repeated in
+  a later batch is written again, and counted as an update
+Rows that fail validation are skipped and listed in the report with their
+line number (the first PRODUCT_IMPORT_MAX_ERRORS of them); the rest are
+imported. A file that turns unreadable partway (bytes that aren't UTF-8,
+broken CSV quoting) stops the import at that line, and the report says
+where; the rows before it are imported. A file unreadable from its first
+line is rejected as a whole.
+With dry_run, rows are validated and resolved but nothing is written.
+The caller invalidates the catalog cache afterwards.
+"""
+import codecs
+import csv
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import settings
+from models import Category, Product
+from schemas import ProductImportRow
+
+FORMATS = ("csv", "ndjson")
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+FIELDS = set(ProductImportRow.model_fields)
+REQUIRED = {name for name, info in ProductImportRow.model_fields.items() if info.is_required()}
+
+products_table = Product.__table__
+
+
+class ImportFileError(ValueError):
+    """The file as a whole can't be imported (unknown format, bad CSV header)"""
+
+
+@dataclass
+class ImportReport:
+    format: str
+    dry_run: bool
+    rows: int = 0
+    inserted: int = 0
+    updated: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    errors: List[dict] = field(default_factory=list)
+    errors_truncated: bool = False
+    stopped: Optional[str] = None  # why reading the file stopped early, if it did
+
+    def add_error(self, line: int, slug: Optional[str], messages: List[str]):
+        self.failed += 1
+        if len(self.errors) < settings.PRODUCT_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": line, "slug": slug, "errors": messages})
+        else:
+            self.errors_truncated = True
+
+
+def detect_format(filename: str = None, content_type: str = None) -> str:
+    for extension, fmt in EXTENSIONS.items():
+        if filename and filename.lower().endswith(extension):
+            return fmt
+    fmt = CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+    if fmt is None:
+        raise ImportFileError("Unknown file format; upload a .csv or .ndjson file, or pass format=csv|ndjson")
+    return fmt
+
+
+def text_lines(stream):
+    """
+    Lines of a binary stream, each decoded as it is read (not in read-ahead
+    blocks), so bytes that aren't UTF-8 raise at their own line and the
+    rows before it have already been handed out
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    for line in stream:
+        yield decoder.decode(line)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def csv_rows(stream):
+    """(line number, dict) per CSV record; empty cells are left out, so they fall back to defaults"""
+    reader = csv.DictReader(text_lines(stream))
+    header = [name.strip() for name in reader.fieldnames or []]
+    unknown = [name for name in header if name not in FIELDS]
+    missing = REQUIRED - set(header)
+    if unknown or missing:
+        problems = []
+        if missing:
+            problems.append(f"missing columns: {', '.join(sorted(missing))}")
+        if unknown:
+            problems.append(f"unknown columns: {', '.join(unknown)}")
+        raise ImportFileError(f"Bad CSV header ({'; '.join(problems)})")
+    reader.fieldnames = header
+    for record in reader:
+        if None in record:
+            yield reader.line_num, ValueError(f"{len(record[None])} more values than columns")
+            continue
+        yield reader.line_num, {name: value for name, value in record.items() if value not in (None, "")}
+
+
+def ndjson_rows(stream, chunk_size: int = 1024 * 1024):
+    """(line number, dict or ValueError) per non-blank NDJSON line, read in chunks"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_number = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        text = decoder.decode(chunk, final=not chunk)
+        lines = (pending + text).split("\n")
+        pending = lines.pop() if chunk else ""
+        for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                row = orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
+                yield line_number, ValueError(f"invalid JSON: {exc}")
+                continue
+            if not isinstance(row, dict):
+                yield line_number, ValueError("expected a JSON object")
+                continue
+            yield line_number, row
+        if not chunk:
+            return
+
+
+def upsert_statement(dialect: str, columns):
+    """INSERT ... ON CONFLICT (slug) DO UPDATE of the given columns"""
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(products_table)
+    return statement.on_conflict_do_update(
+        index_elements=["slug"],
+        set_={column: statement.excluded[column] for column in columns if column != "slug"},
+    )
+
+
+def _messages(exc: ValidationError) -> List[str]:
+    return [
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors(include_url=False)
+    ]
+
+
+def import_products(db, stream, fmt: str, dry_run: bool = False, batch_size: int = None) -> ImportReport:
+    """Validate and upsert every row of a binary file object; commits per batch"""
+    if fmt not in FORMATS:
+        raise ImportFileError(f"Unknown format '{fmt}', expected one of {', '.join(FORMATS)}")
+    batch_size = batch_size or settings.PRODUCT_IMPORT_BATCH_SIZE
+    started = time.perf_counter()
+    report = ImportReport(format=fmt, dry_run=dry_run)
+    dialect = db.bind.dialect.name
+    categories = dict(db.execute(select(Category.slug, Category.id)).all())
+    batch = {}  # slug -> row values, so a repeated slug keeps its last row
+
+    def flush():
+        if not batch:
+            return
+        rows = list(batch.values())
+        batch.clear()
+        report.batches += 1
+        existing = set(db.execute(
+            select(products_table.c.slug).where(products_table.c.slug.in_([row["slug"] for row in rows]))
+        ).scalars())
+        report.updated += len(existing)
+        report.inserted += len(rows) - len(existing)
+        if dry_run:
+            return
+        # rows giving the same columns share a statement
+        by_columns = {}
+        for row in rows:
+            by_columns.setdefault(tuple(sorted(row)), []).append(row)
+        for columns, group in by_columns.items():
+            db.execute(upsert_statement(dialect, columns), group)
+        db.commit()
+
+    rows = csv_rows(stream) if fmt == "csv" else ndjson_rows(stream)
+    line = 0
+    while True:
+        try:
+            line, raw = next(rows)
+        except StopIteration:
+            break
+        except (UnicodeDecodeError, csv.Error) as exc:
+            if not report.rows:
+                raise ImportFileError(f"Unreadable file: {exc}")
+            report.stopped = f"could not read past line {line}: {exc}"
+            break
+        report.rows += 1
+        if isinstance(raw, ValueError):
+            report.add_error(line, None, [str(raw)])
+            continue
+        try:
+            row = ProductImportRow.model_validate(raw)
+        except ValidationError as exc:
+            slug = raw.get("slug")
+            report.add_error(line, slug if isinstance(slug, str) else None, _messages(exc))
+            continue
+        values = row.model_dump(include=row.model_fields_set | REQUIRED)
+        if "category" in values:
+            category_slug = values.pop("category")
+            if category_slug is None:
+                values["category_id"] = None
+            elif category_slug in categories:
+                values["category_id"] = categories[category_slug]
+            else:
+                report.add_error(line, row.slug, [f"category: no category with slug '{category_slug}'"])
+                continue
+        if row.slug in batch:
+            report.duplicates += 1
+        batch[row.slug] = values
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    report.seconds = time.perf_counter() - started
+    return report
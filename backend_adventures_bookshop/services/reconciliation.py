@@ -0,0 +1,211 @@
+# services/reconciliation.py
+"""
+Settles M-Pesa payments left pending after a lost or never-sent callback
+Pages through pending payments oldest first by (created_at, id), leaving
+the newest RECONCILE_MIN_AGE_SECONDS to their callbacks. Each page is
+checked against the STK push query API, at most RECONCILE_CONCURRENCY
+requests at a time over the shared client in services/mpesa.py, and the
+results are written back with the batched statements the callback consumer
+uses, in one transaction per page.
+
+The position after each page is saved in job_checkpoints in that same
+transaction, so an interrupted run picks up where it stopped. A run that
+reaches the end clears it, and the next run starts from the oldest again.
+Payments M-Pesa is still processing, or that could not be queried, stay
+pending for a later run.
+
+Run it with `python -m services.reconciliation`, or a few pages at a time
+(RECONCILE_REQUEST_MAX_PAGES) with POST /admin/payments/reconcile.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import httpx
+from sqlalchemy import and_, delete, or_, select
+
+from config import settings
+from models import JobCheckpoint, Payment, PaymentStatus
+from services import mpesa
+from services.payment_callbacks import settle
+
+CHECKPOINT = "payment_reconciliation"
+
+_running = False
+
+
+class AlreadyRunning(Exception):
+    pass
+
+
+@dataclass
+class ReconcileReport:
+    checked: int = 0
+    completed: int = 0
+    failed: int = 0
+    still_pending: int = 0
+    errors: int = 0
+    pages: int = 0
+    resumed_from: Optional[dict] = None
+    finished: bool = False
+    error_samples: list = field(default_factory=list)
+
+    def summary(self) -> str:
+        resumed = f" (resumed after payment {self.resumed_from['id']})" if self.resumed_from else ""
+        return (
+            f"Checked {self.checked} pending payments in {self.pages} pages{resumed}: "
+            f"{self.completed} completed, {self.failed} failed, {self.still_pending} still pending, "
+            f"{self.errors} could not be queried"
+            + ("" if self.finished else "; stopped early, the next run resumes")
+        )
+
+
+def interpret(result: dict):
+    """True/False for a final STK query result, None while still in progress"""
+    code = result.get("ResultCode")
+    if code is None:
+        return None
+    return str(code) == "0"
+
+
+def after(cursor):
+    if cursor is None:
+        return True
+    created_at = datetime.fromisoformat(cursor["created_at"])
+    return or_(
+        Payment.created_at > created_at,
+        and_(Payment.created_at == created_at, Payment.id > cursor["id"]),
+    )
+
+
+async def reconcile(
+    client=None,
+    session_factory=None,
+    page_size=None,
+    concurrency=None,
+    min_age_seconds=None,
+    resume=True,
+    max_pages=None,
+) -> ReconcileReport:
+    """One pass over the pending payments; raises AlreadyRunning if one is in progress"""
+    global _running
+    if _running:
+        raise AlreadyRunning()
+    _running = True
+    try:
+        return await _reconcile(
+            client or mpesa.get_client(),
+            session_factory,
+            page_size or settings.RECONCILE_PAGE_SIZE,
+            concurrency or settings.RECONCILE_CONCURRENCY,
+            settings.RECONCILE_MIN_AGE_SECONDS if min_age_seconds is None else min_age_seconds,
+            resume,
+            max_pages,
+        )
+    finally:
+        _running = False
+
+
+async def _reconcile(client, session_factory, page_size, concurrency, min_age_seconds, resume, max_pages):
+    if session_factory is None:
+        from database import AsyncSessionLocal
+        session_factory = AsyncSessionLocal
+    report = ReconcileReport()
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=min_age_seconds)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def query(payment):
+        async with semaphore:
+            try:
+                return interpret(await client.stk_query(payment.transaction_id))
+            except httpx.HTTPStatusError as exc:
+                # M-Pesa answers 500 with an errorCode while the push is still open
+                if exc.response.status_code == 500 and "errorCode" in exc.response.text:
+                    return None
+                error = exc
+            except httpx.HTTPError as exc:
+                error = exc
+            report.errors += 1
+            if len(report.error_samples) < 5:
+                report.error_samples.append(f"{payment.transaction_id}: {type(error).__name__}: {error}")
+            return error
+
+    async with session_factory() as db:
+        checkpoint = await db.get(JobCheckpoint, CHECKPOINT) if resume else None
+    cursor = report.resumed_from = checkpoint.position if checkpoint else None
+
+    while max_pages is None or report.pages < max_pages:
+        async with session_factory() as db:
+            page = (await db.execute(
+                select(Payment.id, Payment.order_id, Payment.transaction_id, Payment.created_at)
+                .where(
+                    Payment.status == PaymentStatus.pending,
+                    Payment.payment_method == "mpesa",
+                    Payment.created_at <= cutoff,
+                    after(cursor),
+                )
+                .order_by(Payment.created_at, Payment.id)
+                .limit(page_size)
+            )).all()
+        if not page:
+            report.finished = True
+            async with session_factory() as db:
+                await db.execute(delete(JobCheckpoint).where(JobCheckpoint.name == CHECKPOINT))
+                await db.commit()
+            break
+
+        # no transaction is open while the provider is being queried
+        results = await asyncio.gather(*(query(payment) for payment in page))
+
+        outcomes = []
+        for payment, result in zip(page, results):
+            if result is True or result is False:
+                outcomes.append((payment.id, payment.order_id, result, None))
+                report.completed += result
+                report.failed += not result
+            elif result is None:
+                report.still_pending += 1
+        last = page[-1]
+        cursor = {"created_at": last.created_at.isoformat(), "id": last.id}
+        async with session_factory() as db:
+            await settle(db, outcomes)
+            await db.merge(JobCheckpoint(name=CHECKPOINT, position=cursor))
+            await db.commit()
+        report.checked += len(page)
+        report.pages += 1
+    return report
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Settle pending M-Pesa payments from the transaction status API")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    parser.add_argument("--page-size", type=int, default=settings.RECONCILE_PAGE_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.RECONCILE_CONCURRENCY)
+    parser.add_argument("--min-age-seconds", type=int, default=settings.RECONCILE_MIN_AGE_SECONDS)
+    parser.add_argument("--max-pages", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    async def work():
+        try:
+            return await reconcile(
+                page_size=args.page_size,
+                concurrency=args.concurrency,
+                min_age_seconds=args.min_age_seconds,
+                resume=not args.restart,
+                max_pages=args.max_pages,
+            )
+        finally:
+            await mpesa.shutdown()
+
+    report = asyncio.run(work())
+    print(report.summary())
+    for sample in report.error_samples:
+        print(f"  {sample}")
+    print("✅ Reconciliation complete." if report.finished else "✅ Reconciliation paused.")
+
+
+if __name__ == "__main__":
+    main()
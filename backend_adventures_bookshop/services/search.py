@@ -0,0 +1,217 @@
+# services/search.py
+"""
+Full-text product search over name, description and category name
+- SQLite: an FTS5 table (products_fts, rowid = products.id) ranked by bm25
+- Postgres: a products.search_vector tsvector column with a GIN index, ranked by ts_rank
+Both are kept in sync by database triggers, so every write path (ORM, bulk
+inserts, raw SQL, category renames) updates the index without app code.
+Rebuild from scratch with: python -m services.search
+"""
+import re
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.orm import selectinload
+
+from models import Product
+
+# Relative weights of the name, description and category columns
+SQLITE_BM25_WEIGHTS = "10.0, 1.0, 5.0"
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, category,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, coalesce(new.description, ''),
+                coalesce((SELECT name FROM categories WHERE id = new.category_id), ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category_id ON products BEGIN
+        DELETE FROM products_fts WHERE rowid = old.id;
+        INSERT INTO products_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, coalesce(new.description, ''),
+                coalesce((SELECT name FROM categories WHERE id = new.category_id), ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS categories_fts_au AFTER UPDATE OF name ON categories BEGIN
+        UPDATE products_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = new.id);
+    END
+    """,
+]
+
+SQLITE_REBUILD = [
+    "DELETE FROM products_fts",
+    """
+    INSERT INTO products_fts(rowid, name, description, category)
+    SELECT p.id, p.name, coalesce(p.description, ''), coalesce(c.name, '')
+    FROM products p LEFT JOIN categories c ON c.id = p.category_id
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS categories_fts_au",
+    "DROP TRIGGER IF EXISTS products_fts_au",
+    "DROP TRIGGER IF EXISTS products_fts_ad",
+    "DROP TRIGGER IF EXISTS products_fts_ai",
+    "DROP TABLE IF EXISTS products_fts",
+]
+
+POSTGRES_DDL = [
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+    """
+    CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(
+                (SELECT name FROM categories WHERE id = NEW.category_id), '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS products_search_vector_trg ON products",
+    """
+    CREATE TRIGGER products_search_vector_trg
+    BEFORE INSERT OR UPDATE OF name, description, category_id ON products
+    FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION categories_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE products SET name = name WHERE category_id = NEW.id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS categories_search_vector_trg ON categories",
+    """
+    CREATE TRIGGER categories_search_vector_trg
+    AFTER UPDATE OF name ON categories
+    FOR EACH ROW EXECUTE FUNCTION categories_search_vector_update()
+    """,
+]
+
+# Re-fires the BEFORE UPDATE trigger for every row
+POSTGRES_REBUILD = ["UPDATE products SET name = name"]
+
+POSTGRES_DROP = [
+    "DROP TRIGGER IF EXISTS categories_search_vector_trg ON categories",
+    "DROP FUNCTION IF EXISTS categories_search_vector_update()",
+    "DROP TRIGGER IF EXISTS products_search_vector_trg ON products",
+    "DROP FUNCTION IF EXISTS products_search_vector_update()",
+    "DROP INDEX IF EXISTS ix_products_search_vector",
+    "ALTER TABLE products DROP COLUMN IF EXISTS search_vector",
+]
+
+products_fts = table("products_fts", column("rowid"))
+search_vector = literal_column("products.search_vector")
+
+
+def _execute_all(connection, statements):
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _is_installed(connection) -> bool:
+    if connection.dialect.name == "sqlite":
+        found = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+        )).first()
+    else:
+        found = connection.execute(text(
+            "SELECT 1 FROM information_schema.columns "
+            "WHERE table_name = 'products' AND column_name = 'search_vector'"
+        )).first()
+    return found is not None
+
+
+def install(connection):
+    """Create and backfill the index and its triggers if they are missing"""
+    dialect = connection.dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        return
+    if _is_installed(connection):
+        return
+    _execute_all(connection, SQLITE_DDL if dialect == "sqlite" else POSTGRES_DDL)
+    rebuild(connection)
+
+
+def rebuild(connection):
+    """Repopulate the index from the products and categories tables"""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        _execute_all(connection, SQLITE_REBUILD)
+    elif dialect == "postgresql":
+        _execute_all(connection, POSTGRES_REBUILD)
+
+
+def uninstall(connection):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        _execute_all(connection, SQLITE_DROP)
+    elif dialect == "postgresql":
+        _execute_all(connection, POSTGRES_DROP)
+
+
+def search_terms(q: str):
+    """Split user input into plain word tokens, dropping FTS/tsquery syntax"""
+    return re.findall(r"\w+", q.lower())
+
+
+def search_statement(dialect: str, q: str, limit: int, active_only: bool = True):
+    """
+    Build a ranked, prefix-matching product search. Every term must match
+    (in any of the indexed columns). Returns None when q has no searchable terms.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+
+    stmt = select(Product).options(selectinload(Product.category))
+    if active_only:
+        stmt = stmt.filter(Product.is_active == True)
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        stmt = (
+            stmt.join(products_fts, products_fts.c.rowid == Product.id)
+            .where(text("products_fts MATCH :match").bindparams(match=match))
+            .order_by(text(f"bm25(products_fts, {SQLITE_BM25_WEIGHTS})"))
+        )
+    elif dialect == "postgresql":
+        query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+        stmt = stmt.where(search_vector.op("@@")(query)).order_by(
+            func.ts_rank(search_vector, query).desc()
+        )
+    else:
+        # No full-text support: fall back to substring match on the name
+        for term in terms:
+            stmt = stmt.filter(Product.name.ilike(f"%{term}%"))
+        stmt = stmt.order_by(Product.created_at.desc())
+
+    return stmt.limit(limit)
+
+
+if __name__ == "__main__":
+    from database import engine
+
+    with engine.begin() as connection:
+        install(connection)
+        rebuild(connection)
+    print("✅ Product search index rebuilt")
@@ -1,3 +1,55 @@
-# services/whatsapp_service.py  
-def send_whatsapp_message(phone_number: str, message: str):
-    print(f"Sending WhatsApp message to {phone_number}: {message}")
+# services/whatsapp_service.py
+"""
+WhatsApp order messages and the Cloud API sender used by the outbox
+dispatcher. One httpx.AsyncClient (and its keep-alive pool) is shared by
+every message the dispatcher sends.
+"""
+import re
+
+import httpx
+
+from config import settings
+
+
+def normalize_phone(phone: str) -> str:
+    """Digits only, in international form (07xx... -> 2547xx...)"""
+    digits = re.sub(r"\D", "", phone)
+    if digits.startswith("0") and len(digits) == 10:
+        digits = "254" + digits[1:]
+    return digits
+
+
+def order_message(order) -> str:
+    return (
+        f"Hi {order.full_name}, we have received your order {order.order_number} "
+        f"(KES {order.total_amount:,.2f}). We will message you when it is on its way."
+    )
+
+
+class WhatsAppSender:
+    """Posts text messages to the WhatsApp Cloud API"""
+
+    def __init__(self, base_url=None, token=None, phone_number_id=None, max_connections=None, timeout=10.0):
+        max_connections = max_connections or settings.OUTBOX_HTTP_CONCURRENCY
+        self.phone_number_id = phone_number_id or settings.WHATSAPP_PHONE_NUMBER_ID
+        self.client = httpx.AsyncClient(
+            base_url=base_url or settings.WHATSAPP_API_URL,
+            headers={"Authorization": f"Bearer {token or settings.WHATSAPP_TOKEN}"},
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    async def send(self, recipient: str, body: str):
+        response = await self.client.post(
+            f"/{self.phone_number_id}/messages",
+            json={
+                "messaging_product": "whatsapp",
+                "to": normalize_phone(recipient),
+                "type": "text",
+                "text": {"body": body},
+            },
+        )
+        response.raise_for_status()
+
+    async def close(self):
+        await self.client.aclose()
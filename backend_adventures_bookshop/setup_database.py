@@ -1,8 +1,6 @@
 from database import SessionLocal
 from models import User, Category, Product
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from services import passwords
 
 def seed_data():
     db = SessionLocal()
@@ -13,7 +11,7 @@ def seed_data():
                 email="admin@schoolmall.co.ke",
                 full_name="Admin User",
                 phone="+254793488207",
-                hashed_password=pwd_context.hash("admin123"),
+                hashed_password=passwords.hash_password_sync("admin123"),
                 role="admin"
             ))
             print("✅ Admin user created")
@@ -0,0 +1,81 @@
+"""Admin image uploads and hero banners, on the async session; oversized images refused"""
+import io
+
+import pytest
+from PIL import Image
+from sqlalchemy import select
+
+from config import settings
+from database import SessionLocal
+from models import StoredImage
+from services import images
+
+
+def png(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def upload(content: bytes, name="photo.png"):
+    return {"file": (name, content, "image/png")}
+
+
+def test_identical_uploads_are_stored_once(client, admin_headers):
+    content = png("red")
+
+    first = client.post("/admin/upload-image", files=upload(content), headers=admin_headers)
+    second = client.post("/admin/upload-image", files=upload(content, "again.png"), headers=admin_headers)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json()["url"] == second.json()["url"]
+    with SessionLocal() as db:
+        stored = db.execute(select(StoredImage).where(StoredImage.path == first.json()["url"])).scalars().all()
+    assert len(stored) == 1 and stored[0].width == 64
+
+
+def test_upload_that_is_not_an_image_is_rejected(client, admin_headers):
+    response = client.post("/admin/upload-image", files=upload(b"not an image"), headers=admin_headers)
+    assert response.status_code == 400
+
+
+def test_create_and_update_banner(client, admin_headers):
+    created = client.post("/admin/hero-banners", params={"title": "Back to school"},
+                          files=upload(png("blue")), headers=admin_headers)
+    assert created.status_code == 200, created.text
+    banner = created.json()
+
+    updated = client.put(f"/admin/admin/hero-banners/{banner['id']}", data={"title": "Term two"},
+                         files={"image": ("new.png", png("green"), "image/png")})
+
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["title"] == "Term two"
+    assert updated.json()["image"] != banner["image"]
+    with SessionLocal() as db:
+        refs = dict(db.execute(select(StoredImage.path, StoredImage.ref_count)
+                               .where(StoredImage.path.in_([banner["image"], updated.json()["image"]]))).all())
+    assert refs == {banner["image"]: 0, updated.json()["image"]: 1}
+
+
+def bilevel_png(width: int, height: int) -> bytes:
+    """A blank 1-bit image: a few kilobytes on disk, width x height pixels decoded"""
+    buffer = io.BytesIO()
+    Image.new("1", (width, height)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("scale", [1.2, 2.5])  # Pillow warns past the limit, raises past twice it
+def test_decompression_bomb_is_rejected_before_decoding(tmp_path, scale):
+    side = int((settings.MAX_IMAGE_PIXELS * scale) ** 0.5)
+    source = tmp_path / "bomb.png"
+    source.write_bytes(bilevel_png(side, side))
+
+    with pytest.raises(ValueError, match="too large"):
+        images.render_variants(str(source), str(tmp_path / "variants"), "/static/images/variants")
+    assert not (tmp_path / "variants").exists() or not any((tmp_path / "variants").iterdir())
+
+
+def test_oversized_upload_is_a_400(client, admin_headers):
+    side = int((settings.MAX_IMAGE_PIXELS * 2.5) ** 0.5)
+    response = client.post("/admin/upload-image", files=upload(bilevel_png(side, side)), headers=admin_headers)
+    assert response.status_code == 400
@@ -0,0 +1,60 @@
+"""
+get_current_user: inactive users are refused, and a change to a User made
+in this process clears the cached user, whether through the ORM or an
+ORM-enabled update()
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from database import SessionLocal
+from models import User, UserRole
+from routers import auth
+
+
+@pytest.fixture
+def client(app):
+    # not the shared client: the cookie its admin login set would be used
+    # ahead of these tests' Authorization headers
+    return TestClient(app)
+
+
+def add_admin(email: str) -> dict:
+    """Auth headers for a new active admin"""
+    with SessionLocal() as db:
+        db.add(User(email=email, full_name="Test Admin", hashed_password="unused", role=UserRole.admin))
+        db.commit()
+    return {"Authorization": f"Bearer {auth.create_access_token({'sub': email})}"}
+
+
+def test_admin_deactivated_through_the_orm_loses_access(client):
+    headers = add_admin("deactivated-orm@example.com")
+    assert client.get("/admin/cache-stats", headers=headers).status_code == 200  # now cached
+
+    with SessionLocal() as db:
+        db.query(User).filter(User.email == "deactivated-orm@example.com").one().is_active = False
+        db.commit()
+
+    assert client.get("/admin/cache-stats", headers=headers).status_code == 401
+
+
+def test_admin_deactivated_by_an_update_statement_loses_access(client):
+    headers = add_admin("deactivated-update@example.com")
+    assert client.get("/admin/cache-stats", headers=headers).status_code == 200
+
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.email == "deactivated-update@example.com").values(is_active=False))
+        db.commit()
+
+    assert client.get("/admin/cache-stats", headers=headers).status_code == 401
+
+
+def test_demoted_admin_is_refused(client):
+    headers = add_admin("demoted@example.com")
+    assert client.get("/admin/cache-stats", headers=headers).status_code == 200
+
+    with SessionLocal() as db:
+        db.execute(update(User).where(User.email == "demoted@example.com").values(role=UserRole.customer))
+        db.commit()
+
+    assert client.get("/admin/cache-stats", headers=headers).status_code == 403
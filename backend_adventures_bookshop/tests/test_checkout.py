@@ -0,0 +1,91 @@
+"""
+POST /orders/ under concurrent checkouts: stock is never oversold, a cart is
+reserved all or nothing, and every request gets a real answer (200 sold or
+400 out of stock), never a pool timeout or lock error
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from benchmarks import common
+from conftest import CUSTOMER
+from database import SessionLocal
+from models import Order, OrderItem, Product
+
+
+def last_order_id():
+    with SessionLocal() as db:
+        return db.execute(select(func.coalesce(func.max(Order.id), 0))).scalar()
+
+
+def sold_since(order_id, product_id):
+    with SessionLocal() as db:
+        return db.execute(
+            select(func.coalesce(func.sum(OrderItem.quantity), 0))
+            .where(OrderItem.order_id > order_id, OrderItem.product_id == product_id)
+        ).scalar()
+
+
+def stock_of(product_id):
+    with SessionLocal() as db:
+        return db.execute(select(Product.stock_quantity).where(Product.id == product_id)).scalar()
+
+
+def checkout_all_at_once(app, buyers: int, items):
+    """Send `buyers` identical checkouts at the same time; returns {status: count}"""
+    body = {**CUSTOMER, "items": items}
+    _, _, statuses = asyncio.run(common.drive(app, "POST", "/orders/", buyers, buyers, json=body))
+    return statuses
+
+
+def test_flash_sale_sells_exactly_the_stock(app, catalog, set_stock):
+    hot = catalog[0]
+    set_stock({hot: 25})
+    before = last_order_id()
+
+    statuses = checkout_all_at_once(app, 100, [{"product_id": hot, "quantity": 1}])
+
+    assert set(statuses) <= {200, 400}, statuses
+    assert statuses.get(200) == 25
+    assert sold_since(before, hot) == 25
+    assert stock_of(hot) == 0
+
+
+def test_cart_is_reserved_all_or_nothing(app, catalog, set_stock):
+    plenty, scarce = catalog[1], catalog[2]
+    set_stock({plenty: 100, scarce: 10})
+    before = last_order_id()
+
+    items = [{"product_id": plenty, "quantity": 1}, {"product_id": scarce, "quantity": 2}]
+    statuses = checkout_all_at_once(app, 40, items)
+
+    assert set(statuses) <= {200, 400}, statuses
+    assert statuses.get(200) == 5
+    assert sold_since(before, scarce) == 10 and stock_of(scarce) == 0
+    # the orders that could not get the scarce item took none of the other
+    assert sold_since(before, plenty) == 5 and stock_of(plenty) == 95
+
+
+@pytest.mark.postgres
+def test_overlapping_carts_in_opposite_order_do_not_deadlock(app, catalog, set_stock):
+    products = catalog[3:6]
+    set_stock({product_id: 30 for product_id in products})
+    before = last_order_id()
+
+    async def both_ways():
+        return await asyncio.gather(*(
+            common.drive(app, "POST", "/orders/", 30, 30,
+                         json={**CUSTOMER, "items": [{"product_id": product_id, "quantity": 1} for product_id in cart]})
+            for cart in (products, products[::-1])
+        ))
+
+    statuses = {}
+    for _, _, counts in asyncio.run(both_ways()):
+        for status, count in counts.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    assert set(statuses) <= {200, 400}, statuses  # a deadlock victim would be a 500
+    assert statuses.get(200) == 30
+    for product_id in products:
+        assert sold_since(before, product_id) == 30 and stock_of(product_id) == 0
@@ -0,0 +1,173 @@
+"""
+The admin exports: what they contain (one CSV line per order item, NDJSON
+orders whole across partitions, the created_at bounds, a products export
+that imports back), and that they stream: peak memory while reading one to
+the end stays flat as the table grows ten times, and far below the size of
+the body. Measured on SQLite; the Postgres path (a named server-side
+cursor) is not exercised here.
+"""
+import asyncio
+import csv
+import io
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+from sqlalchemy import delete, func, select
+
+from benchmarks.bench_exports import grow_to, read_export
+from config import settings
+from conftest import CUSTOMER
+from database import SessionLocal
+from models import Category, Order, OrderItem, Product
+from services import exports
+
+
+def add_order(created_at: datetime, product_ids, quantity: int = 2) -> int:
+    """An order at created_at with one line per product; returns its id"""
+    with SessionLocal() as db:
+        prices = dict(db.execute(select(Product.id, Product.price).where(Product.id.in_(product_ids))).all())
+        order = Order(**{key: CUSTOMER[key] for key in ("full_name", "email", "phone", "address", "city")},
+                      order_number=f"X{created_at:%Y%m%d%H%M%S}", created_at=created_at,
+                      total_amount=sum(prices[product_id] * quantity for product_id in product_ids))
+        db.add(order)
+        db.flush()
+        db.add_all(OrderItem(order_id=order.id, product_id=product_id, quantity=quantity, price=prices[product_id])
+                   for product_id in product_ids)
+        db.commit()
+        return order.id
+
+
+def export(client, admin_headers, path: str, **params) -> str:
+    response = client.get(path, params=params, headers=admin_headers)
+    assert response.status_code == 200
+    return response.text
+
+
+def window(start: datetime, hours: int = 1) -> dict:
+    return {"created_from": start.isoformat(), "created_to": (start + timedelta(hours=hours)).isoformat()}
+
+
+def test_orders_csv_has_one_line_per_item(client, admin_headers, catalog):
+    start = datetime(2001, 1, 1, tzinfo=timezone.utc)
+    three = add_order(start, catalog[:3])
+    one = add_order(start + timedelta(minutes=1), catalog[3:4])
+
+    rows = list(csv.reader(io.StringIO(export(client, admin_headers, "/admin/orders/export", **window(start)))))
+
+    assert rows[0] == exports.ORDER_FIELDS + exports.ITEM_FIELDS
+    lines = [dict(zip(rows[0], row)) for row in rows[1:]]
+    assert [(int(line["order_id"]), int(line["product_id"])) for line in lines] == (
+        [(three, product_id) for product_id in catalog[:3]] + [(one, catalog[3])]
+    )
+    for line in lines:
+        assert float(line["line_total"]) == int(line["quantity"]) * float(line["unit_price"])
+
+
+def test_orders_ndjson_keeps_each_order_whole_across_partitions(client, admin_headers, catalog, monkeypatch):
+    # 3 item rows per order in partitions of 2: every order straddles a boundary
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    start = datetime(2001, 1, 2, tzinfo=timezone.utc)
+    added = [add_order(start + timedelta(minutes=n), catalog[n:n + 3]) for n in range(5)]
+
+    orders = [orjson.loads(line) for line in
+              export(client, admin_headers, "/admin/orders/export", format="ndjson", **window(start)).splitlines()]
+
+    assert [order["order_id"] for order in orders] == added
+    for n, order in enumerate(orders):
+        assert [item["product_id"] for item in order["items"]] == catalog[n:n + 3]
+
+
+def test_created_from_is_inclusive_and_created_to_exclusive(client, admin_headers, catalog):
+    start = datetime(2001, 1, 3, tzinfo=timezone.utc)
+    before, first, last, after = (add_order(start + timedelta(hours=n), catalog[:1]) for n in range(-1, 3))
+    # the same bounds given in East Africa Time
+    eat = timezone(timedelta(hours=3))
+    params = {"format": "ndjson", "created_from": start.astimezone(eat).isoformat(),
+              "created_to": (start + timedelta(hours=2)).astimezone(eat).isoformat()}
+
+    orders = [orjson.loads(line) for line in export(client, admin_headers, "/admin/orders/export", **params).splitlines()]
+
+    assert [order["order_id"] for order in orders] == [first, last]
+
+
+def test_products_export_imports_back(client, admin_headers, catalog):
+    start = datetime(2001, 1, 4, tzinfo=timezone.utc)
+    with SessionLocal() as db:
+        category = db.execute(select(Category).order_by(Category.id)).scalars().first()
+        db.add_all(
+            Product(name=f"Round Trip {n}", slug=f"round-trip-{n}", description=f"Exported, edited, imported {n}",
+                    price=100.0 + n, original_price=150.0 if n else None, stock_quantity=n, category=category,
+                    is_featured=bool(n % 2), created_at=start + timedelta(minutes=n))
+            for n in range(3)
+        )
+        db.commit()
+        category_id, category_slug = category.id, category.slug
+
+    exported = list(csv.DictReader(io.StringIO(export(client, admin_headers, "/admin/products/export", **window(start)))))
+    assert [row["slug"] for row in exported] == [f"round-trip-{n}" for n in range(3)]
+    assert {row["category"] for row in exported} == {category_slug}
+
+    # edit the prices and import it back, without the id and created_at columns
+    edited = io.StringIO()
+    writer = csv.DictWriter(edited, [field for field in exports.PRODUCT_FIELDS if field not in ("id", "created_at")],
+                            extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows({**row, "price": float(row["price"]) * 2} for row in exported)
+    response = client.post("/admin/products/import", headers=admin_headers,
+                           files={"file": ("products.csv", edited.getvalue().encode(), "text/csv")})
+
+    assert response.status_code == 200
+    assert (response.json()["inserted"], response.json()["updated"], response.json()["errors"]) == (0, 3, [])
+    with SessionLocal() as db:
+        imported = db.execute(
+            select(Product).where(Product.slug.like("round-trip-%")).order_by(Product.slug)
+        ).scalars().all()
+        assert [(p.price, p.original_price, p.stock_quantity, p.category_id, p.is_featured) for p in imported] == [
+            (200.0 + 2 * n, 150.0 if n else None, n, category_id, bool(n % 2)) for n in range(3)
+        ]
+
+
+@pytest.fixture
+def removes_added_orders(app):
+    """Deletes the orders a test adds, so the tests after it see the database they would have"""
+    with SessionLocal() as db:
+        last = db.execute(select(func.coalesce(func.max(Order.id), 0))).scalar()
+    yield
+    with SessionLocal() as db:
+        db.execute(delete(OrderItem).where(OrderItem.order_id > last))
+        db.execute(delete(Order).where(Order.id > last))
+        db.commit()
+
+
+def peak_while_reading(app, path: str, params: dict, token: str):
+    """(response as read_export reports it, tracemalloc peak above the baseline)"""
+    asyncio.run(read_export(app, path, params, token))  # warm: imports, caches, the auth lookup
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        sent = asyncio.run(read_export(app, path, params, token))
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return sent, peak
+
+
+def test_orders_export_memory_stays_flat(app, admin_headers, catalog, monkeypatch, removes_added_orders):
+    # partitions small next to the body, so holding the body would show
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 200)
+    token = admin_headers["Authorization"].removeprefix("Bearer ")
+    measured = {}
+    for orders in (1_000, 10_000):
+        grow_to(orders, 0)
+        for fmt in ("csv", "ndjson"):
+            measured[fmt, orders] = peak_while_reading(app, "/admin/orders/export", {"format": fmt}, token)
+
+    for fmt in ("csv", "ndjson"):
+        (small, small_peak), (large, large_peak) = measured[fmt, 1_000], measured[fmt, 10_000]
+        assert small["status"] == large["status"] == 200
+        assert large["lines"] > 5 * small["lines"]
+        assert large_peak < 1.5 * small_peak, (fmt, small_peak, large_peak)
+        assert large_peak < large["bytes"] / 4, (fmt, large_peak, large["bytes"])
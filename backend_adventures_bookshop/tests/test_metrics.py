@@ -0,0 +1,18 @@
+"""GET /metrics is only served with METRICS_TOKEN set, to scrapes that send it"""
+from config import settings
+
+
+def test_metrics_not_served_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_need_the_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    client.get("/products/")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert 'route="/products/"' in response.text
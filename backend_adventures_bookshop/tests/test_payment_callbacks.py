@@ -0,0 +1,168 @@
+"""
+services/payment_callbacks: POST /payments/mpesa/callback stores each
+callback once, and CallbackConsumer applies it to its payment and order only
+while the payment is pending; CallbackWriter's task doesn't carry the first
+request's context
+"""
+import asyncio
+
+import orjson
+from sqlalchemy import select
+
+from config import settings
+from conftest import add_payment
+from database import AsyncSessionLocal, SessionLocal
+from models import Order, OrderStatus, Payment, PaymentCallback, PaymentStatus
+from services import payment_callbacks
+from utils import metrics, query_budget
+
+
+def callback_body(checkout_request_id: str, result_code: int = 1032, receipt: str = None) -> bytes:
+    callback = {
+        "MerchantRequestID": "m-1",
+        "CheckoutRequestID": checkout_request_id,
+        "ResultCode": result_code,
+        "ResultDesc": "Request cancelled by user" if result_code else "The service request is processed successfully.",
+    }
+    if receipt:
+        callback["CallbackMetadata"] = {"Item": [
+            {"Name": "Amount", "Value": 100.0},
+            {"Name": "MpesaReceiptNumber", "Value": receipt},
+        ]}
+    return orjson.dumps({"Body": {"stkCallback": callback}})
+
+
+def post_callback(client, checkout_request_id: str, **result):
+    response = client.post("/payments/mpesa/callback", content=callback_body(checkout_request_id, **result))
+    assert response.status_code == 200
+
+
+def apply_callbacks():
+    asyncio.run(payment_callbacks.CallbackConsumer().drain())
+
+
+def state(transaction_id: str):
+    """(payment status, order payment status, order status)"""
+    with SessionLocal() as db:
+        return tuple(db.execute(
+            select(Payment.status, Order.payment_status, Order.status)
+            .join(Order, Order.id == Payment.order_id)
+            .where(Payment.transaction_id == transaction_id)
+        ).one())
+
+
+def stored_callbacks(checkout_request_id: str):
+    with SessionLocal() as db:
+        return db.execute(
+            select(PaymentCallback.processed_at).where(PaymentCallback.checkout_request_id == checkout_request_id)
+        ).scalars().all()
+
+
+def test_successful_callback_completes_the_payment_and_confirms_the_order(client):
+    add_payment("ws_CO_cb_paid")
+    post_callback(client, "ws_CO_cb_paid", result_code=0, receipt="RCB0000001")
+
+    apply_callbacks()
+
+    assert state("ws_CO_cb_paid") == (PaymentStatus.completed, PaymentStatus.completed, OrderStatus.confirmed)
+    with SessionLocal() as db:
+        receipt = db.execute(select(Payment.provider_reference).where(Payment.transaction_id == "ws_CO_cb_paid")).scalar()
+    assert receipt == "RCB0000001"
+
+
+def test_failed_callback_fails_the_payment_and_keeps_the_order_pending(client):
+    add_payment("ws_CO_cb_failed")
+    post_callback(client, "ws_CO_cb_failed")
+
+    apply_callbacks()
+
+    assert state("ws_CO_cb_failed") == (PaymentStatus.failed, PaymentStatus.failed, OrderStatus.pending)
+
+
+def test_replayed_callback_is_stored_once_and_applied_once(client):
+    add_payment("ws_CO_cb_replay")
+    post_callback(client, "ws_CO_cb_replay", result_code=0, receipt="RCB0000002")
+    apply_callbacks()
+    # the provider retries; a replay arriving after the first was applied is acknowledged and dropped
+    post_callback(client, "ws_CO_cb_replay", result_code=0, receipt="RCB0000002")
+    post_callback(client, "ws_CO_cb_replay")
+
+    apply_callbacks()
+
+    processed = stored_callbacks("ws_CO_cb_replay")
+    assert len(processed) == 1 and processed[0] is not None
+    assert state("ws_CO_cb_replay") == (PaymentStatus.completed, PaymentStatus.completed, OrderStatus.confirmed)
+
+
+def test_callback_before_its_payment_is_applied_once_the_payment_exists(client, monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENT_CALLBACK_RETRY_SECONDS", 0)
+    post_callback(client, "ws_CO_cb_early", result_code=0, receipt="RCB0000003")
+    consumer = payment_callbacks.CallbackConsumer()
+
+    asyncio.run(consumer.process_batch())
+    assert stored_callbacks("ws_CO_cb_early") == [None]  # deferred, not dropped
+
+    add_payment("ws_CO_cb_early")  # the STK push response is recorded
+    asyncio.run(consumer.process_batch())
+
+    assert stored_callbacks("ws_CO_cb_early") != [None]
+    assert state("ws_CO_cb_early") == (PaymentStatus.completed, PaymentStatus.completed, OrderStatus.confirmed)
+
+
+def test_late_failed_attempt_leaves_a_paid_order_paid(client):
+    order_id = add_payment("ws_CO_cb_first_try")
+    add_payment("ws_CO_cb_second_try", order_id=order_id)
+    post_callback(client, "ws_CO_cb_second_try", result_code=0, receipt="RCB0000004")
+    apply_callbacks()
+
+    post_callback(client, "ws_CO_cb_first_try")  # the abandoned first push times out afterwards
+    apply_callbacks()
+
+    assert state("ws_CO_cb_first_try") == (PaymentStatus.failed, PaymentStatus.completed, OrderStatus.confirmed)
+
+
+def test_settle_leaves_orders_of_already_settled_payments_alone(client):
+    # a callback fails the payment while reconciliation, holding an older
+    # status from the provider, is about to settle it as paid
+    order_id = add_payment("ws_CO_cb_raced")
+    post_callback(client, "ws_CO_cb_raced")
+    apply_callbacks()
+    with SessionLocal() as db:
+        payment_id = db.execute(select(Payment.id).where(Payment.transaction_id == "ws_CO_cb_raced")).scalar()
+
+    async def reconcile_with_stale_result():
+        async with AsyncSessionLocal() as db:
+            await payment_callbacks.settle(db, [(payment_id, order_id, True, "RCB0000005")])
+            await db.commit()
+
+    asyncio.run(reconcile_with_stale_result())
+
+    assert state("ws_CO_cb_raced") == (PaymentStatus.failed, PaymentStatus.failed, OrderStatus.pending)
+
+
+def test_writer_task_starts_with_an_empty_context(app):
+    seen = []
+
+    class Writer(payment_callbacks.CallbackWriter):
+        async def _run(self):
+            seen.append((metrics._request_db.get(), query_budget._request_log.get()))
+            await super()._run()
+
+    async def request():
+        writer = Writer()
+        # what the metrics and query budget middlewares set for a request
+        metrics._request_db.set("request's stats")
+        query_budget._request_log.set(["request's statements"])
+        try:
+            await writer.write(payment_callbacks.parse(callback_body("ws_CO_context")))
+        finally:
+            await writer.close()
+
+    asyncio.run(request())
+
+    assert seen == [(None, None)]
+    with SessionLocal() as db:
+        stored = db.execute(
+            select(PaymentCallback.result_code).where(PaymentCallback.checkout_request_id == "ws_CO_context")
+        ).scalar()
+    assert stored == 1032
@@ -0,0 +1,54 @@
+"""
+GET /payments/verify/{transaction_id} only reads the stored status;
+POST /admin/payments/reconcile settles pending payments a bounded slice at a time
+"""
+from config import settings
+from conftest import add_payment
+from services import mpesa
+
+
+def test_verify_does_not_query_mpesa_or_settle(client, monkeypatch):
+    def no_provider_calls():
+        raise AssertionError("verify must not call M-Pesa")
+    monkeypatch.setattr(mpesa, "get_client", no_provider_calls)
+    add_payment("ws_CO_verify_pending")
+
+    response = client.get("/payments/verify/ws_CO_verify_pending")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "pending"
+
+
+def test_verify_unknown_transaction(client):
+    assert client.get("/payments/verify/ws_CO_missing").status_code == 404
+
+
+class PaidClient:
+    """Stands in for services/mpesa's client: every STK query reports a completed payment"""
+
+    def __init__(self):
+        self.queried = []
+
+    async def stk_query(self, checkout_request_id):
+        self.queried.append(checkout_request_id)
+        return {"ResultCode": "0", "ResultDesc": "The service request is processed successfully."}
+
+
+def test_reconcile_request_stops_after_a_bounded_slice(client, admin_headers, monkeypatch):
+    provider = PaidClient()
+    monkeypatch.setattr(mpesa, "get_client", lambda: provider)
+    monkeypatch.setattr(settings, "RECONCILE_MIN_AGE_SECONDS", 0)
+    monkeypatch.setattr(settings, "RECONCILE_PAGE_SIZE", 1)
+    for n in range(3):
+        add_payment(f"ws_CO_reconcile_{n}")
+
+    over = client.post("/admin/payments/reconcile", params={"max_pages": settings.RECONCILE_REQUEST_MAX_PAGES + 1},
+                       headers=admin_headers)
+    assert over.status_code == 422
+
+    first = client.post("/admin/payments/reconcile", params={"restart": True, "max_pages": 2}, headers=admin_headers).json()
+    assert (first["pages"], first["finished"]) == (2, False)
+    rest = client.post("/admin/payments/reconcile", headers=admin_headers).json()
+    assert rest["finished"] and rest["resumed_from"] is not None
+    assert {f"ws_CO_reconcile_{n}" for n in range(3)} <= set(provider.queried)
+    assert client.get("/payments/verify/ws_CO_reconcile_2").json()["status"] == "completed"
@@ -0,0 +1,100 @@
+"""POST /admin/products/import: upserts by slug, the per-row report, dry runs and unreadable files"""
+import pytest
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import Category, Product
+
+
+@pytest.fixture
+def import_file(client, admin_headers):
+    def import_file(content, name="products.csv", **params):
+        data = content.encode() if isinstance(content, str) else content
+        return client.post("/admin/products/import", params=params, headers=admin_headers,
+                           files={"file": (name, data, "application/octet-stream")})
+    return import_file
+
+
+def product(slug):
+    with SessionLocal() as db:
+        return db.execute(select(Product).where(Product.slug == slug)).scalar_one_or_none()
+
+
+def category_id(slug):
+    with SessionLocal() as db:
+        return db.execute(select(Category.id).where(Category.slug == slug)).scalar_one()
+
+
+def test_new_slugs_insert_and_known_slugs_update(import_file):
+    first = import_file("slug,name,price\nimp-a,Atlas,100\nimp-b,Biro,20\n").json()
+    assert (first["inserted"], first["updated"], first["failed"]) == (2, 0, 0)
+
+    second = import_file("slug,name,price\nimp-b,Blue biro,25\nimp-c,Crayons,50\n").json()
+    assert (second["inserted"], second["updated"]) == (1, 1)
+    assert (product("imp-b").name, product("imp-b").price) == ("Blue biro", 25)
+
+
+def test_partial_columns_keep_the_rest(import_file):
+    import_file("slug,name,price,description,stock_quantity,category\n"
+                "imp-keep,Workbook,300,Grade 4 maths,12,books\n")
+
+    import_file('{"slug": "imp-keep", "name": "Workbook", "price": 350}\n', name="products.ndjson")
+
+    kept = product("imp-keep")
+    assert kept.price == 350
+    assert (kept.description, kept.stock_quantity, kept.category_id) == ("Grade 4 maths", 12, category_id("books"))
+
+
+def test_repeated_slug_in_a_batch_keeps_the_last_row(import_file):
+    report = import_file("slug,name,price\nimp-dup,First,1\nimp-dup,Second,2\n").json()
+
+    assert (report["rows"], report["duplicates"], report["inserted"]) == (2, 1, 1)
+    assert (product("imp-dup").name, product("imp-dup").price) == ("Second", 2)
+
+
+def test_bad_rows_are_reported_by_line_and_the_rest_imported(import_file):
+    report = import_file(
+        "slug,name,price,category\n"
+        "imp-ok,Ruler,40,stationery\n"
+        "imp-cat,Globe,900,no-such-category\n"
+        "imp-price,Eraser,-5,\n"
+        "imp-short,,10\n"
+    ).json()
+
+    assert (report["rows"], report["inserted"], report["failed"]) == (4, 1, 3)
+    errors = {error["line"]: error for error in report["errors"]}
+    assert set(errors) == {3, 4, 5}
+    assert errors[3]["slug"] == "imp-cat" and "no category with slug 'no-such-category'" in errors[3]["errors"][0]
+    assert errors[4]["errors"][0].startswith("price:")
+    assert errors[5]["errors"][0].startswith("name:")
+    assert product("imp-ok").category_id == category_id("stationery")
+    assert product("imp-cat") is None and product("imp-price") is None
+
+
+def test_dry_run_writes_nothing(import_file):
+    report = import_file("slug,name,price\nimp-dry,Dry run,10\n", dry_run=True).json()
+
+    assert report["dry_run"] and report["inserted"] == 1
+    assert product("imp-dry") is None
+
+
+def test_bad_header_is_a_400(import_file):
+    response = import_file("slug,title,price\nimp-x,X,1\n")
+
+    assert response.status_code == 400
+    assert "missing columns: name" in response.json()["detail"]
+    assert "unknown columns: title" in response.json()["detail"]
+
+
+def test_unreadable_line_stops_the_import_there(import_file):
+    report = import_file(b"slug,name,price\nimp-before,Kept,1\n\xff\xff,x,1\nimp-after,Lost,1\n").json()
+
+    assert report["inserted"] == 1 and report["stopped"].startswith("could not read past line 2")
+    assert product("imp-before") is not None and product("imp-after") is None
+
+
+def test_file_unreadable_from_the_start_is_a_400(import_file):
+    response = import_file(b"\xff\xfeslug,name,price\n")
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Unreadable file")
@@ -0,0 +1,57 @@
+"""
+Statement counts of the main routes, against their budgets in
+utils/query_budget.ROUTE_BUDGETS (the plugin also checks every request any
+test makes; these pin down the cases that matter: carts of any size, every
+page of a list, cold caches)
+"""
+from conftest import CUSTOMER
+from schemas import MAX_ORDER_LINES
+from utils.query_budget import ROUTE_BUDGETS
+
+
+def test_checkout_statements_do_not_grow_with_the_cart(client, catalog, set_stock, max_queries):
+    set_stock({product_id: 100 for product_id in catalog})
+    counts = []
+    for lines in (1, 5, len(catalog)):
+        body = {**CUSTOMER, "items": [{"product_id": product_id, "quantity": 1} for product_id in catalog[:lines]]}
+        with max_queries(ROUTE_BUDGETS[("POST", "/orders/")]) as log:
+            response = client.post("/orders/", json=body)
+        assert response.status_code == 200, response.text
+        assert len(response.json()["order_items"]) == lines
+        counts.append(len(log))
+    assert len(set(counts)) == 1, counts
+
+
+def test_checkout_rejects_carts_over_the_line_limit(client, catalog):
+    items = [{"product_id": catalog[0], "quantity": 1}] * (MAX_ORDER_LINES + 1)
+    assert client.post("/orders/", json={**CUSTOMER, "items": items}).status_code == 422
+
+
+def test_every_catalog_page_is_within_budget(client, catalog, max_queries):
+    cursor, seen = None, 0
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        with max_queries(ROUTE_BUDGETS[("GET", "/products/")]):
+            page = client.get("/products/", params=params).json()
+        seen += len(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen >= len(catalog)
+
+
+def test_order_pages_are_within_budget(client, admin_headers, catalog, set_stock, max_queries):
+    set_stock({catalog[0]: 10})
+    body = {**CUSTOMER, "items": [{"product_id": catalog[0], "quantity": 1}]}
+    order_id = client.post("/orders/", json=body).json()["id"]
+
+    for method, path, url, headers in [
+        ("GET", "/orders/{order_id}", f"/orders/{order_id}", {}),
+        ("GET", "/orders/", "/orders/", {}),
+        ("GET", "/admin/orders", "/admin/orders", admin_headers),
+        ("GET", "/admin/dashboard", "/admin/dashboard", admin_headers),
+        ("GET", "/admin/products", "/admin/products", admin_headers),
+    ]:
+        with max_queries(ROUTE_BUDGETS[(method, path)]):
+            response = client.request(method, url, headers=headers)
+        assert response.status_code == 200, (url, response.text)
@@ -0,0 +1,38 @@
+"""utils/worker.PollingWorker: a failed batch is logged and the loop carries on"""
+import asyncio
+import logging
+
+import pytest
+
+from utils.worker import PollingWorker
+
+
+class FlakyWorker(PollingWorker):
+    name = "flaky"
+
+    def __init__(self):
+        super().__init__(batch_size=10, poll_seconds=0)
+        self.calls = 0
+
+    async def process_batch(self) -> int:
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("database is locked")
+        self.stop()
+        return 0
+
+
+def test_process_batch_is_abstract():
+    with pytest.raises(TypeError):
+        PollingWorker(batch_size=10, poll_seconds=1)
+
+
+def test_failed_batch_is_logged_and_retried(caplog):
+    worker = FlakyWorker()
+    with caplog.at_level(logging.ERROR, logger="utils.worker"):
+        asyncio.run(worker.run())
+
+    assert worker.calls == 2
+    [record] = caplog.records
+    assert record.getMessage() == "flaky batch failed"
+    assert record.exc_info[0] is RuntimeError
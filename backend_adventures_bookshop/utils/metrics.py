@@ -0,0 +1,214 @@
+# utils/metrics.py
+"""
+Per-route request metrics and database query counters, exported at /metrics
+in the Prometheus text format
+MetricsMiddleware (a plain ASGI middleware, much cheaper than
+BaseHTTPMiddleware) times every request and labels it with its route
+template, e.g. /products/{product_id}, so the number of series stays bounded.
+install() hooks an engine's cursor events: statements issued while a request
+is being handled, its background tasks included, are counted against that
+request's route (a ContextVar, which follows sync routes into the
+threadpool and async sessions into SQLAlchemy's greenlets); the rest, e.g.
+the outbox and callback workers, are counted as background.
+
+Like the caches, the numbers are per worker process; Prometheus adds them up.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED = "<unmatched>"
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class DBUsage:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+class RouteStats:
+    __slots__ = ("statuses", "latency", "queries", "db_seconds")
+
+    def __init__(self):
+        self.statuses = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+
+
+_request_db = ContextVar("request_db", default=None)
+
+
+class Registry:
+    def __init__(self):
+        self.routes = {}  # (method, route) -> RouteStats
+        self.background = DBUsage()
+        self._lock = threading.Lock()
+
+    def observe_request(self, method, route, status, seconds, db: DBUsage):
+        # called on the event loop only, so the per-route stats need no lock
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.latency.observe(seconds)
+        stats.queries.observe(db.queries)
+        stats.db_seconds += db.seconds
+
+    def observe_query(self, seconds):
+        db = _request_db.get()
+        if db is not None:
+            db.queries += 1
+            db.seconds += seconds
+        else:
+            with self._lock:
+                self.background.queries += 1
+                self.background.seconds += seconds
+
+    def render(self) -> str:
+        routes = sorted(self.routes.items())
+        lines = [
+            "# HELP http_requests_total Requests handled, by route and status code",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+        _render_histogram(
+            lines, "http_request_duration_seconds", "Time to the last byte of the response",
+            ((labels, stats.latency) for labels, stats in routes),
+        )
+        _render_histogram(
+            lines, "http_request_db_queries", "SQL statements issued per request",
+            ((labels, stats.queries) for labels, stats in routes),
+        )
+        lines += [
+            "# HELP http_request_db_seconds_total Time spent executing SQL statements, by route",
+            "# TYPE http_request_db_seconds_total counter",
+        ]
+        for (method, route), stats in routes:
+            lines.append(f'http_request_db_seconds_total{{method="{method}",route="{_escape(route)}"}} {stats.db_seconds!r}')
+
+        request_queries = sum(stats.queries.sum for _, stats in routes)
+        request_seconds = sum(stats.db_seconds for _, stats in routes)
+        with self._lock:
+            background = (self.background.queries, self.background.seconds)
+        lines += [
+            "# HELP db_queries_total SQL statements, issued by requests or in the background",
+            "# TYPE db_queries_total counter",
+            f'db_queries_total{{source="request"}} {int(request_queries)}',
+            f'db_queries_total{{source="background"}} {background[0]}',
+            "# HELP db_query_seconds_total Time spent executing SQL statements",
+            "# TYPE db_query_seconds_total counter",
+            f'db_query_seconds_total{{source="request"}} {request_seconds!r}',
+            f'db_query_seconds_total{{source="background"}} {background[1]!r}',
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_histogram(lines, name, help_text, series):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), histogram in series:
+        labels = f'method="{method}",route="{_escape(route)}"'
+        cumulative = 0
+        for bound, count in zip(histogram.bounds, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        cumulative += histogram.counts[-1]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {histogram.sum!r}")
+        lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+
+registry = Registry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is not None:
+        registry.observe_query(time.perf_counter() - started)
+
+
+def install(engine):
+    """Count an engine's statements (for an AsyncEngine, pass its sync_engine)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def uninstall(engine):
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path_format
+    if "endpoint" in scope:  # a mounted app, e.g. /static
+        return scope.get("root_path") or "/"
+    return UNMATCHED
+
+
+class MetricsMiddleware:
+    def __init__(self, app, registry: Registry = registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        finished = None
+
+        async def send_wrapper(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = time.perf_counter()
+            await send(message)
+
+        db = DBUsage()
+        token = _request_db.set(db)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_db.reset(token)
+            self.registry.observe_request(
+                scope["method"], route_label(scope), status, (finished or time.perf_counter()) - started, db,
+            )
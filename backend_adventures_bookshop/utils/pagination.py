@@ -0,0 +1,58 @@
+# utils/pagination.py
+"""
+Keyset (cursor) pagination on (created_at, id), newest first
+The cursor is an opaque url-safe token encoding the last row's sort key,
+so each page is an index range scan instead of an OFFSET over skipped rows.
+Works with both legacy Query objects and 2.0 select() statements.
+"""
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_params(
+    cursor: str = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"),
+):
+    """Dependency collecting the cursor/limit query parameters"""
+    return {"cursor": cursor, "limit": limit}
+
+
+def paginate(query, model, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE):
+    """Order by (created_at, id) desc, seek past the cursor and fetch one extra row"""
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < (created_at, row_id))
+    return query.limit(limit + 1)
+
+
+def make_page(rows, limit: int):
+    """Trim the look-ahead row and build the {items, next_cursor} envelope"""
+    rows = list(rows)
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,36 @@
+# utils/pytest_query_budget.py
+"""
+pytest plugin for the query checks in utils/query_budget.py
+Load it from conftest.py with `pytest_plugins = ["utils.pytest_query_budget"]`
+(or `pytest -p utils.pytest_query_budget`). For the whole session every
+request is checked strictly: one that goes over its route's budget in
+ROUTE_BUDGETS, or issues a likely N+1, raises QueryBudgetExceeded out of the
+TestClient call. The max_queries fixture puts a budget on part of a test:
+
+    def test_product_page(client, max_queries):
+        with max_queries(1):
+            client.get(f"/products/{product_id}")
+"""
+import pytest
+
+from config import settings
+from utils import query_budget
+
+
+@pytest.fixture(scope="session", autouse=True)
+def strict_query_budgets():
+    import main
+
+    strict = settings.QUERY_BUDGET_STRICT
+    settings.QUERY_BUDGET_STRICT = True
+    query_budget.enable(main.app)
+    yield
+    settings.QUERY_BUDGET_STRICT = strict
+
+
+@pytest.fixture
+def max_queries(request):
+    """max_queries(n) -> context manager; counts statements issued by requests only"""
+    def budget(limit: int, requests_only: bool = True):
+        return query_budget.query_budget(limit, requests_only=requests_only, label=request.node.nodeid)
+    return budget
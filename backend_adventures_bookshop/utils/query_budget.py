@@ -0,0 +1,251 @@
+# utils/query_budget.py
+"""
+Dev/test instrumentation for SQL statements: N+1 detection and query budgets
+With QUERY_DEBUG on, main.py calls enable(): both engines are hooked and
+QueryDebugMiddleware records every statement a request issues, normalized
+(literals and IN lists collapsed) and tagged with the line of app code that
+issued it. After the response:
+- a SELECT repeated N_PLUS_ONE_THRESHOLD or more times is reported as a
+  likely N+1, typically a lazy relationship loaded inside a loop
+- so is a route in ROUTE_BUDGETS that issued more statements than its budget
+
+Reports go to the "query_budget" logger, or with QUERY_BUDGET_STRICT are
+raised as QueryBudgetExceeded, which fails the test that made the request
+(see the pytest plugin in utils/pytest_query_budget.py).
+`python -m benchmarks.query_budgets` checks every budgeted route in one go.
+
+query_budget(n) is the same check around any block of code:
+
+    with query_budget(3):
+        client.get("/products/1")
+
+Everything here costs a stack walk per statement, so it stays off in production.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import greenlet
+from sqlalchemy import event
+
+from config import settings
+
+logger = logging.getLogger("query_budget")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THIS_FILE = os.path.abspath(__file__)
+
+# Maximum statements per request, by route: what each one issues today on a
+# cold cache (`python -m benchmarks.query_budgets`), so a relationship that
+# starts loading per row fails instead of creeping in. Raise a budget
+# deliberately, in the change that needs it.
+ROUTE_BUDGETS = {
+    ("POST", "/auth/login"): 1,
+    ("GET", "/products/"): 3,
+    ("GET", "/products/search"): 3,
+    ("GET", "/products/{product_id}"): 3,
+    ("POST", "/orders/"): 12,  # any number of lines: stock for all of them is one UPDATE
+    ("GET", "/orders/"): 1,
+    ("GET", "/orders/{order_id}"): 5,
+    ("GET", "/admin/orders"): 2,
+    ("GET", "/admin/orders/export"): 2,  # one streamed query, however many rows
+    ("GET", "/admin/dashboard"): 3,  # the admin on a cold auth cache, counters, recent orders
+    ("GET", "/admin/products"): 3,
+    ("GET", "/admin/products/search"): 3,
+    ("GET", "/admin/products/export"): 2,
+    ("GET", "/admin/hero-banners"): 1,
+    ("GET", "/payments/verify/{transaction_id}"): 1,
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r"\bIN \((?:\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)\s*,?)+\)", re.IGNORECASE)
+_VALUES = re.compile(r"(VALUES \([^)]*\))(?:\s*,\s*\([^)]*\))+", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(sql: str) -> str:
+    """One form per statement shape: literals become ?, IN lists and VALUES rows collapse"""
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _VALUES.sub(r"\1, ...", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _is_app_frame(frame) -> bool:
+    filename = os.path.abspath(frame.f_code.co_filename)
+    return (
+        filename.startswith(BACKEND_DIR)
+        and filename != THIS_FILE
+        and "site-packages" not in filename
+    )
+
+
+def _describe(frame) -> str:
+    filename = os.path.relpath(frame.f_code.co_filename, BACKEND_DIR)
+    return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+def origin() -> str:
+    """The innermost line of app code behind the statement being executed"""
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            if _is_app_frame(frame):
+                return _describe(frame)
+            frame = frame.f_back
+        # an async session runs the statement in a greenlet whose stack stops
+        # in SQLAlchemy; the awaiting code is on the parent greenlet's stack
+        current = current.parent
+        if current is None:
+            return "?"
+        frame = current.gr_frame
+
+
+class QueryLog:
+    """Statements recorded for one request or query_budget block"""
+
+    def __init__(self, label: str = "", requests_only: bool = False):
+        self.label = label
+        self.requests_only = requests_only
+        self.statements = []  # (normalized sql, origin)
+
+    def __len__(self):
+        return len(self.statements)
+
+    def add(self, sql: str, where: str):
+        self.statements.append((sql, where))
+
+    def patterns(self):
+        """[(normalized sql, count, Counter of origins)], most repeated first"""
+        origins = {}
+        for sql, where in self.statements:
+            origins.setdefault(sql, Counter())[where] += 1
+        return sorted(
+            ((sql, sum(counter.values()), counter) for sql, counter in origins.items()),
+            key=lambda pattern: -pattern[1],
+        )
+
+    def repeated_selects(self, threshold: int):
+        return [
+            pattern for pattern in self.patterns()
+            if pattern[1] >= threshold and pattern[0].split(" ", 1)[0].upper() in ("SELECT", "WITH")
+        ]
+
+    def report(self, patterns=None, limit: int = 10) -> str:
+        lines = []
+        for sql, count, origins in (self.patterns() if patterns is None else patterns)[:limit]:
+            lines.append(f"  {count} x {sql[:200]}")
+            lines += [f"      {n} from {where}" for where, n in origins.most_common(3)]
+        return "\n".join(lines)
+
+
+_request_log = ContextVar("query_log", default=None)
+_blocks = []  # QueryLogs of open query_budget() blocks
+_blocks_lock = threading.Lock()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    request_log = _request_log.get()
+    if request_log is None and not _blocks:
+        return
+    sql, where = normalize(statement), origin()
+    if request_log is not None:
+        request_log.add(sql, where)
+    with _blocks_lock:
+        for block in _blocks:
+            if request_log is not None or not block.requests_only:
+                block.add(sql, where)
+
+
+def install(engine):
+    """Record an engine's statements (for an AsyncEngine, pass its sync_engine)"""
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def enable(app):
+    """Hook both engines and add QueryDebugMiddleware; main.py does this when QUERY_DEBUG is on"""
+    from database import async_engine, engine
+
+    install(engine)
+    install(async_engine.sync_engine)
+    if not any(middleware.cls is QueryDebugMiddleware for middleware in app.user_middleware):
+        app.add_middleware(QueryDebugMiddleware)
+
+
+def check(log: QueryLog, budget=None, threshold=None):
+    """Problems with a request's or block's statements, as report text (empty if none)"""
+    threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+    problems = []
+    if budget is not None and len(log) > budget:
+        problems.append(f"{log.label}: {len(log)} statements, budget {budget}\n{log.report()}")
+    repeated = log.repeated_selects(threshold)
+    if repeated:
+        problems.append(f"{log.label}: likely N+1, the same SELECT repeated\n{log.report(repeated)}")
+    return "\n".join(problems)
+
+
+@contextmanager
+def recording(requests_only: bool = False, label: str = "block"):
+    """
+    Record the statements issued inside the block, from any thread, into the
+    QueryLog it yields. requests_only keeps only those issued while handling a
+    request (needs QueryDebugMiddleware), leaving out background workers.
+    """
+    log = QueryLog(label, requests_only)
+    with _blocks_lock:
+        _blocks.append(log)
+    try:
+        yield log
+    finally:
+        with _blocks_lock:
+            _blocks.remove(log)
+
+
+@contextmanager
+def query_budget(max_queries: int, requests_only: bool = False, label: str = "query_budget block"):
+    """Fail with QueryBudgetExceeded if the block issues more than max_queries statements, or a likely N+1"""
+    with recording(requests_only, label) as log:
+        yield log
+    problems = check(log, max_queries)
+    if problems:
+        raise QueryBudgetExceeded(problems)
+
+
+class QueryDebugMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = _request_log.set(log)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_log.reset(token)
+
+        route = scope.get("route")
+        path = route.path_format if route is not None else scope["path"]
+        log.label = f"{scope['method']} {path}"
+        problems = check(log, ROUTE_BUDGETS.get((scope["method"], path)))
+        if problems:
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(problems)
+            logger.warning(problems)
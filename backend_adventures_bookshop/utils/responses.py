@@ -0,0 +1,40 @@
+# utils/responses.py
+"""
+Fast JSON responses
+FastJSONResponse is the app's default response class: ordinary content is
+encoded with orjson, and bytes are sent as-is so endpoints can hand over
+JSON that Pydantic has already produced.
+Large list endpoints opt in with fast_response(Schema, value): the ORM
+objects are validated and dumped to JSON bytes in one pass by a cached
+TypeAdapter, skipping FastAPI's intermediate dicts and second encoding.
+Keep `response_model` on those routes so the OpenAPI docs stay accurate.
+"""
+from functools import lru_cache
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def type_adapter(schema) -> TypeAdapter:
+    # building the core schema is the expensive part; do it once per type
+    return TypeAdapter(schema)
+
+
+def dump_json(schema, value) -> bytes:
+    """Validate `value` (ORM objects welcome) against `schema` and return JSON bytes"""
+    adapter = type_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def fast_response(schema, value, status_code: int = 200) -> FastJSONResponse:
+    return FastJSONResponse(dump_json(schema, value), status_code=status_code)
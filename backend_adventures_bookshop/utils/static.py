@@ -0,0 +1,42 @@
+# utils/static.py
+"""
+Static file serving with long-lived caching for content-addressed images
+A file named after its sha256 (see utils/uploads.py) never changes, so it is
+served with `Cache-Control: immutable` for a year and a strong ETag derived
+from the file name, which stays valid across restarts and replicas. Anything
+else falls back to Starlette's default mtime/size validators.
+"""
+import os
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+from utils.uploads import is_content_addressed
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # weak comparison (RFC 9110 13.1.2): ignore W/ prefixes, allow lists and *
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag.removeprefix("W/") for tag in candidates)
+
+
+class ContentAddressedStaticFiles(StaticFiles):
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        filename = os.path.basename(full_path)
+        if not is_content_addressed(filename):
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        etag = f'"{filename}"'
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": etag}
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result,
+            method=scope["method"], headers=headers,
+        )
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match is not None and _etag_matches(if_none_match, etag):
+            return NotModifiedResponse(response.headers)
+        return response
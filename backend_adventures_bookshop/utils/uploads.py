@@ -0,0 +1,88 @@
+# utils/uploads.py
+"""
+Streams uploaded images to disk without holding them in memory
+The upload is copied in fixed-size chunks to a temp file next to its final
+location (so the rename is atomic), the size limit is enforced as chunks
+arrive, and all file I/O goes through aiofiles so the event loop never blocks.
+Files are named after the sha256 of their content, hashed while streaming,
+so identical uploads land on the same path and hashed URLs never change.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException, UploadFile
+
+from config import settings
+
+IMAGE_DIR = "static/images"
+CHUNK_SIZE = 1024 * 1024
+
+# <sha256>.<ext> originals and <sha256>-<variant>.<ext> resized copies
+CONTENT_ADDRESSED_NAME = re.compile(r"^(?P<digest>[0-9a-f]{64})(?:-[a-z0-9]+)?(?:\.[a-z0-9]+)?$")
+
+_touch = aiofiles.os.wrap(os.utime)
+
+
+def image_url(filename: str) -> str:
+    return f"/{IMAGE_DIR}/{filename}"
+
+
+def is_content_addressed(filename: str) -> bool:
+    return CONTENT_ADDRESSED_NAME.match(filename) is not None
+
+
+async def save_image_upload(file: UploadFile, max_bytes: int = None):
+    """
+    Validate and store an image upload under its content hash.
+    Returns (filename, sha256 hex digest); an identical file already on disk
+    is reused (and its mtime refreshed so cleanup treats it as recent).
+    """
+    max_bytes = max_bytes or settings.MAX_IMAGE_UPLOAD_BYTES
+    if not file.content_type or not file.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image must be at most {max_bytes} bytes")
+
+    await aiofiles.os.makedirs(IMAGE_DIR, exist_ok=True)
+    # never trust the client's filename beyond its extension
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]+", extension):
+        extension = ""
+    temp_path = os.path.join(IMAGE_DIR, f".{uuid.uuid4()}.part")
+
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(temp_path, "wb") as buffer:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Image must be at most {max_bytes} bytes")
+                digest.update(chunk)
+                await buffer.write(chunk)
+        filename = f"{digest.hexdigest()}{extension}"
+        final_path = os.path.join(IMAGE_DIR, filename)
+        if await aiofiles.os.path.exists(final_path):
+            await remove_file(temp_path)
+            await _touch(final_path)
+        else:
+            await aiofiles.os.replace(temp_path, final_path)
+    except HTTPException:
+        await remove_file(temp_path)
+        raise
+    except OSError as e:
+        await remove_file(temp_path)
+        raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+    return filename, digest.hexdigest()
+
+
+async def remove_file(path: str):
+    """Delete a file if it exists, without blocking the event loop"""
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,90 @@
+# utils/worker.py
+"""
+Background workers that poll the database in batches
+A subclass implements process_batch(), returning how many items it handled.
+run() goes straight on to the next batch while batches come back full and
+otherwise idles for poll_seconds, unless notify() wakes it early; notify is
+safe to call from any thread, e.g. a sync route after its commit.
+A failed batch is logged with its traceback and retried on the next poll.
+InAppWorker runs one as a task on the API's event loop (see main.py).
+"""
+import abc
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PollingWorker(abc.ABC):
+    name = "worker"
+
+    def __init__(self, batch_size: int, poll_seconds: float):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+
+    @abc.abstractmethod
+    async def process_batch(self) -> int:
+        """Handle up to batch_size items; returns how many were handled"""
+
+    async def run(self):
+        """Process batches until stop()"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while not self._stopping:
+            try:
+                handled = await self.process_batch()
+            except Exception:
+                logger.exception("%s batch failed", self.name)
+                handled = 0
+            if handled >= self.batch_size:
+                continue  # more is probably waiting
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def drain(self):
+        """Process batches until there is nothing left to do"""
+        while await self.process_batch():
+            pass
+
+    def notify(self):
+        """Wake the run loop early"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def stop(self):
+        self._stopping = True
+        self.notify()
+
+    async def close(self):
+        pass
+
+
+class InAppWorker:
+    """One worker running as a task on the current event loop"""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.worker = None
+        self.task = None
+
+    async def start(self):
+        if self.worker is None:
+            self.worker = self.factory()
+            self.task = asyncio.create_task(self.worker.run())
+
+    async def stop(self):
+        if self.worker is not None:
+            self.worker.stop()
+            await self.task
+            await self.worker.close()
+            self.worker = self.task = None
+
+    def notify(self):
+        if self.worker is not None:
+            self.worker.notify()